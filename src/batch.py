@@ -0,0 +1,37 @@
+"""
+Operation records for 'tagg batch'.
+Each JSONL line is one of ``{"op": "add"|"remove", "path": ..., "tags": [...]}``
+or ``{"op": "rename", "old": ..., "new": ...}``; tags use the CLI's key:value form.
+"""
+import json
+from typing import Any, Dict, List
+
+from .rules import parse_tag
+
+OPS = ('add', 'remove', 'rename')
+
+def parse_op(line: str) -> Dict[str, Any]:
+    """Decode and validate one operation, normalizing tags to (key, value) pairs."""
+    try:
+        op = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(op, dict) or op.get('op') not in OPS:
+        raise ValueError(f"Operation must be an object with 'op' set to one of: {', '.join(OPS)}")
+    if op['op'] == 'rename':
+        if not all(isinstance(op.get(field), str) and op[field] for field in ('old', 'new')):
+            raise ValueError("rename needs non-empty 'old' and 'new' tags")
+        return {'op': 'rename', 'old': op['old'], 'new': op['new']}
+    tags: List[str] = op.get('tags')
+    if not isinstance(op.get('path'), str) or not op['path']:
+        raise ValueError(f"{op['op']} needs a 'path'")
+    if not isinstance(tags, list) or not tags or not all(isinstance(tag, str) and tag for tag in tags):
+        raise ValueError(f"{op['op']} needs a non-empty list of 'tags'")
+    return {'op': op['op'], 'path': op['path'], 'tags': [parse_tag(tag) for tag in tags]}
+
+def rename_in(tags: List[str], old_tag: str, new_tag: str) -> None:
+    """Apply a tag rename to one file's tag list in place."""
+    if old_tag in tags:
+        tags.remove(old_tag)
+        if new_tag not in tags:
+            tags.append(new_tag)
@@ -0,0 +1,137 @@
+"""
+Query result cache for the tag engine.
+Entries are stamped with a store generation that every mutation bumps, so a
+cached result is served only while the store is unchanged.
+"""
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+from .index_manager import estimate_size
+from .fileio import atomic_open, atomic_write
+
+MISS = object()
+
+class QueryCache:
+    """Size-bounded LRU cache of query results, optionally shared across processes."""
+
+    def __init__(self, generation_file: Path, max_entries: int = 128, shared_file: Optional[Path] = None,
+                 manager=None):
+        self.generation_file = Path(generation_file)
+        self.max_entries = max_entries
+        self.shared_file = Path(shared_file) if shared_file else None
+        # With an IndexManager the entries count against index_memory_mb and may be spilled
+        self.manager = manager
+        self._name = f"query_cache:{self.generation_file}"
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.entries_generation = self.generation
+        self.hits = 0
+        self.misses = 0
+        if self.shared_file:
+            self._load_shared()
+
+    @property
+    def entries(self) -> 'OrderedDict[str, Any]':
+        """Cached results, fetched through the index manager when one is attached."""
+        if self.manager is None:
+            return self._entries
+        entries = self.manager.get(self._name)
+        if entries is None:
+            entries = OrderedDict()
+            self.manager.put(self._name, entries, 0)
+            self._sizes.clear()
+        return entries
+
+    def _clear(self) -> None:
+        self.entries.clear()
+        self._sizes.clear()
+        self._account()
+
+    def _account(self) -> None:
+        """Report the current approximate size of the entries to the manager."""
+        if self.manager is not None:
+            self.manager.resize(self._name, sum(self._sizes.values()))
+
+    @property
+    def generation(self) -> str:
+        """Current store generation as written by the last mutating process."""
+        try:
+            return self.generation_file.read_text().strip() or '0'
+        except FileNotFoundError:
+            return '0'
+
+    def bump(self) -> str:
+        """Advance the generation after a mutation and drop all cached entries."""
+        counter = self.generation.split('-', 1)[0]
+        # The pid/random suffix keeps concurrent bumps from landing on the same value
+        new_generation = f"{int(counter) + 1}-{os.getpid():x}{os.urandom(3).hex()}"
+        atomic_write(self.generation_file, new_generation)
+        self._clear()
+        self.entries_generation = new_generation
+        if self.shared_file and self.shared_file.exists():
+            self.shared_file.unlink()
+        return new_generation
+
+    @staticmethod
+    def make_key(*parts: Hashable) -> str:
+        """Serialize a key so it can also be stored in the shared file."""
+        return json.dumps(parts)
+
+    def _sync(self) -> str:
+        """Drop entries from an older generation and return the current one."""
+        generation = self.generation
+        if generation != self.entries_generation:
+            self._clear()
+            self.entries_generation = generation
+        return generation
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or MISS if absent or stale."""
+        if self.max_entries <= 0:
+            return MISS
+        self._sync()
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return MISS
+
+    def put(self, key: str, value: Any, generation: Optional[str] = None) -> None:
+        """Cache a value computed at ``generation`` (defaults to the current one)."""
+        if self.max_entries <= 0:
+            return
+        current = self._sync()
+        if generation is not None and generation != current:
+            return  # the store changed while the result was being computed
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        self._sizes[key] = estimate_size(key) + estimate_size(value)
+        while len(entries) > self.max_entries:
+            self._sizes.pop(entries.popitem(last=False)[0], None)
+        self._account()
+        if self.shared_file:
+            self._save_shared()
+
+    def _load_shared(self) -> None:
+        """Load entries from the shared file if they belong to the current generation."""
+        try:
+            with open(self.shared_file) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get('generation') == self.entries_generation:
+            self.entries.update(data.get('entries', {}))
+            self._sizes.update((key, estimate_size(key) + estimate_size(value))
+                               for key, value in self.entries.items())
+            self._account()
+
+    def _save_shared(self) -> None:
+        """Write the in-memory entries to the shared file."""
+        with atomic_open(self.shared_file) as f:
+            json.dump({'generation': self.entries_generation, 'entries': self.entries}, f)
@@ -0,0 +1,217 @@
+"""
+Tag-name suggestion index for shell completion and CLI hints.
+The vocabulary is persisted as a sorted text file that is memory-mapped and
+binary-searched, so lookups never build an engine; the store is only read
+when the file is older than the current store generation.
+"""
+import heapq
+import mmap
+import os
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .fileio import atomic_open
+
+VOCAB_FILE = 'tag_vocab.txt'
+GENERATION_FILE = '.generation'
+# Prefixes up to this long match a large share of the vocabulary, so their
+# top SHORTCUT_LIMIT tags are ranked once at build time instead of per lookup
+SHORTCUT_PREFIX_LEN = 1
+SHORTCUT_LIMIT = 50
+
+class CompletionIndex:
+    """Sorted, frequency-annotated tag vocabulary answering prefix and substring queries.
+
+    File layout: a first line holding the store generation, a line with the
+    number of shortcut lines that follow (``prefix\\ttag\\ttag...``, the most
+    frequent tags for the empty prefix and each first character), then one
+    ``lowercased\\ttag\\tcount`` line per tag, sorted by the lowercased name.
+    """
+
+    def __init__(self, storage_path: str):
+        self.path = Path(storage_path) / VOCAB_FILE
+
+    @property
+    def generation(self) -> Optional[str]:
+        """Store generation the index was built at, or None if it was never built."""
+        try:
+            with open(self.path, 'rb') as f:
+                return f.readline().decode().strip()
+        except FileNotFoundError:
+            return None
+
+    def build(self, tag_counts: Dict[str, int], generation: str) -> None:
+        """Write the vocabulary file atomically."""
+        rows = sorted((tag.lower(), tag, count) for tag, count in tag_counts.items()
+                      if '\t' not in tag and '\n' not in tag)
+        shortcuts = [('', self._rank(rows, SHORTCUT_LIMIT))]
+        shortcuts += [(first, self._rank(group, SHORTCUT_LIMIT))
+                      for first, group in groupby(rows, key=lambda row: row[0][:SHORTCUT_PREFIX_LEN]) if first]
+        with atomic_open(self.path) as f:
+            f.write(f"{generation}\n{len(shortcuts)}\n")
+            f.writelines('\t'.join([first, *tags]) + '\n' for first, tags in shortcuts)
+            f.writelines(f"{lower}\t{tag}\t{count}\n" for lower, tag, count in rows)
+
+    def refresh(self, generation: str, records: Callable[[], Iterable[Tuple[str, List[str]]]]) -> 'CompletionIndex':
+        """Rebuild from ``records()`` unless the file is already at ``generation``."""
+        if self.generation != generation:
+            self.build(self.count_tags(records()), generation)
+        return self
+
+    @staticmethod
+    def count_tags(records: Iterable[Tuple[str, List[str]]]) -> Dict[str, int]:
+        """Count how many files carry each tag."""
+        counts: Dict[str, int] = {}
+        for _, tags in records:
+            for tag in tags:
+                counts[tag] = counts.get(tag, 0) + 1
+        return counts
+
+    def _open(self) -> Optional[Tuple[mmap.mmap, int, int]]:
+        """Map the vocabulary file, returning (map, offset of shortcut lines, offset of first entry)."""
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        head = mm.find(b'\n') + 1
+        count_end = mm.find(b'\n', head)
+        try:
+            shortcuts = int(mm[head:count_end])
+        except ValueError:
+            # Written before shortcut lines existed: entries start right after the generation
+            return mm, head, head
+        start = count_end + 1
+        for _ in range(shortcuts):
+            start = mm.find(b'\n', start) + 1
+        return mm, count_end + 1, start
+
+    @staticmethod
+    def _parse(line: bytes) -> Tuple[str, str, int]:
+        lower, tag, count = line.decode('utf-8').split('\t')
+        return lower, tag, int(count)
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[str]:
+        """Tags starting with prefix (case-insensitive), most frequent first."""
+        opened = self._open()
+        if opened is None:
+            return []
+        mm, shortcuts, start = opened
+        lowered = prefix.lower()
+        key = lowered.encode('utf-8')
+        with mm:
+            if len(lowered) <= SHORTCUT_PREFIX_LEN and limit <= SHORTCUT_LIMIT and shortcuts < start:
+                return self._shortcut(mm, shortcuts, start, lowered)[:limit]
+            # Binary search for the first line whose key is >= prefix
+            lo, hi = start, len(mm)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                line_start = mm.rfind(b'\n', start - 1, mid) + 1
+                line_end = mm.find(b'\n', line_start)
+                if mm[line_start:line_end] < key:
+                    lo = line_end + 1
+                else:
+                    hi = line_start
+            return self._rank(self._scan_prefix(mm, lo, key), limit)
+
+    @staticmethod
+    def _shortcut(mm: mmap.mmap, pos: int, end: int, prefix: str) -> List[str]:
+        """Precomputed ranking for a short prefix; no line means no tag starts with it."""
+        while pos < end:
+            line_end = mm.find(b'\n', pos)
+            first, *tags = mm[pos:line_end].decode('utf-8').split('\t')
+            if first == prefix:
+                return tags
+            pos = line_end + 1
+        return []
+
+    def _scan_prefix(self, mm: mmap.mmap, pos: int, key: bytes) -> Iterator[Tuple[str, str, int]]:
+        while pos < len(mm):
+            line_end = mm.find(b'\n', pos)
+            line = mm[pos:line_end]
+            if not line.startswith(key):
+                break
+            yield self._parse(line)
+            pos = line_end + 1
+
+    def substring(self, fragment: str, limit: int = 20) -> List[str]:
+        """Tags containing fragment (case-insensitive), most frequent first."""
+        opened = self._open() if fragment else None
+        if opened is None:
+            return []
+        mm, _, start = opened
+        with mm:
+            return self._rank(self._scan_substring(mm, start, fragment.lower()), limit)
+
+    def _scan_substring(self, mm: mmap.mmap, start: int, fragment: str) -> Iterator[Tuple[str, str, int]]:
+        key = fragment.encode('utf-8')
+        pos = mm.find(key, start)
+        while pos != -1:
+            line_start = mm.rfind(b'\n', start - 1, pos) + 1
+            line_end = mm.find(b'\n', pos)
+            lower, tag, count = self._parse(mm[line_start:line_end])
+            # The hit may be in the original-case or count column instead
+            if fragment in lower:
+                yield lower, tag, count
+            pos = mm.find(key, line_end + 1)
+
+    def suggest(self, fragment: str, limit: int = 5) -> List[str]:
+        """Prefix matches first, topped up with substring matches."""
+        results = self.prefix(fragment, limit)
+        if len(results) < limit:
+            results += [tag for tag in self.substring(fragment, limit * 2) if tag not in results]
+        return results[:limit]
+
+    @staticmethod
+    def _rank(matches: Iterable[Tuple[str, str, int]], limit: int) -> List[str]:
+        """Most frequent ``limit`` matches, keeping only that many in memory."""
+        return [tag for _, tag, _ in heapq.nsmallest(limit, matches, key=lambda m: (-m[2], m[0]))]
+
+def _load_config(ctx):
+    """Load config from the CLI's --config without building an engine."""
+    from .config import ConfigManager
+    config = ConfigManager()
+    config.load(ctx.find_root().params.get('config') or '.tagconfig')
+    return config
+
+def _index_for(config) -> Optional[CompletionIndex]:
+    """The completion index, rebuilt from the store if a write made it stale."""
+    try:
+        storage_path = Path(config.get_storage_path())
+    except ValueError:
+        return None
+    try:
+        generation = (storage_path / GENERATION_FILE).read_text().strip() or '0'
+    except FileNotFoundError:
+        generation = '0'
+    index = CompletionIndex(str(storage_path))
+    if index.generation == generation:
+        return index
+    from .storage import StorageFactory
+    try:
+        storage = StorageFactory.create(config)
+    except ValueError:
+        return index
+    try:
+        return index.refresh(generation, storage.iter_all_data)
+    finally:
+        if hasattr(storage, 'close'):
+            storage.close()
+
+def complete_tags(ctx, param, incomplete: str) -> List[str]:
+    """Click shell_complete callback for stored tag names (find, rename)."""
+    index = _index_for(_load_config(ctx))
+    return index.prefix(incomplete, limit=50) if index else []
+
+def complete_tag_args(ctx, param, incomplete: str) -> List[str]:
+    """Click shell_complete callback for key:value tag arguments (add, remove)."""
+    config = _load_config(ctx)
+    index = _index_for(config)
+    if index is None:
+        return []
+    separator = config.get('separator', '/')
+    lookup = incomplete.replace(':', separator, 1)
+    return [tag.replace(separator, ':', 1) for tag in index.prefix(lookup, limit=50)]
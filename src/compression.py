@@ -0,0 +1,155 @@
+"""
+Transparent compression for the store and its sidecar files.
+A file's codec is given by its suffix (``.gz`` or ``.zst``), so readers need
+no configuration and stream-decode line by line. zstd requires the optional
+``zstandard`` package; gzip from the standard library is the fallback.
+Append-only logs are always written plain: a crash mid-append would leave a
+truncated compressed member that breaks every later read.
+"""
+import gzip
+import io
+import os
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Union
+
+from .fileio import atomic_open
+
+try:
+    import zstandard
+except ImportError:  # fall back to gzip
+    zstandard = None
+
+CODECS = ('none', 'gzip', 'zstd')
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+# Raised when a compressed stream ends early or is damaged
+CORRUPT_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile) + ((zstandard.ZstdError,) if zstandard else ())
+
+def resolve_codec(name: Optional[str]) -> Optional[str]:
+    """Codec to write with for a configured name, or None for plain text."""
+    if name in (None, 'none'):
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression '{name}' (expected one of: {', '.join(CODECS)})")
+    if name == 'zstd' and zstandard is None:
+        return 'gzip'
+    return name
+
+def codec_for(config) -> Optional[str]:
+    """Codec configured for new store files."""
+    return resolve_codec(config.get('compression', 'none'))
+
+def codec_of(path: Union[str, Path]) -> Optional[str]:
+    """Codec a file is stored with, from its suffix."""
+    suffix = Path(path).suffix
+    return next((codec for codec, known in SUFFIXES.items() if known == suffix), None)
+
+def variants(base: Union[str, Path]) -> Iterator[Path]:
+    """Every on-disk name a file can have: plain, then each compressed form."""
+    base = Path(base)
+    yield base
+    for suffix in SUFFIXES.values():
+        yield base.with_name(base.name + suffix)
+
+def data_path(base: Union[str, Path], codec: Optional[str]) -> Path:
+    """Name of ``base`` when written with ``codec``."""
+    base = Path(base)
+    return base.with_name(base.name + SUFFIXES[codec]) if codec else base
+
+def existing_path(base: Union[str, Path], codec: Optional[str] = None) -> Path:
+    """The variant of ``base`` already on disk, else its name under ``codec``.
+
+    Existing files keep their codec until ``tagg compact`` converts them.
+    """
+    preferred = data_path(base, codec)
+    if preferred.exists():
+        return preferred
+    return next((path for path in variants(base) if path.exists()), preferred)
+
+def open_read(path: Union[str, Path]) -> IO[str]:
+    """Open a text file for reading, decompressing incrementally as it is consumed."""
+    codec = codec_of(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError(f"{path} is zstd-compressed; install 'zstandard' to read it")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+def _encoder(raw: IO[bytes], codec: Optional[str]) -> IO[str]:
+    """Text stream compressing into ``raw``; closing it finishes the stream but leaves ``raw`` open."""
+    if codec == 'gzip':
+        # Fixed mtime keeps output identical for identical content
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode='wb', mtime=0), encoding='utf-8')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=False), encoding='utf-8')
+    return io.TextIOWrapper(raw, encoding='utf-8')
+
+@contextmanager
+def open_write(path: Union[str, Path], fsync: bool = False) -> Iterator[IO[str]]:
+    """Atomically replace a text file, compressing per its suffix."""
+    with atomic_open(path, 'wb', fsync) as raw:
+        f = _encoder(raw, codec_of(path))
+        yield f
+        if codec_of(path) is None:
+            f.flush()
+            f.detach()  # atomic_open owns the descriptor
+        else:
+            f.close()
+
+def write_text(path: Union[str, Path], data: str, fsync: bool = False) -> None:
+    """Atomically replace a text file with ``data``."""
+    with open_write(path, fsync) as f:
+        f.write(data)
+
+@contextmanager
+def open_append(path: Union[str, Path]) -> Iterator[IO[str]]:
+    """Append text; compressed files gain a new gzip member or zstd frame, which readers concatenate."""
+    with open(path, 'ab') as raw:
+        f = _encoder(raw, codec_of(path))
+        yield f
+        if codec_of(path) is None:
+            f.flush()
+            f.detach()
+        else:
+            f.close()
+
+def log_variants(base: Union[str, Path]) -> List[Path]:
+    """Existing files of an append-only log, oldest first: compressed ones left by earlier versions, then plain."""
+    base = Path(base)
+    return [path for path in [*variants(base)][1:] + [base] if path.exists()]
+
+def iter_log(base: Union[str, Path]) -> Iterator[str]:
+    """Lines of every variant of a log, stopping quietly at a truncated or damaged compressed tail."""
+    for path in log_variants(base):
+        try:
+            with open_read(path) as f:
+                yield from f
+        except CORRUPT_ERRORS:
+            continue  # keep what was readable; the rest was lost to an interrupted append
+
+def rewrite_log(base: Union[str, Path], lines: Iterator[str], fsync: bool = False) -> Path:
+    """Atomically replace a log with ``lines`` as plain text and remove compressed variants."""
+    base = Path(base)
+    with open_write(base, fsync) as f:
+        f.writelines(lines)
+    for path in [*variants(base)][1:]:
+        path.unlink(missing_ok=True)
+    return base
+
+def convert(path: Path, codec: Optional[str], fsync: bool = False) -> Path:
+    """Rewrite a file with another codec, streaming, and remove the old one. Returns the new path."""
+    if codec_of(path) == codec:
+        return path
+    base = path.with_name(path.name[:-len(path.suffix)]) if codec_of(path) else path
+    target = data_path(base, codec)
+    with open_read(path) as source, open_write(target, fsync) as out:
+        for chunk in iter(lambda: source.read(1 << 20), ''):
+            out.write(chunk)
+    os.unlink(path)
+    return target
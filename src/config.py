@@ -18,8 +18,17 @@ class ConfigManager:
             'storage': 'md',  # 'md' or 'db'
             'separator': '/',  # Tag separator
             'index_memory_mb': 50,  # Memory limit for indexing
+            'parallel_scan_threshold': 50000,  # Vocabulary size at which regex/fuzzy matching uses a process pool
+            'parallel_scan_workers': 0,  # Scan processes, 0 = one per CPU
+            'query_cache_size': 128,  # Cached query results, 0 disables
+            'query_cache_shared': False,  # Share cached results via a file next to the store
+            'fsync_writes': True,  # Flush store writes to disk before replacing the old file
+            'compression': 'none',  # none, gzip or zstd (falls back to gzip without zstandard) for new store files
             'colors': {'tag': 'green', 'error': 'red'},  # CLI colors
-            'exclusions': []  # List of excluded tag pairs
+            'exclusions': [],  # List of excluded tag pairs
+            'tag_types': {},  # Tag key -> int/float/date, enables range queries like priority>=3
+            'rules': [],  # Auto-tagging rules applied by 'tagg rules'
+            'federation': []  # Stores queried together by 'tagg federated': [{name, path, storage}]
         }
     
     def load(self, path: str) -> None:
@@ -50,6 +59,15 @@ class ConfigManager:
         self.data['storage_path'] = str(path_obj)
         self.save()
 
+    def for_root(self, root: Dict[str, Any]) -> 'ConfigManager':
+        """Child config for one federation root: this config with its storage path and backend."""
+        path = root.get('path')
+        if not path or not Path(path).is_absolute():
+            raise ValueError(f"Federation root needs an absolute 'path': {root}")
+        child = ConfigManager()
+        child.data = {**self.data, 'storage_path': str(path), 'storage': root.get('storage', self.get('storage', 'md'))}
+        return child
+
     def get_storage_path(self) -> str:
         """Get the storage path from config, load if necessary."""
         # Load from current config file if set
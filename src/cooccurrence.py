@@ -0,0 +1,185 @@
+"""
+Tag co-occurrence counts for related-tag queries and suggestions.
+A sparse symmetric matrix of how many files carry each pair of tags is
+persisted next to the store and kept current through an append-only change
+log. With NumPy/SciPy installed, building and top-k ranking are vectorized.
+"""
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .compression import CORRUPT_ERRORS, existing_path, iter_log, log_variants, open_append, open_read, open_write
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+BASE_FILE = 'cooccurrence.json'
+LOG_FILE = 'cooccurrence.log'
+COMPACT_AFTER = 1000  # logged changes replayed before the base is rewritten
+
+def top_k(names: List[str], scores: List[float], k: int) -> List[int]:
+    """Indices of the k highest scores, best first (ties broken by name)."""
+    if k <= 0 or not names:
+        return []
+    if np is not None and len(names) > k:
+        values = np.asarray(scores, dtype=float)
+        candidates = np.argpartition(-values, k - 1)[:k]
+        return sorted(candidates.tolist(), key=lambda i: (-scores[i], names[i]))
+    return heapq.nsmallest(k, range(len(names)), key=lambda i: (-scores[i], names[i]))
+
+class CooccurrenceMatrix:
+    """Per-tag file counts and sparse symmetric pair counts."""
+
+    def __init__(self, counts: Optional[Dict[str, int]] = None,
+                 pairs: Optional[Dict[str, Dict[str, int]]] = None):
+        self.counts = counts or {}
+        self.pairs = pairs or {}
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, List[str]]]) -> 'CooccurrenceMatrix':
+        """Count tag pairs over (path, tags) records."""
+        if sparse is not None:
+            return cls._build_sparse(records)
+        matrix = cls()
+        for _, tags in records:
+            matrix.apply_change(set(), set(tags))
+        return matrix
+
+    @classmethod
+    def _build_sparse(cls, records: Iterable[Tuple[str, List[str]]]) -> 'CooccurrenceMatrix':
+        """Compute all pair counts at once as X^T X over the file x tag incidence matrix."""
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        n_files = 0
+        for n_files, (_, tags) in enumerate(records, 1):
+            for tag in set(tags):
+                rows.append(n_files - 1)
+                cols.append(vocab.setdefault(tag, len(vocab)))
+        names = [*vocab]
+        incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)),
+                                      shape=(n_files, len(names)))
+        product = (incidence.T @ incidence).tocoo()
+        matrix = cls()
+        for i, j, count in zip(product.row.tolist(), product.col.tolist(), product.data.tolist()):
+            if i == j:
+                matrix.counts[names[i]] = count
+            else:
+                matrix.pairs.setdefault(names[i], {})[names[j]] = count
+        return matrix
+
+    def _bump(self, a: str, b: str, delta: int) -> None:
+        row = self.pairs.setdefault(a, {})
+        row[b] = row.get(b, 0) + delta
+        if row[b] <= 0:
+            del row[b]
+            if not row:
+                del self.pairs[a]
+
+    def apply_change(self, before: Set[str], after: Set[str]) -> None:
+        """Update counts for one file whose tags changed from ``before`` to ``after``."""
+        gained, lost = after - before, before - after
+        for tag in gained:
+            self.counts[tag] = self.counts.get(tag, 0) + 1
+        for tag in lost:
+            self.counts[tag] = self.counts.get(tag, 0) - 1
+            if self.counts[tag] <= 0:
+                del self.counts[tag]
+        for tags, changed, delta in ((after, gained, 1), (before, lost, -1)):
+            for a in tags:
+                for b in tags:
+                    if a != b and (a in changed or b in changed):
+                        self._bump(a, b, delta)
+
+    def _jaccard(self, tag: str, other: str, together: int) -> float:
+        return together / (self.counts.get(tag, 0) + self.counts.get(other, 0) - together or 1)
+
+    def related(self, tag: str, limit: int = 10) -> List[Tuple[str, int, float]]:
+        """(tag, files in common, Jaccard similarity) for the tags most often seen with ``tag``."""
+        row = self.pairs.get(tag, {})
+        names = [*row]
+        scores = [self._jaccard(tag, other, row[other]) for other in names]
+        return [(names[i], row[names[i]], scores[i]) for i in top_k(names, scores, limit)]
+
+    def suggest(self, tags: Iterable[str], limit: int = 5) -> List[str]:
+        """Tags that best complement the given set, by summed similarity."""
+        tags = set(tags)
+        totals: Dict[str, float] = {}
+        for tag in tags:
+            for other, together in self.pairs.get(tag, {}).items():
+                if other not in tags:
+                    totals[other] = totals.get(other, 0.0) + self._jaccard(tag, other, together)
+        names = [*totals]
+        return [names[i] for i in top_k(names, [totals[n] for n in names], limit)]
+
+    def top_pairs(self, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """Most frequent tag pairs across all files."""
+        pairs = [(a, b) for a, row in self.pairs.items() for b in row if a < b]
+        names = [f"{a}\t{b}" for a, b in pairs]
+        counts = [self.pairs[a][b] for a, b in pairs]
+        return [(*pairs[i], counts[i]) for i in top_k(names, counts, limit)]
+
+    def nbytes(self) -> int:
+        """Rough memory footprint without walking every entry."""
+        return 200 * len(self.counts) + 120 * sum(len(row) for row in self.pairs.values())
+
+class CooccurrenceIndex:
+    """On-disk matrix stamped with a store generation plus a log of later per-file changes.
+
+    Each log line is ``{"from": gen, "to": gen, "before": [...], "after": [...]}``;
+    replay stops being valid as soon as a line does not continue the chain.
+    The base may be compressed; the log is always appended as plain text.
+    """
+
+    def __init__(self, storage_path: str, codec: Optional[str] = None):
+        self.base_path = existing_path(Path(storage_path) / BASE_FILE, codec)
+        self.log_path = Path(storage_path) / LOG_FILE
+
+    def load(self, generation: str) -> Optional[CooccurrenceMatrix]:
+        """Matrix for ``generation``, or None if it has to be rebuilt."""
+        try:
+            with open_read(self.base_path) as f:
+                base = json.load(f)
+        except (FileNotFoundError, ValueError, *CORRUPT_ERRORS):
+            return None
+        matrix = CooccurrenceMatrix(base['counts'], base['pairs'])
+        current = base['generation']
+        replayed = 0
+        if current != generation:
+            for line in iter_log(self.log_path):
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from an interrupted append
+                if change['from'] != current:
+                    continue  # a change logged against another base
+                matrix.apply_change(set(change['before']), set(change['after']))
+                current = change['to']
+                replayed += 1
+        if current != generation:
+            return None
+        if replayed > COMPACT_AFTER:
+            self.save(matrix, generation)
+        return matrix
+
+    def save(self, matrix: CooccurrenceMatrix, generation: str) -> None:
+        """Write the full matrix atomically and start a fresh change log."""
+        with open_write(self.base_path) as f:
+            json.dump({'generation': generation, 'counts': matrix.counts, 'pairs': matrix.pairs}, f)
+        for path in log_variants(self.log_path):
+            path.unlink()
+
+    def append(self, from_generation: str, to_generation: str, before: Set[str], after: Set[str]) -> None:
+        """Log one file's tag change so the next load can replay it instead of rebuilding."""
+        if not self.base_path.exists():
+            return
+        with open_append(self.log_path) as f:
+            f.write(json.dumps({'from': from_generation, 'to': to_generation,
+                                'before': sorted(before), 'after': sorted(after)}) + '\n')
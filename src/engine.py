@@ -6,10 +6,25 @@ Core engine for tag operations, coordinating storage and config.
 import os
 import json
 import shutil
-from typing import List, Tuple, Dict, Any, Optional
+from itertools import islice
+from typing import List, Tuple, Dict, Any, Callable, Iterable, Iterator, Optional
 from pathlib import Path
 from .storage import StorageFactory
 from .config import ConfigManager
+from .transfer import chunked
+from .rules import RuleSet, extract_type
+from .snapshot import DirectorySnapshot, snapshot_signature
+from .cache import MISS, QueryCache
+from .completion import CompletionIndex
+from .index_manager import IndexManager
+from .fileio import store_lock
+from .compression import (codec_for, convert, existing_path, iter_log, log_variants, open_read, resolve_codec,
+                          rewrite_log, variants, write_text)
+from .reconcile import FINGERPRINT_FILE, FingerprintLog, find_moves, fingerprint, fingerprints_of, stat_paths
+from .batch import parse_op, rename_in
+from .cooccurrence import BASE_FILE, LOG_FILE, CooccurrenceIndex, CooccurrenceMatrix
+from .value_index import INDEX_DIR, ValueIndex, parse_predicates, validate_tag_types
+from .storage.indexes import compile_matcher, dir_prefix
 
 class TagEngine:
     """Handles tag operations with validation and exclusions."""
@@ -18,36 +33,70 @@ class TagEngine:
         self.config = config
         self.storage_path = config.get_storage_path()
         self.storage = StorageFactory.create(config)
-        self.history_file = Path(self.storage_path) / 'tag_history.json'
+        self.codec = codec_for(config)
+        self.lock = store_lock(self.storage_path)
+        self.history_file = self._resolve_history_file()
+        self.fingerprints = FingerprintLog(self.storage_path)
         self.history: List[Dict[str, Any]] = self._load_history()
+        shared = Path(self.storage_path) / 'query_cache.json' if config.get('query_cache_shared', False) else None
+        self.indexes = IndexManager.for_config(config, self.storage_path)
+        self.cache = QueryCache(Path(self.storage_path) / '.generation',
+                                max_entries=int(config.get('query_cache_size', 128)), shared_file=shared,
+                                manager=self.indexes)
+    
+    def _resolve_history_file(self) -> Path:
+        """Current name of the history file; 'tagg compact' in another process may have renamed it."""
+        self.history_file = existing_path(Path(self.storage_path) / 'tag_history.json', self.codec)
+        return self.history_file
     
     def _load_history(self) -> List[Dict[str, Any]]:
         """Load operation history."""
-        if self.history_file.exists():
-            with open(self.history_file) as f:
-                return json.load(f)
+        with self.lock:
+            if self._resolve_history_file().exists():
+                with open_read(self.history_file) as f:
+                    return json.load(f)
         return []
     
     def _save_history(self) -> None:
         """Save operation history."""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.history, f, indent=2)
+        with self.lock:
+            write_text(self._resolve_history_file(), json.dumps(self.history, indent=2),
+                       bool(self.config.get('fsync_writes', True)))
     
     def _log_operation(self, op_type: str, **kwargs) -> None:
         """Log an operation for undo."""
-        self.history.append({'type': op_type, **kwargs})
-        if len(self.history) > 10:  # Keep last 10
-            self.history.pop(0)
-        self._save_history()
+        with self.lock:
+            # Re-read so operations logged by other processes are kept
+            self.history = self._load_history()
+            self.history.append({'type': op_type, **kwargs})
+            if len(self.history) > 10:  # Keep last 10
+                self.history.pop(0)
+            self._save_history()
+    
+    def _mutated(self) -> str:
+        """Invalidate cached query results after the store changes, returning the new generation."""
+        return self.cache.bump()
+    
+    def _cache_key(self, *parts) -> str:
+        """Cache key scoped to the active backend."""
+        return self.cache.make_key(self.config.get('storage', 'md'), *parts)
     
     def undo(self) -> str:
         """Undo the last operation."""
-        if not self.history:
-            raise ValueError("No operations to undo")
-        
-        last_op = self.history.pop()
-        self._save_history()
-        
+        with self.lock:
+            self.history = self._load_history()
+            if not self.history:
+                raise ValueError("No operations to undo")
+            last_op = self.history.pop()
+            self._save_history()
+            try:
+                return self._apply_inverse(last_op)
+            finally:
+                # Bump only after the store changed so no reader caches pre-undo results under the new generation
+                self._mutated()
+    
+    def _apply_inverse(self, last_op: Dict[str, Any]) -> str:
+        """Revert one logged operation in storage."""
         op_type = last_op['type']
         if op_type == 'add_tags':
             self.storage.remove_tags(last_op['file_path'], last_op['tags'])
@@ -58,73 +107,598 @@ class TagEngine:
         elif op_type == 'rename_tag':
             self.storage.rename_tag(last_op['new_tag'], last_op['old_tag'])
             return f"Undid rename '{last_op['new_tag']}' back to '{last_op['old_tag']}'"
+        elif op_type == 'batch':
+            # Every file the batch changed, renamed ones included, is logged, so restoring them is one bulk write
+            restored = {file_path: [(tag, '') for tag in tags] for file_path, tags in last_op['files'].items() if tags}
+            if restored:
+                self.storage.bulk_add_tags(restored, replace=True)
+            # Files the batch first tagged are dropped rather than kept with an empty tag list
+            dropped = {file_path: None for file_path, tags in last_op['files'].items() if not tags}
+            if dropped:
+                self.storage.move_files(dropped)
+            return f"Undid batch of {last_op['count']} operations on {len(last_op['files'])} files"
         else:
             raise ValueError(f"Cannot undo operation: {op_type}")
     
     def add_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
         """Add tags to a file, checking exclusions."""
         file_path = str(Path(file_path).resolve())
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"File does not exist: {file_path}")
         
-        current_tags = set(self.get_tags(file_path))
         exclusions = self.config.get('exclusions', [])
         separator = self.config.get('separator', '/')
         
-        for tag_key, tag_value in tags:
-            full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
-            for exc in exclusions:
-                if full_tag in exc and any(t in exc for t in current_tags):
-                    raise ValueError(f"Tag '{full_tag}' conflicts with existing tags per exclusion rule: {exc}")
-        
-        self.storage.add_tags(file_path, tags)
-        self._log_operation('add_tags', file_path=file_path, tags=tags)
+        # One critical section, so the exclusion check and change records see exactly the tags being replaced
+        with self.lock:
+            current_tags = set(self.get_tags(file_path))
+            for tag_key, tag_value in tags:
+                full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
+                for exc in exclusions:
+                    if full_tag in exc and any(t in exc for t in current_tags):
+                        raise ValueError(f"Tag '{full_tag}' conflicts with existing tags per exclusion rule: {exc}")
+            
+            generation = self.cache.generation
+            self.storage.add_tags(file_path, tags)
+            added = {f"{tag_key}{separator}{tag_value}" if tag_value else tag_key for tag_key, tag_value in tags}
+            self._record_change(file_path, generation, self._mutated(), current_tags, current_tags | added)
+            self.fingerprints.record({file_path: fingerprint(st)})
+            self._log_operation('add_tags', file_path=file_path, tags=tags)
     
     def remove_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
         """Remove tags from a file."""
         file_path = str(Path(file_path).resolve())
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File does not exist: {file_path}")
-        self.storage.remove_tags(file_path, tags)
-        self._log_operation('remove_tags', file_path=file_path, tags=tags)
+        separator = self.config.get('separator', '/')
+        removed = {f"{tag_key}{separator}{tag_value}" if tag_value else tag_key for tag_key, tag_value in tags}
+        with self.lock:
+            current_tags = set(self.storage.get_tags(file_path))
+            generation = self.cache.generation
+            self.storage.remove_tags(file_path, tags)
+            self._record_change(file_path, generation, self._mutated(), current_tags, current_tags - removed)
+            self._log_operation('remove_tags', file_path=file_path, tags=tags)
+    
+    def apply_batch(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Run a JSONL stream of add/remove/rename operations as one write and one undo step.
+        
+        Operations are validated (including exclusions) and coalesced per file
+        in memory; after the write commits, one result per line is yielded.
+        """
+        exclusions = self.config.get('exclusions', [])
+        separator = self.config.get('separator', '/')
+        before: Dict[str, List[str]] = {}  # stored tags of every touched file
+        state: Dict[str, List[str]] = {}  # their tags after the operations so far
+        renames: List[Tuple[str, str]] = []
+        fingerprints = {}
+        results = []
+        with self.lock:
+            for line_no, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    op = parse_op(line)
+                    if op['op'] == 'rename':
+                        renames.append((op['old'], op['new']))
+                        for tags in state.values():
+                            rename_in(tags, op['old'], op['new'])
+                        results.append({'line': line_no, 'op': 'rename', 'status': 'ok'})
+                        continue
+                    file_path = str(Path(op['path']).resolve())
+                    try:
+                        st = os.stat(file_path)
+                    except FileNotFoundError:
+                        raise FileNotFoundError(f"File does not exist: {file_path}")
+                    if file_path not in state:
+                        before[file_path] = self.storage.get_tags(file_path)
+                        state[file_path] = [*before[file_path]]
+                        for old_tag, new_tag in renames:
+                            rename_in(state[file_path], old_tag, new_tag)
+                    tags = state[file_path]
+                    full_tags = [f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
+                                 for tag_key, tag_value in op['tags']]
+                    if op['op'] == 'add':
+                        for full_tag in full_tags:
+                            for exc in exclusions:
+                                if full_tag in exc and any(t in exc for t in tags):
+                                    raise ValueError(f"Tag '{full_tag}' conflicts with existing tags per exclusion rule: {exc}")
+                        tags.extend(tag for tag in dict.fromkeys(full_tags) if tag not in tags)
+                        fingerprints[file_path] = fingerprint(st)
+                    else:
+                        tags[:] = [tag for tag in tags if tag not in full_tags]
+                    results.append({'line': line_no, 'op': op['op'], 'path': file_path, 'status': 'ok'})
+                except (ValueError, FileNotFoundError) as e:
+                    results.append({'line': line_no, 'status': 'error', 'error': str(e)})
+            
+            changed = {file_path: tags for file_path, tags in state.items() if tags != before[file_path]}
+            if renames:
+                # Renames reach untouched files through the same bulk write, not one store save per rename
+                for file_path, tags in self.storage.iter_all_data():
+                    if file_path in state:
+                        continue
+                    renamed = [*tags]
+                    for old_tag, new_tag in renames:
+                        rename_in(renamed, old_tag, new_tag)
+                    if renamed != tags:
+                        before[file_path] = [*tags]
+                        changed[file_path] = renamed
+            if changed:
+                self.storage.bulk_add_tags({file_path: [(tag, '') for tag in tags]
+                                            for file_path, tags in changed.items()}, replace=True)
+                self._mutated()
+                self.fingerprints.record(fingerprints)
+                self._log_operation('batch', files={file_path: before[file_path] for file_path in changed},
+                                    renames=renames, count=sum(r['status'] == 'ok' for r in results))
+        yield from results
     
     def get_tags(self, file_path: str) -> List[str]:
         """Get tags for a file."""
         file_path = str(Path(file_path).resolve())
         return self.storage.get_tags(file_path)
     
-    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False) -> Dict[str, List[str]]:
-        """Search files by tags."""
-        return self.storage.search(query, type_filter, fuzzy)
+    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+               under: Optional[str] = None) -> Dict[str, List[str]]:
+        """Search files by tags, serving repeated queries from the cache."""
+        under = str(Path(under).resolve()) if under else None
+        key = self._cache_key('search', query, type_filter, fuzzy, under)
+        cached = self.cache.get(key)
+        if cached is not MISS:
+            return cached
+        generation = self.cache.generation
+        predicates = self._range_predicates(query, fuzzy)
+        if predicates:
+            results = dict(self._range_search(predicates, type_filter, False, under))
+        else:
+            results = self.storage.search(query, type_filter, fuzzy, under)
+        self.cache.put(key, results, generation)
+        return results
+    
+    def iter_search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    limit: Optional[int] = None, offset: int = 0, sort: bool = False,
+                    under: Optional[str] = None, since: Optional[float] = None,
+                    until: Optional[float] = None) -> Iterator[Tuple[str, List[str]]]:
+        """Stream search results, stopping as soon as ``limit`` rows are produced.
+        
+        With ``since``/``until`` only tags added in that window are matched,
+        found by a range scan of the recency index rather than the cache.
+        """
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("limit and offset must be non-negative")
+        under = str(Path(under).resolve()) if under else None
+        if since is not None or until is not None:
+            return islice(self._iter_window(query, type_filter, fuzzy, sort, under, since, until),
+                          offset, offset + limit if limit is not None else None)
+        key = self._cache_key('search', query, type_filter, fuzzy, under)
+        cached = self.cache.get(key)
+        if cached is not MISS:
+            results = iter(sorted(cached.items()) if sort else cached.items())
+        else:
+            predicates = self._range_predicates(query, fuzzy)
+            if predicates:
+                results = self._range_search(predicates, type_filter, sort, under)
+            else:
+                results = self.storage.iter_search(query, type_filter, fuzzy, sort, under)
+            if limit is None and offset == 0:
+                results = self._iter_and_cache(key, results)
+        stop = offset + limit if limit is not None else None
+        return islice(results, offset, stop)
+    
+    def _iter_window(self, query: str, type_filter: Optional[str], fuzzy: bool, sort: bool,
+                     under: Optional[str], since: Optional[float],
+                     until: Optional[float]) -> Iterator[Tuple[str, List[str]]]:
+        """Files with matching tags added in [since, until), most recently tagged first."""
+        window: Dict[str, List[str]] = {}
+        for file_path, tag, _ in self.storage.iter_recent(since, until, type_filter, under):
+            window.setdefault(file_path, []).append(tag)
+        predicates = self._range_predicates(query, fuzzy)
+        if predicates:
+            candidates = self._range_search(predicates, type_filter, False, under)
+            results = [(p, [t for t in tags if t in window[p]]) for p, tags in candidates if p in window]
+        else:
+            matcher = compile_matcher(query, fuzzy)
+            if matcher is None:
+                return iter(())
+            results = [(p, [t for t in tags if matcher(t)]) for p, tags in window.items()]
+        results = [(p, tags) for p, tags in results if tags]
+        return iter(sorted(results) if sort else results)
+    
+    def recent(self, since: Optional[float] = None, until: Optional[float] = None, limit: Optional[int] = None,
+               type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        """Stream (path, tag, added_at) for recently added tags, newest first."""
+        under = str(Path(under).resolve()) if under else None
+        return islice(self.storage.iter_recent(since, until, type_filter, under), limit)
+    
+    def _range_predicates(self, query: str, fuzzy: bool) -> Optional[List[Tuple[str, str, Any]]]:
+        """Range predicates like 'priority>=3' on keys declared in tag_types, else None."""
+        tag_types = self.config.get('tag_types', {}) or {}
+        if fuzzy or not tag_types:
+            return None
+        return parse_predicates(query, validate_tag_types(tag_types))
+    
+    def _value_stamp(self, generation: str) -> str:
+        """Value index stamp: the store generation plus the settings that shape the columns."""
+        tag_types = self.config.get('tag_types', {}) or {}
+        return f"{generation}|{self.config.get('separator', '/')}|{json.dumps(tag_types, sort_keys=True)}"
+    
+    def _value_columns(self, key: str) -> Dict[str, List]:
+        """Sorted value column for a typed key, rebuilding the value index when the store changed."""
+        tag_types = self.config.get('tag_types', {}) or {}
+        separator = self.config.get('separator', '/')
+        stamp = self._value_stamp(self.cache.generation)
+        index = ValueIndex(self.storage_path, self.codec)
+        if index.stamp != stamp:
+            index.build(self.storage.iter_all_data(), tag_types, separator, stamp)
+        name = f"value_index:{key}"
+        cached = self.indexes.get(name)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, index.load(key))
+            self.indexes.put(name, cached)
+        return cached[1]
+    
+    def _range_search(self, predicates: List[Tuple[str, str, Any]], type_filter: Optional[str], sort: bool,
+                      under: Optional[str]) -> Iterator[Tuple[str, List[str]]]:
+        """Files satisfying every predicate, yielding the matching typed tags."""
+        matches: Optional[Dict[str, List[str]]] = None
+        for key, op, value in predicates:
+            hits = ValueIndex.select(self._value_columns(key), op, value)
+            if matches is None:
+                matches = hits
+            else:
+                matches = {p: matches[p] + [t for t in tags if t not in matches[p]]
+                           for p, tags in hits.items() if p in matches}
+        prefix = dir_prefix(under) if under else None
+        results = ((p, tags) for p, tags in matches.items()
+                   if (not type_filter or extract_type(p) == type_filter)
+                   and (prefix is None or p.startswith(prefix)))
+        return iter(sorted(results)) if sort else results
+    
+    def _iter_and_cache(self, key: str, results: Iterator[Tuple[str, List[str]]]) -> Iterator[Tuple[str, List[str]]]:
+        """Pass results through, caching them once the stream is fully consumed."""
+        generation = self.cache.generation
+        collected = {}
+        for file_path, tags in results:
+            collected[file_path] = tags
+            yield file_path, tags
+        self.cache.put(key, collected, generation)
     
     def batch_apply(self, folder_path: str, tag: Tuple[str, str], type_filter: Optional[str] = None) -> int:
         """Apply tag to files in folder."""
         folder_path = str(Path(folder_path).resolve())
         if not os.path.isdir(folder_path):
             raise NotADirectoryError(f"Folder does not exist: {folder_path}")
-        return self.storage.batch_apply(folder_path, tag, type_filter)
+        with self.lock:
+            try:
+                return self.storage.batch_apply(folder_path, tag, type_filter)
+            finally:
+                self._mutated()
+    
+    def _snapshot(self) -> DirectorySnapshot:
+        """Load the directory snapshot used by incremental scans."""
+        return DirectorySnapshot(existing_path(Path(self.storage_path) / 'scan_snapshot.json', self.codec))
+    
+    def batch_apply_incremental(self, folder_path: str, tag: Tuple[str, str], type_filter: Optional[str] = None,
+                                full: bool = False, chunk_size: int = 500) -> Dict[str, int]:
+        """Apply tag to new or changed files only, skipping directories unchanged since the last run."""
+        folder_path = str(Path(folder_path).resolve())
+        if not os.path.isdir(folder_path):
+            raise NotADirectoryError(f"Folder does not exist: {folder_path}")
+        tag = tuple(tag)
+        snapshot = self._snapshot()
+        signature = snapshot_signature({'tag': tag, 'type': type_filter})
+        files = (entry.path for entry in snapshot.walk(folder_path, signature, full)
+                 if not type_filter or extract_type(entry.name) == type_filter)
+        tagged = 0
+        for chunk in chunked(files, chunk_size):
+            # Each chunk's write and generation bump form one critical section, so single-file
+            # writers never chain change-log deltas onto a generation that hides this write
+            with self.lock:
+                try:
+                    self.storage.bulk_add_tags({file_path: [tag] for file_path in chunk})
+                finally:
+                    self._mutated()
+                self.fingerprints.record(fingerprints_of(chunk))
+            tagged += len(chunk)
+        snapshot.commit()
+        return {'tagged': tagged, 'skipped': snapshot.skipped_files, 'dirs_skipped': snapshot.skipped_dirs}
+    
+    def apply_rules(self, folder_path: str, dry_run: bool = False, chunk_size: int = 500,
+                    incremental: bool = True) -> Dict[str, Any]:
+        """Evaluate all configured rules in one walk and bulk-write the matches."""
+        folder_path = str(Path(folder_path).resolve())
+        if not os.path.isdir(folder_path):
+            raise NotADirectoryError(f"Folder does not exist: {folder_path}")
+        ruleset = RuleSet.from_config(self.config)
+        snapshot = self._snapshot()
+        signature = snapshot_signature({'rules': self.config.get('rules')})
+        # Size and mtime predicates can flip on an edit in place, which leaves the directory unchanged
+        changed = snapshot.walk(folder_path, signature, full=not incremental, stat_files=ruleset.needs_stat)
+        report = {'files': 0, 'tags': 0, 'skipped': 0, 'rules': {rule.name: 0 for rule in ruleset.rules}}
+        for chunk in chunked(ruleset.scan(folder_path, changed), chunk_size):
+            entries = {}
+            for file_path, rules in chunk:
+                tags = []
+                for rule in rules:
+                    report['rules'][rule.name] += 1
+                    tags.extend(tag for tag in rule.tags if tag not in tags)
+                entries[file_path] = tags
+                report['tags'] += len(tags)
+            report['files'] += len(entries)
+            if not dry_run:
+                with self.lock:
+                    try:
+                        self.storage.bulk_add_tags(entries)
+                    finally:
+                        self._mutated()
+                    self.fingerprints.record(fingerprints_of(entries))
+        report['skipped'] = snapshot.skipped_files
+        if not dry_run:
+            snapshot.commit()
+        return report
+    
+    def reconcile(self, roots: Iterable[str] = (), dry_run: bool = False, workers: int = 8) -> Dict[str, Any]:
+        """Drop entries for deleted files and re-attach tags of files that moved under roots.
+        
+        All changes are applied as one bulk mutation; fingerprints of every
+        surviving file are refreshed so later moves can be traced too.
+        """
+        roots = [str(Path(root).resolve()) for root in roots]
+        with self.lock:
+            known = self.fingerprints.load()
+            live: Dict[str, Any] = {}
+            missing = []
+            errors: Dict[str, str] = {}
+            checked = 0
+            for file_path, st in stat_paths((path for path, _ in self.storage.iter_all_data()), workers):
+                checked += 1
+                if st is None:
+                    missing.append(file_path)
+                elif isinstance(st, OSError):
+                    # Neither live nor gone: keep the entry and its last known fingerprint
+                    errors[file_path] = st.strerror or str(st)
+                    if file_path in known:
+                        live[file_path] = known[file_path]
+                else:
+                    live[file_path] = fingerprint(st)
+            wanted = {tuple(known[path][:2]): (path, tuple(known[path])) for path in missing if path in known}
+            found = find_moves(wanted, roots) if roots and wanted else {}
+            moves = {path: found[path][0] if path in found else None for path in missing}
+            if not dry_run:
+                if moves:
+                    self.storage.move_files(moves)
+                    self._mutated()
+                live.update(found.values())
+                self.fingerprints.save(live)
+        return {
+            'checked': checked,
+            'missing': len(missing),
+            'moved': {old: new for old, new in moves.items() if new is not None},
+            'pruned': [path for path, new in moves.items() if new is None],
+            'errors': errors,
+        }
     
     def rename_tag(self, old_tag: str, new_tag: str) -> None:
         """Rename a tag across all files."""
-        self.storage.rename_tag(old_tag, new_tag)
-        self._log_operation('rename_tag', old_tag=old_tag, new_tag=new_tag)
+        with self.lock:
+            self.storage.rename_tag(old_tag, new_tag)
+            self._mutated()
+            self._log_operation('rename_tag', old_tag=old_tag, new_tag=new_tag)
     
     def get_all_tags(self) -> List[str]:
         """Get all unique tags."""
-        return self.storage.get_all_tags()
+        key = self._cache_key('all_tags')
+        cached = self.cache.get(key)
+        if cached is not MISS:
+            return cached
+        generation = self.cache.generation
+        tags = self.storage.get_all_tags()
+        self.cache.put(key, tags, generation)
+        return tags
+    
+    def suggest_tags(self, fragment: str, limit: int = 5) -> List[str]:
+        """Suggest existing tags by prefix, then substring, ranked by frequency."""
+        index = CompletionIndex(self.storage_path).refresh(self.cache.generation, self.storage.iter_all_data)
+        return index.suggest(fragment, limit)
+    
+    def _cooccurrence(self, build: bool = True) -> Optional[CooccurrenceMatrix]:
+        """Tag co-occurrence matrix for the current store generation, rebuilt only when stale.
+        
+        With ``build=False`` a stale matrix is not rebuilt from storage and None is returned.
+        """
+        generation = self.cache.generation
+        cached = self.indexes.get('cooccurrence')
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        store = CooccurrenceIndex(self.storage_path, self.codec)
+        matrix = store.load(generation)
+        if matrix is None:
+            if not build:
+                return None
+            matrix = CooccurrenceMatrix.build(self.storage.iter_all_data())
+            store.save(matrix, generation)
+        self.indexes.put('cooccurrence', (generation, matrix), matrix.nbytes())
+        return matrix
+    
+    def _record_change(self, file_path: str, old_generation: str, new_generation: str,
+                       before: set, after: set) -> None:
+        """Carry a single file's tag change into the co-occurrence matrix and value index instead of invalidating them."""
+        self._record_values(file_path, old_generation, new_generation, before, after)
+        if before == after:
+            return
+        CooccurrenceIndex(self.storage_path, self.codec).append(old_generation, new_generation, before, after)
+        cached = self.indexes.get('cooccurrence')
+        if cached is not None and cached[0] == old_generation:
+            cached[1].apply_change(before, after)
+            self.indexes.put('cooccurrence', (new_generation, cached[1]), cached[1].nbytes())
+    
+    def _record_values(self, file_path: str, old_generation: str, new_generation: str,
+                       before: set, after: set) -> None:
+        """Update the changed keys' value columns, on disk and cached, if they were current."""
+        tag_types = self.config.get('tag_types', {}) or {}
+        if not tag_types:
+            return
+        old_stamp, new_stamp = self._value_stamp(old_generation), self._value_stamp(new_generation)
+        updated = ValueIndex(self.storage_path, self.codec).apply_change(
+            file_path, before, after, tag_types, self.config.get('separator', '/'), old_stamp, new_stamp)
+        if updated is None:
+            return
+        for key in tag_types:
+            name = f"value_index:{key}"
+            cached = self.indexes.get(name)
+            if cached is not None and cached[0] == old_stamp:
+                self.indexes.put(name, (new_stamp, updated.get(key, cached[1])))
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get tag statistics."""
-        tags = self.get_all_tags()
-        tag_counts = {}
-        for tag in tags:
+    def related_tags(self, tag: str, limit: int = 10) -> List[Tuple[str, int, float]]:
+        """Tags most often applied together with ``tag``: (tag, shared files, similarity)."""
+        return self._cooccurrence().related(tag, limit)
+    
+    def suggest_related(self, tags: Iterable[str], limit: int = 5, build: bool = True) -> List[str]:
+        """Tags that usually accompany the given ones; with ``build=False``, none unless the matrix is current."""
+        matrix = self._cooccurrence(build)
+        return matrix.suggest(tags, limit) if matrix is not None else []
+    
+    def cooccurrence_stats(self, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """Most frequent tag pairs."""
+        return self._cooccurrence().top_pairs(limit)
+    
+    def export_data(self) -> Iterator[Tuple[str, List[str]]]:
+        """Stream all (path, tags) records from storage."""
+        return self.storage.iter_all_data()
+    
+    def import_data(self, records: Iterable[Tuple[str, List[str]]], mode: str = 'merge',
+                    dry_run: bool = False, chunk_size: int = 500,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """Bulk-load records in chunks; 'replace' overwrites the tags of imported files."""
+        if mode not in ('merge', 'replace'):
+            raise ValueError(f"Unknown import mode: {mode}")
+        totals = {'files': 0, 'tags': 0, 'skipped': 0}
+        # A file may span chunks, so only its first occurrence in the stream replaces; later ones merge
+        seen = set()
+        for chunk in chunked(records, chunk_size):
+            first: Dict[str, List[Tuple[str, str]]] = {}
+            again: Dict[str, List[Tuple[str, str]]] = {}
+            for file_path, tags in chunk:
+                target = again if file_path in seen and file_path not in first else first
+                target.setdefault(file_path, []).extend((tag, '') for tag in tags)
+                seen.add(file_path)
+            if not dry_run:
+                with self.lock:
+                    try:
+                        for entries, replace in ((first, mode == 'replace'), (again, False)):
+                            if entries:
+                                skipped = self.storage.bulk_add_tags(entries, replace=replace)
+                                totals['skipped'] += skipped or 0
+                    finally:
+                        self._mutated()
+                    # Imported paths that do not exist here simply get no fingerprint
+                    self.fingerprints.record(fingerprints_of({**first, **again}))
+            totals['tags'] += sum(len(tags) for _, tags in chunk)
+            if progress:
+                progress(len(chunk))
+        totals['files'] = len(seen)
+        return totals
+    
+    def get_stats(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Get tag statistics, optionally only for tags added in [since, until)."""
+        if since is not None or until is not None:
+            return self._window_stats(since, until)
+        key = self._cache_key('stats')
+        cached = self.cache.get(key)
+        if cached is not MISS:
+            return cached
+        generation = self.cache.generation
+        tag_counts = self.tag_counts()
+        stats = {
+            'total_tags': sum(tag_counts.values()),
+            'unique_tags': len(tag_counts),
+            'top_tags': sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        }
+        self.cache.put(key, stats, generation)
+        return stats
+    
+    def tag_counts(self) -> Dict[str, int]:
+        """Number of files carrying each tag, as ranked by get_stats."""
+        return CompletionIndex.count_tags(self.storage.iter_all_data())
+    
+    def _window_stats(self, since: Optional[float], until: Optional[float]) -> Dict[str, Any]:
+        """Statistics over the tags added in a time window, from the recency index."""
+        tag_counts: Dict[str, int] = {}
+        files = set()
+        for file_path, tag, _ in self.storage.iter_recent(since, until):
             tag_counts[tag] = tag_counts.get(tag, 0) + 1
+            files.add(file_path)
         return {
-            'total_tags': len(tags),
-            'unique_tags': len(set(tags)),
+            'total_tags': sum(tag_counts.values()),
+            'unique_tags': len(tag_counts),
+            'files': len(files),
             'top_tags': sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
         }
     
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Memory residency and hit rates of in-memory indexes and caches."""
+        stats = self.indexes.stats()
+        stats['query_cache'] = {'hits': self.cache.hits, 'misses': self.cache.misses}
+        return stats
+    
+    def compact(self, codec: Optional[str] = None) -> Dict[str, Any]:
+        """Convert the store and its sidecar files to a codec (default: the configured one).
+        
+        SQLite databases are left as they are; their sidecars are converted.
+        """
+        codec = resolve_codec(codec if codec is not None else self.config.get('compression', 'none'))
+        storage_dir = Path(self.storage_path)
+        bases = [storage_dir / name for name in ('tags.md', 'tag_history.json', 'scan_snapshot.json', BASE_FILE)]
+        # Value index columns: <key>.json, possibly already compressed
+        bases += sorted({path.with_name(path.name.split('.json')[0] + '.json')
+                         for path in (storage_dir / INDEX_DIR).glob('*.json*')})
+        report = {'codec': codec or 'none', 'files': 0, 'bytes_before': 0, 'bytes_after': 0}
+        fsync = bool(self.config.get('fsync_writes', True))
+        with self.lock:
+            for base in bases:
+                for path in [path for path in variants(base) if path.exists()]:
+                    report['files'] += 1
+                    report['bytes_before'] += path.stat().st_size
+                    report['bytes_after'] += convert(path, codec, fsync).stat().st_size
+            # Append-only logs stay plain; fold compressed ones left by earlier versions back in
+            for base in (storage_dir / FINGERPRINT_FILE, storage_dir / LOG_FILE):
+                if any(path != base for path in log_variants(base)):
+                    report['files'] += 1
+                    report['bytes_before'] += sum(path.stat().st_size for path in log_variants(base))
+                    report['bytes_after'] += rewrite_log(base, iter_log(base), fsync).stat().st_size
+            # Reopen everything under the new file names
+            if hasattr(self.storage, 'close'):
+                self.storage.close()
+            self.storage = StorageFactory.create(self.config)
+            self._resolve_history_file()
+        return report
+    
+    def rebuild_index(self, roots: List[str], workers: int = 8) -> int:
+        """Rebuild the xattr central index from the attributes under roots."""
+        if not hasattr(self.storage, 'rebuild_index'):
+            raise ValueError("reindex is only available with xattr storage")
+        with self.lock:
+            try:
+                return self.storage.rebuild_index(roots, workers=workers)
+            finally:
+                self._mutated()
+    
+    def migrate_to(self, new_storage, chunk_size: int = 500) -> Dict[str, int]:
+        """Stream every record into another backend in bulk chunks, counting files and those it had to skip."""
+        totals = {'files': 0, 'skipped': 0}
+        with self.lock:
+            try:
+                for chunk in chunked(self.storage.iter_all_data(), chunk_size):
+                    # Attribute backends skip files that no longer exist rather than abort the migration
+                    skipped = new_storage.bulk_add_tags({file_path: [(tag, '') for tag in tags]
+                                                         for file_path, tags in chunk})
+                    totals['files'] += len(chunk)
+                    totals['skipped'] += skipped or 0
+            finally:
+                # Backends share the store's generation, so this also invalidates results cached for the target
+                self._mutated()
+        return totals
+    
     def relocate_storage(self, new_path: str) -> None:
         """Relocate storage files to new path, handling DB locks."""
         current_path = self.config.get_storage_path()
@@ -133,6 +707,8 @@ class TagEngine:
         
         if self.config.get('storage') == 'db':
             # Close DB connections to avoid locks
+            if hasattr(self.storage, 'close'):
+                self.storage.close()
             if hasattr(self.storage, 'Session'):
                 self.storage.Session.close_all()
             if hasattr(self.storage, 'engine'):
@@ -0,0 +1,150 @@
+"""
+Federated queries across several tag stores.
+Each configured root gets its own engine; queries fan out to all roots on a
+thread pool and the per-root path-sorted streams are merged lazily, so
+duplicates across stores collapse into one result without buffering.
+"""
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .engine import TagEngine
+
+CHUNK = 256  # results handed from a root's worker to the merger at a time
+QUEUE_CHUNKS = 16  # chunks buffered per root before its worker waits for the merger
+_DONE = object()
+
+class FederatedEngine:
+    """Runs searches, stats and exports against every configured storage root concurrently."""
+
+    def __init__(self, config, workers: Optional[int] = None):
+        roots = config.get('federation', []) or []
+        if not roots:
+            raise ValueError("No federation roots configured (set 'federation' in the config)")
+        self.roots: List[Tuple[str, TagEngine]] = []
+        for root in roots:
+            name = root.get('name') or root.get('path')
+            if any(name == existing for existing, _ in self.roots):
+                raise ValueError(f"Duplicate federation root name: {name}")
+            self.roots.append((name, TagEngine(config.for_root(root))))
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(self.roots), thread_name_prefix='federation')
+        # Per-root {'seconds', 'results', 'error'} for the most recent operation
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def close(self) -> None:
+        """Stop worker threads and release every root's storage."""
+        self.executor.shutdown(wait=True)
+        for _, engine in self.roots:
+            if hasattr(engine.storage, 'close'):
+                engine.storage.close()
+
+    def _produce(self, name: str, produce: Callable[[], Iterator], out: queue.Queue,
+                 stop: threading.Event) -> None:
+        """Worker: stream one root's results into its queue in chunks, recording timing."""
+        start = time.perf_counter()
+        count = 0
+        error = None
+        try:
+            chunk = []
+            for item in produce():
+                chunk.append(item)
+                if len(chunk) >= CHUNK:
+                    if not self._put(out, chunk, stop):
+                        return
+                    count += len(chunk)
+                    chunk = []
+            count += len(chunk)
+            self._put(out, chunk, stop)
+        except Exception as e:  # one failing store must not sink the whole query
+            error = str(e)
+        finally:
+            self.timings[name] = {'seconds': time.perf_counter() - start, 'results': count, 'error': error}
+            self._put(out, _DONE, stop)
+
+    @staticmethod
+    def _put(out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Blocking put that gives up once the consumer has stopped reading."""
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _drain(name: str, out: queue.Queue) -> Iterator[Tuple[str, List[str], str]]:
+        """Consume one root's queue as (path, tags, root name) rows."""
+        while True:
+            chunk = out.get()
+            if chunk is _DONE:
+                return
+            for path, tags in chunk:
+                yield path, tags, name
+
+    def _fan_out(self, produce: Callable[[TagEngine], Iterator[Tuple[str, List[str]]]]
+                 ) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Merge path-sorted (path, tags) streams from every root into (path, tags, roots)."""
+        self.timings = {}
+        stop = threading.Event()
+        streams = []
+        for name, engine in self.roots:
+            out: queue.Queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+            self.executor.submit(self._produce, name, lambda engine=engine: produce(engine), out, stop)
+            streams.append(self._drain(name, out))
+        try:
+            for path, group in groupby(heapq.merge(*streams, key=lambda row: row[0]), key=lambda row: row[0]):
+                tags: List[str] = []
+                roots: List[str] = []
+                for _, root_tags, name in group:
+                    tags += [tag for tag in root_tags if tag not in tags]
+                    roots.append(name)
+                yield path, tags, roots
+        finally:
+            stop.set()  # release workers still blocked on a full queue after an early stop
+
+    def iter_search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    under: Optional[str] = None, since: Optional[float] = None,
+                    until: Optional[float] = None) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Stream (path, tags, roots) matches from all roots, sorted by path and deduplicated."""
+        return self._fan_out(lambda engine: engine.iter_search(query, type_filter, fuzzy, sort=True, under=under,
+                                                               since=since, until=until))
+
+    def export_data(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Stream every tagged file from all roots, merged by path."""
+        # Straight from storage: the engine would cache the full result set
+        return self._fan_out(lambda engine: engine.storage.iter_search('*', sort=True))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Combined tag statistics plus per-root figures."""
+        def root_stats(name: str, engine: TagEngine) -> Tuple[Dict[str, Any], Dict[str, int]]:
+            start = time.perf_counter()
+            try:
+                result = engine.get_stats(), engine.tag_counts()
+                self.timings[name] = {'seconds': time.perf_counter() - start,
+                                      'results': result[0]['total_tags'], 'error': None}
+                return result
+            except Exception as e:
+                self.timings[name] = {'seconds': time.perf_counter() - start, 'results': 0, 'error': str(e)}
+                return {'total_tags': 0, 'unique_tags': 0, 'top_tags': []}, {}
+
+        self.timings = {}
+        futures = {name: self.executor.submit(root_stats, name, engine) for name, engine in self.roots}
+        tag_counts: Dict[str, int] = {}
+        per_root = {}
+        for name, future in futures.items():
+            stats, counts = future.result()
+            per_root[name] = stats
+            # Merge full counts: a tag outside every root's top 10 can still lead overall
+            for tag, count in counts.items():
+                tag_counts[tag] = tag_counts.get(tag, 0) + count
+        return {
+            'total_tags': sum(stats['total_tags'] for stats in per_root.values()),
+            'unique_tags': len(tag_counts),
+            'top_tags': sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10],
+            'roots': per_root,
+        }
@@ -0,0 +1,109 @@
+"""
+Crash- and concurrency-safe file updates.
+Writers replace files atomically (temp file + os.replace) and serialize
+read-modify-write cycles with a cross-process lock; readers take no lock
+and always see either the old or the new complete file.
+"""
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # no POSIX file locks (Windows): lock within the process only
+    fcntl = None
+
+@contextmanager
+def atomic_open(path: Union[str, Path], mode: str = 'w', fsync: bool = False) -> Iterator[IO]:
+    """Open a temp file that replaces ``path`` only when the block completes.
+
+    Readers never observe a partial file. With ``fsync`` the data and the
+    directory entry are flushed to disk first, so the update also survives
+    a power loss.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            # mkstemp creates 0600; keep the permissions the file already had
+            try:
+                os.fchmod(f.fileno(), os.stat(path).st_mode & 0o777)
+            except FileNotFoundError:
+                os.fchmod(f.fileno(), 0o644)
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def atomic_write(path: Union[str, Path], data: Union[str, bytes], fsync: bool = False) -> None:
+    """Replace ``path`` with ``data`` atomically."""
+    with atomic_open(path, 'wb' if isinstance(data, bytes) else 'w', fsync) as f:
+        f.write(data)
+
+class WriterLock:
+    """Reentrant exclusive lock shared by threads and processes writing one store.
+
+    Use ``WriterLock.for_path`` so every user in a process shares one
+    instance: flock locks taken through separate descriptors would block
+    each other even within the same process.
+    """
+
+    _instances: Dict[str, 'WriterLock'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @classmethod
+    def for_path(cls, path: Union[str, Path]) -> 'WriterLock':
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key)
+            return cls._instances[key]
+
+    def __enter__(self) -> 'WriterLock':
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+LOCK_FILE = '.tagg.lock'
+
+def store_lock(storage_path: Union[str, Path]) -> WriterLock:
+    """The writer lock guarding the store kept in ``storage_path``."""
+    return WriterLock.for_path(Path(storage_path) / LOCK_FILE)
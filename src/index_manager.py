@@ -0,0 +1,152 @@
+"""
+Memory-budgeted registry for in-memory indexes and caches.
+Structures are tracked by approximate size against index_memory_mb; when
+the budget is exceeded the least recently used ones are spilled to on-disk
+segments and reloaded on the next access. A structure larger than the whole
+budget is not kept at all, so its owner rebuilds or streams it per use.
+"""
+import atexit
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+def estimate_size(obj: Any) -> int:
+    """Approximate deep size in bytes of containers, strings and plain objects."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.append(vars(item))
+    return total
+
+class IndexManager:
+    """LRU registry keeping registered structures within a memory budget."""
+
+    _instances: Dict[str, 'IndexManager'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, budget_mb: float, spill_dir: Path):
+        self.budget = int(budget_mb * 1024 * 1024)
+        # Per-process segment directory so concurrent processes never share spill files
+        self.spill_dir = Path(spill_dir) / str(os.getpid())
+        self._resident: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._spilled: Dict[str, Tuple[Path, int]] = {}
+        self._lock = threading.RLock()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.spills = 0
+        self.rejected = 0
+        atexit.register(shutil.rmtree, self.spill_dir, True)
+
+    @classmethod
+    def for_config(cls, config, storage_path: Optional[str] = None) -> 'IndexManager':
+        """Shared manager per storage location, sized by index_memory_mb."""
+        storage_path = str(storage_path or config.get_storage_path())
+        with cls._instances_lock:
+            if storage_path not in cls._instances:
+                budget_mb = float(config.get('index_memory_mb', 50))
+                cls._instances[storage_path] = cls(budget_mb, Path(storage_path) / '.index_segments')
+            return cls._instances[storage_path]
+
+    def put(self, name: str, value: Any, nbytes: Optional[int] = None) -> bool:
+        """Register or replace a structure, evicting colder ones if over budget. Returns whether it was kept."""
+        with self._lock:
+            self.discard(name)
+            size = estimate_size(value) if nbytes is None else nbytes
+            self._resident[name] = (value, size)
+            self.used += size
+            self._enforce(keep=name)
+            return name in self._resident
+
+    def resize(self, name: str, nbytes: int) -> None:
+        """Update the recorded size of a resident structure that grew or shrank in place."""
+        with self._lock:
+            if name in self._resident:
+                value, size = self._resident[name]
+                self._resident[name] = (value, nbytes)
+                self.used += nbytes - size
+                self._enforce(keep=name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return a structure, reloading it from its segment if it was spilled."""
+        with self._lock:
+            if name in self._resident:
+                self._resident.move_to_end(name)
+                self.hits += 1
+                return self._resident[name][0]
+            if name not in self._spilled:
+                self.misses += 1
+                return default
+            path, size = self._spilled.pop(name)
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            path.unlink()
+            self.reloads += 1
+            self._resident[name] = (value, size)
+            self.used += size
+            self._enforce(keep=name)
+            return value
+
+    def discard(self, name: str) -> None:
+        """Forget a structure, resident or spilled."""
+        with self._lock:
+            if name in self._resident:
+                self.used -= self._resident.pop(name)[1]
+            if name in self._spilled:
+                self._spilled.pop(name)[0].unlink(missing_ok=True)
+
+    def _enforce(self, keep: str) -> None:
+        """Spill least recently used structures until within budget."""
+        if keep in self._resident and self._resident[keep][1] > self.budget:
+            # Spilling it would only reload it on the next access, so drop it instead
+            self.used -= self._resident.pop(keep)[1]
+            self.rejected += 1
+        while self.used > self.budget:
+            victim = next((name for name in self._resident if name != keep), None)
+            if victim is None:
+                break
+            value, size = self._resident.pop(victim)
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spill_dir / (hashlib.sha1(victim.encode()).hexdigest() + '.seg')
+            with open(path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._spilled[victim] = (path, size)
+            self.used -= size
+            self.spills += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Residency and hit-rate counters."""
+        with self._lock:
+            lookups = self.hits + self.reloads + self.misses
+            return {
+                'budget_bytes': self.budget,
+                'resident_bytes': self.used,
+                'resident': [*self._resident],
+                'spilled': [*self._spilled],
+                'spilled_bytes': sum(size for _, size in self._spilled.values()),
+                'hits': self.hits,
+                'reloads': self.reloads,
+                'misses': self.misses,
+                'spills': self.spills,
+                'rejected': self.rejected,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,35 @@
+"""
+Timestamps for tag associations.
+Add times are kept as second-resolution ISO-8601 UTC strings, which sort
+chronologically, so time-ordered indexes can bisect them directly.
+"""
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+DURATION = re.compile(r'^(\d+)([smhdw])$')
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def utc_iso(timestamp: Optional[float] = None) -> str:
+    """Format a POSIX timestamp (default: now) as 'YYYY-MM-DDTHH:MM:SSZ'."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() if timestamp is None else timestamp))
+
+def iso_to_timestamp(text: str) -> float:
+    """Parse a stored UTC timestamp back to POSIX seconds."""
+    return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+
+def parse_time_spec(text: str, now: Optional[float] = None) -> float:
+    """Parse a relative age ('90s', '30m', '1h', '2d', '1w') or an ISO date/datetime (local time)."""
+    match = DURATION.match(text.strip())
+    if match:
+        now = time.time() if now is None else now
+        return now - int(match[1]) * UNIT_SECONDS[match[2]]
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time '{text}': use an age like 1h/2d or an ISO date")
+
+def to_utc_datetime(timestamp: float) -> datetime:
+    """Naive UTC datetime, the form stored in database timestamp columns."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,104 @@
+"""
+Garbage collection of stale entries and reconciliation of moved files.
+Stored paths are stat'ed in parallel batches; files that moved are found again
+by the (inode, device, size, mtime) fingerprint recorded when they were tagged.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from .compression import iter_log, open_append, rewrite_log
+
+FINGERPRINT_FILE = 'fingerprints.log'
+STAT_BATCH = 1024
+
+Fingerprint = Tuple[int, int, int, int]
+
+def fingerprint(st: os.stat_result) -> Fingerprint:
+    """Identity of a file that survives renames within a filesystem."""
+    return st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns
+
+StatResult = Union[os.stat_result, OSError, None]
+
+def _stat(file_path: str) -> StatResult:
+    try:
+        return os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    except OSError as e:
+        return e  # e.g. permission denied: the file may still exist
+
+def stat_paths(paths: Iterable[str], workers: int = 8) -> Iterator[Tuple[str, StatResult]]:
+    """Yield (path, stat result, None if missing, or the OSError if unknown) using a thread pool, in batches."""
+    pending = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = [*islice(pending, STAT_BATCH)]
+            if not batch:
+                break
+            yield from zip(batch, pool.map(_stat, batch))
+
+def find_moves(wanted: Dict[Tuple[int, int], Tuple[str, Fingerprint]],
+               roots: List[str]) -> Dict[str, Tuple[str, Fingerprint]]:
+    """Walk roots for files matching missing entries' fingerprints: {old path: (new path, fingerprint)}.
+
+    ``wanted`` maps (inode, device) to the missing path and its recorded
+    fingerprint. Only entries whose inode matches are stat'ed; size and
+    mtime must match too, so a reused inode is not mistaken for the file.
+    """
+    moves = {}
+    inodes = {ino for ino, _ in wanted}
+    stack = [*roots]
+    while stack and len(moves) < len(wanted):
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.inode() in inodes and entry.is_file(follow_symlinks=False):
+                        current = fingerprint(entry.stat(follow_symlinks=False))
+                        match = wanted.get(current[:2])
+                        if match and match[1] == current and match[0] not in moves:
+                            moves[match[0]] = (entry.path, current)
+        except OSError:
+            continue  # unreadable or vanished directory
+    return moves
+
+def fingerprints_of(paths: Iterable[str], workers: int = 8) -> Dict[str, Fingerprint]:
+    """Fingerprints of the paths that can be stat'ed, keyed by resolved path."""
+    return {path: fingerprint(st) for path, st in stat_paths((str(Path(p).resolve()) for p in paths), workers)
+            if isinstance(st, os.stat_result)}
+
+class FingerprintLog:
+    """Append-only sidecar of ``[path, inode, device, size, mtime_ns]`` JSON lines; the last line per path wins.
+
+    Always plain text (see ``compression``); compressed logs from earlier versions are still read.
+    """
+
+    def __init__(self, storage_path: str):
+        self.path = Path(storage_path) / FINGERPRINT_FILE
+
+    def load(self) -> Dict[str, Fingerprint]:
+        """Latest recorded fingerprint of every path."""
+        fingerprints = {}
+        for line in iter_log(self.path):
+            try:
+                file_path, *values = json.loads(line)
+            except ValueError:
+                continue  # torn final line from an interrupted append
+            fingerprints[file_path] = tuple(values)
+        return fingerprints
+
+    def record(self, fingerprints: Dict[str, Fingerprint]) -> None:
+        """Append fingerprints for newly tagged files."""
+        if not fingerprints:
+            return
+        with open_append(self.path) as f:
+            f.writelines(json.dumps([file_path, *values]) + '\n' for file_path, values in fingerprints.items())
+
+    def save(self, fingerprints: Dict[str, Fingerprint]) -> None:
+        """Rewrite the log with exactly these fingerprints."""
+        rewrite_log(self.path, (json.dumps([file_path, *values]) + '\n' for file_path, values in fingerprints.items()))
@@ -0,0 +1,127 @@
+"""
+Rule-based auto-tagging.
+Rules come from the 'rules' config list and are compiled into one matcher
+that is evaluated against every file in a single directory walk.
+"""
+import fnmatch
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+RULE_KEYS = {'name', 'glob', 'extension', 'min_size', 'max_size',
+             'modified_after', 'modified_before', 'path_regex', 'tags'}
+
+def parse_tag(tag: str) -> Tuple[str, str]:
+    """Split a 'key:value' tag string the same way the CLI does."""
+    return tuple(tag.split(':', 1)) if ':' in tag else (tag, '')
+
+def _to_timestamp(value: Any) -> float:
+    """Convert a config date/datetime/ISO string/number to a POSIX timestamp."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    raise ValueError(f"Invalid date value: {value!r}")
+
+def extract_type(name: str) -> str:
+    """Extract the extension the way storage backends derive file type."""
+    return os.path.splitext(name)[1].lstrip('.').lower() or 'unknown'
+
+class Rule:
+    """A single compiled rule: predicates on a file plus the tags to apply."""
+
+    def __init__(self, spec: Dict[str, Any], index: int = 0):
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+        if not spec.get('tags'):
+            raise ValueError(f"Rule {spec.get('name', index)} has no tags")
+        self.name = str(spec.get('name', f"rule{index + 1}"))
+        tags = spec['tags']
+        self.tags = [parse_tag(tag) for tag in ([tags] if isinstance(tags, str) else tags)]
+
+        extensions = spec.get('extension')
+        if isinstance(extensions, str):
+            extensions = [extensions]
+        self.extensions = {ext.lstrip('.').lower() for ext in extensions} if extensions else None
+        self.glob = re.compile(fnmatch.translate(spec['glob'])) if spec.get('glob') else None
+        self.path_regex = re.compile(spec['path_regex']) if spec.get('path_regex') else None
+        self.min_size = spec.get('min_size')
+        self.max_size = spec.get('max_size')
+        self.modified_after = _to_timestamp(spec['modified_after']) if spec.get('modified_after') is not None else None
+        self.modified_before = _to_timestamp(spec['modified_before']) if spec.get('modified_before') is not None else None
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size,
+                                                      self.modified_after, self.modified_before))
+
+    def matches(self, entry: os.DirEntry) -> bool:
+        """Check the non-extension predicates against a directory entry."""
+        if self.glob and not self.glob.match(entry.name):
+            return False
+        if self.path_regex and not self.path_regex.search(entry.path):
+            return False
+        if self.needs_stat:
+            st = entry.stat()  # cached on the DirEntry, so at most one stat per file
+            if self.min_size is not None and st.st_size < self.min_size:
+                return False
+            if self.max_size is not None and st.st_size > self.max_size:
+                return False
+            if self.modified_after is not None and st.st_mtime < self.modified_after:
+                return False
+            if self.modified_before is not None and st.st_mtime >= self.modified_before:
+                return False
+        return True
+
+class RuleSet:
+    """All configured rules, dispatched by extension so each file sees only candidate rules."""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.needs_stat = any(rule.needs_stat for rule in rules)
+        self._by_extension: Dict[str, List[Rule]] = {}
+        self._any_extension: List[Rule] = []
+        for rule in rules:
+            if rule.extensions is None:
+                self._any_extension.append(rule)
+            else:
+                for ext in rule.extensions:
+                    self._by_extension.setdefault(ext, []).append(rule)
+
+    @classmethod
+    def from_config(cls, config) -> 'RuleSet':
+        """Compile the 'rules' list from config."""
+        specs = config.get('rules') or []
+        if not isinstance(specs, list):
+            raise ValueError("'rules' must be a list of rule definitions")
+        return cls([Rule(spec, i) for i, spec in enumerate(specs)])
+
+    def match(self, entry: os.DirEntry) -> List[Rule]:
+        """Return every rule matching a file."""
+        candidates = self._by_extension.get(extract_type(entry.name), [])
+        return [rule for rule in (*candidates, *self._any_extension) if rule.matches(entry)]
+
+    def scan(self, folder_path: str, entries: Optional[Iterable[os.DirEntry]] = None) -> Iterator[Tuple[str, List[Rule]]]:
+        """Walk folder once (or consume given entries), yielding (path, matching rules)."""
+        for entry in entries if entries is not None else walk_files(folder_path):
+            matched = self.match(entry)
+            if matched:
+                yield entry.path, matched
+
+def walk_files(folder_path: str) -> Iterator[os.DirEntry]:
+    """Iteratively walk a tree with scandir, yielding regular file entries."""
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except (PermissionError, FileNotFoundError):
+            continue
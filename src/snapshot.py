@@ -0,0 +1,90 @@
+"""
+Directory snapshot cache for incremental scans.
+Remembers each directory's mtime and entry count per applied tag/rule set,
+so repeat runs only look at new or changed files.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from .compression import open_read, open_write
+
+# Filesystem timestamps can lag the wall clock (coarse kernel ticks, 2s on FAT),
+# so treat anything within this window of the previous scan as new.
+CTIME_SLACK_NS = 2_000_000_000
+
+def snapshot_signature(applied: Any) -> str:
+    """Stable short hash identifying the tag or rule set being applied."""
+    encoded = json.dumps(applied, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+class DirectorySnapshot:
+    """Per-directory scan state persisted next to the store."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # directory -> signature -> [mtime_ns, entry_count, scanned_at_ns]
+        self.dirs: Dict[str, Dict[str, List[int]]] = self._load()
+        self._staged: Dict[str, Dict[str, List[int]]] = {}
+        self.skipped_files = 0
+        self.skipped_dirs = 0
+
+    def _load(self) -> Dict[str, Dict[str, List[int]]]:
+        """Load the snapshot file, starting fresh if it is missing or unreadable."""
+        if self.path.exists():
+            try:
+                with open_read(self.path) as f:
+                    return json.load(f).get('dirs', {})
+            except (ValueError, OSError):
+                pass
+        return {}
+
+    def walk(self, folder_path: str, signature: str, full: bool = False,
+             stat_files: bool = False) -> Iterator[os.DirEntry]:
+        """Yield file entries that are new or changed since the last run with this signature.
+
+        A directory whose mtime and entry count match the snapshot has had no
+        files added, removed or renamed, so its files are skipped. In a changed
+        directory only files whose ctime is newer than the previous scan are
+        yielded. Edits in place do not touch the directory, so callers whose
+        matching depends on size or mtime pass stat_files to apply the ctime
+        check in unchanged directories too. Subdirectories are always descended
+        into, since changes deep in a tree do not touch the parent's mtime.
+        """
+        stack = [folder_path]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                scanned_at = time.time_ns() - CTIME_SLACK_NS
+                with os.scandir(directory) as it:
+                    entries = [*it]
+            except (PermissionError, FileNotFoundError):
+                continue
+
+            previous = None if full else self.dirs.get(directory, {}).get(signature)
+            unchanged = previous is not None and previous[:2] == [mtime_ns, len(entries)]
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    if (unchanged and not stat_files) or (previous is not None and entry.stat().st_ctime_ns < previous[2]):
+                        self.skipped_files += 1
+                    else:
+                        yield entry
+            if unchanged:
+                self.skipped_dirs += 1
+                if not stat_files:
+                    scanned_at = previous[2]
+            self._staged.setdefault(directory, {})[signature] = [mtime_ns, len(entries), scanned_at]
+
+    def commit(self) -> None:
+        """Merge the directories seen by walk() into the snapshot and save it."""
+        for directory, signatures in self._staged.items():
+            self.dirs.setdefault(directory, {}).update(signatures)
+        self._staged = {}
+        with open_write(self.path) as f:
+            json.dump({'version': 1, 'dirs': self.dirs}, f)
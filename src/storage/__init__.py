@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Iterator, Optional
 from .markdown import MarkdownStorage
 # from .database import DatabaseStorage
 
@@ -13,7 +13,13 @@ class StorageInterface(ABC):
         pass
     
     @abstractmethod
-    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False) -> Dict[str, List[str]]:
+    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+               under: Optional[str] = None) -> Dict[str, List[str]]:
+        pass
+    
+    @abstractmethod
+    def iter_search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    sort: bool = False, under: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
         pass
     
     @abstractmethod
@@ -35,10 +41,30 @@ class StorageInterface(ABC):
     @abstractmethod
     def get_all_data(self) -> Dict[str, List[str]]:
         pass
+    
+    @abstractmethod
+    def iter_all_data(self) -> Iterator[Tuple[str, List[str]]]:
+        pass
+    
+    @abstractmethod
+    def iter_recent(self, since: Optional[float] = None, until: Optional[float] = None,
+                    type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        pass
+    
+    @abstractmethod
+    def bulk_add_tags(self, entries: Dict[str, List[Tuple[str, str]]], replace: bool = False) -> Optional[int]:
+        pass
+    
+    @abstractmethod
+    def move_files(self, moves: Dict[str, Optional[str]]) -> None:
+        pass
 
 class StorageFactory:
     @staticmethod
     def create(config):
         if config.get('storage') == 'db':
             raise ValueError("Database storage not available")
+        if config.get('storage') == 'xattr':
+            from .xattr import XattrStorage
+            return XattrStorage(config)
         return MarkdownStorage(config)
\ No newline at end of file
@@ -3,12 +3,23 @@ Database storage backend using SQLite.
 Provides fast queries for large datasets.
 """
 import os
-import re
+import time
+from datetime import timezone
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Table
+from typing import List, Tuple, Dict, Iterator, Optional
+import threading
+from itertools import groupby
+from sqlalchemy import create_engine, event, literal, select, delete, Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from .interfaces import StorageInterface
+from .writequeue import GroupCommitQueue
+from .indexes import dir_prefix
+from .parallel import ParallelScanner
+from ..recency import to_utc_datetime
+
+# Stay well below SQLite's bound-parameter limit in IN (...) lookups
+IN_CHUNK = 500
 
 Base = declarative_base()
 
@@ -16,14 +27,14 @@ Base = declarative_base()
 file_tags = Table('file_tags', Base.metadata,
     Column('file_id', Integer, ForeignKey('files.id'), primary_key=True),
     Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
-    Column('added_at', DateTime, default=None)
+    Column('added_at', DateTime, default=None, index=True)
 )
 
 class File(Base):
     __tablename__ = 'files'
     id = Column(Integer, primary_key=True)
     path = Column(String, unique=True, nullable=False)
-    type = Column(String, nullable=False)
+    type = Column(String, nullable=False, index=True)
     tags = relationship('Tag', secondary=file_tags, back_populates='files')
 
 class Tag(Base):
@@ -38,6 +49,14 @@ class Exclusion(Base):
     tag1_id = Column(Integer, ForeignKey('tags.id'), nullable=False)
     tag2_id = Column(Integer, ForeignKey('tags.id'), nullable=False)
 
+class Meta(Base):
+    __tablename__ = 'meta'
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+# Bumped whenever a tag name is reassigned, invalidating cached name -> id lookups
+TAG_EPOCH = 'tag_epoch'
+
 class DatabaseStorage(StorageInterface):
     """Storage implementation using SQLite database."""
     
@@ -46,101 +65,198 @@ class DatabaseStorage(StorageInterface):
         storage_path = Path(config.get_storage_path())
         db_path = storage_path / "tags.db"
         db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.engine = create_engine(f'sqlite:///{db_path}', connect_args={'timeout': 30})
+        event.listen(self.engine, 'connect', self._on_connect)
         Base.metadata.create_all(self.engine)
+        # create_all skips indexes added to tables that already exist
+        for index in (*File.__table__.indexes, *file_tags.indexes):
+            index.create(self.engine, checkfirst=True)
         self.Session = sessionmaker(bind=self.engine)
+        # name -> id lookups are cached in-process until any process renames a tag
+        self._tag_ids: Dict[str, int] = {}
+        self._tag_epoch: Optional[int] = None
+        self._tag_ids_lock = threading.Lock()
+        interval_ms = float(config.get('db_group_commit_ms', 2))
+        self.write_queue = GroupCommitQueue(self._commit_ops, interval_ms) if interval_ms > 0 else None
+        self.scanner = ParallelScanner.from_config(config)
+    
+    @staticmethod
+    def _on_connect(dbapi_connection, connection_record):
+        """WAL lets readers proceed while the committer thread writes."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.close()
     
     def _extract_type(self, file_path):
         return Path(file_path).suffix.lstrip('.').lower() or 'unknown'
     
     def add_tags(self, file_path, tags):
-        file_path = str(Path(file_path).resolve())
-        session = self.Session()
-        try:
-            # Get or create file
-            file_obj = session.query(File).filter_by(path=file_path).first()
-            if not file_obj:
-                file_type = self._extract_type(file_path)
-                file_obj = File(path=file_path, type=file_type)
-                session.add(file_obj)
-                session.flush()  # Get ID
-            
-            for tag_key, tag_value in tags:
-                full_tag = f"{tag_key}{self.config.get('separator', '/')}{tag_value}" if tag_value else tag_key
-                tag_obj = session.query(Tag).filter_by(name=full_tag).first()
-                if not tag_obj:
-                    tag_obj = Tag(name=full_tag)
-                    session.add(tag_obj)
-                    session.flush()
-                
-                # Check if association exists
-                if tag_obj not in file_obj.tags:
-                    file_obj.tags.append(tag_obj)
-            
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        self.bulk_add_tags({file_path: tags})
+    
+    def bulk_add_tags(self, entries, replace: bool = False):
+        separator = self.config.get('separator', '/')
+        ops = []
+        for file_path, tags in entries.items():
+            file_path = str(Path(file_path).resolve())
+            names = [f"{tag_key}{separator}{tag_value}" if tag_value else tag_key for tag_key, tag_value in tags]
+            ops.append(('add', file_path, names, replace))
+        self._write(ops)
+    
+    def _write(self, ops):
+        """Apply mutations through the group-commit queue, or directly if it is disabled."""
+        if not ops:
+            return
+        if self.write_queue is not None:
+            self.write_queue.submit(ops)
+        else:
+            self._commit_ops(ops)
+    
+    def _commit_ops(self, ops):
+        """Apply a list of ('add'|'remove', path, tag names, replace) ops in one transaction."""
+        with self.engine.begin() as conn:
+            new_tag_ids = self._apply_ops(conn, ops)
+        # Only cache ids from transactions that actually committed
+        with self._tag_ids_lock:
+            self._tag_ids.update(new_tag_ids)
+    
+    def _apply_ops(self, conn, ops):
+        files_table, tags_table = File.__table__, Tag.__table__
+        add_paths = {path for kind, path, _, _ in ops if kind == 'add'}
+        if add_paths:
+            conn.execute(
+                sqlite_insert(files_table).on_conflict_do_nothing(index_elements=['path']),
+                [{'path': path, 'type': self._extract_type(path)} for path in add_paths]
+            )
+        file_ids = self._lookup_ids(conn, files_table.c.path, {path for _, path, _, _ in ops})
+        
+        epoch = conn.execute(select(Meta.value).where(Meta.key == TAG_EPOCH)).scalar() or 0
+        with self._tag_ids_lock:
+            if epoch != self._tag_epoch:
+                self._tag_ids.clear()
+                self._tag_epoch = epoch
+            tag_ids = dict(self._tag_ids)
+        new_tag_ids = {}
+        add_names = {name for kind, _, names, _ in ops if kind == 'add' for name in names} - tag_ids.keys()
+        if add_names:
+            conn.execute(
+                sqlite_insert(tags_table).on_conflict_do_nothing(index_elements=['name']),
+                [{'name': name} for name in add_names]
+            )
+        missing = {name for _, _, names, _ in ops for name in names} - tag_ids.keys()
+        if missing:
+            new_tag_ids = self._lookup_ids(conn, tags_table.c.name, missing)
+            tag_ids.update(new_tag_ids)
+        
+        now = to_utc_datetime(time.time())
+        for kind, path, names, replace in ops:
+            file_id = file_ids.get(path)
+            if file_id is None:
+                continue
+            ids = {tag_ids[name] for name in names if name in tag_ids}
+            if kind == 'add':
+                if replace:
+                    # Drop only tags not being re-applied so retained ones keep their add time
+                    conn.execute(delete(file_tags).where(
+                        file_tags.c.file_id == file_id, file_tags.c.tag_id.not_in(ids)))
+                if ids:
+                    conn.execute(
+                        sqlite_insert(file_tags).on_conflict_do_nothing(),
+                        [{'file_id': file_id, 'tag_id': tag_id, 'added_at': now} for tag_id in ids]
+                    )
+            elif ids:
+                conn.execute(delete(file_tags).where(
+                    file_tags.c.file_id == file_id, file_tags.c.tag_id.in_(ids)))
+        return new_tag_ids
+    
+    def move_files(self, moves):
+        """Re-key files to new paths (merging tags) or drop them when the target is None, in one transaction."""
+        if not moves:
+            return
+        files_table = File.__table__
+        with self.engine.begin() as conn:
+            targets = {path for path in moves.values() if path is not None}
+            if targets:
+                conn.execute(
+                    sqlite_insert(files_table).on_conflict_do_nothing(index_elements=['path']),
+                    [{'path': path, 'type': self._extract_type(path)} for path in targets]
+                )
+            ids = self._lookup_ids(conn, files_table.c.path, {*moves, *targets})
+            for old_path, new_path in moves.items():
+                old_id = ids.get(old_path)
+                if old_id is None:
+                    continue
+                if new_path is not None:
+                    # Carry tags over with their original add times
+                    conn.execute(sqlite_insert(file_tags).from_select(
+                        ['file_id', 'tag_id', 'added_at'],
+                        select(literal(ids[new_path]), file_tags.c.tag_id, file_tags.c.added_at)
+                        .where(file_tags.c.file_id == old_id)
+                    ).on_conflict_do_nothing())
+                conn.execute(delete(file_tags).where(file_tags.c.file_id == old_id))
+                conn.execute(delete(files_table).where(files_table.c.id == old_id))
+    
+    @staticmethod
+    def _lookup_ids(conn, column, values):
+        """Map values of a unique column to row ids, in chunks."""
+        values = list(values)
+        ids = {}
+        for start in range(0, len(values), IN_CHUNK):
+            chunk = values[start:start + IN_CHUNK]
+            rows = conn.execute(select(column, column.table.c.id).where(column.in_(chunk)))
+            ids.update({value: row_id for value, row_id in rows})
+        return ids
     
     def get_tags(self, file_path):
         file_path = str(Path(file_path).resolve())
         session = self.Session()
         try:
-            file_obj = session.query(File).filter_by(path=file_path).first()
-            if file_obj:
-                return [tag.name for tag in file_obj.tags]
-            return []
+            # One join on the unique path index instead of loading File then its tags
+            rows = (session.query(Tag.name)
+                    .join(file_tags, Tag.id == file_tags.c.tag_id)
+                    .join(File, File.id == file_tags.c.file_id)
+                    .filter(File.path == file_path))
+            return [name for name, in rows]
         finally:
             session.close()
     
-    def search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False):
+    def iter_search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    sort: bool = False, under: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
         session = self.Session()
         try:
-            from fuzzywuzzy import fuzz
-            query_obj = session.query(File)
+            # Match against the distinct vocabulary, then walk only those tags' associations
+            vocabulary = session.query(Tag.id, Tag.name).all()
+            hits = self.scanner.match([name for _, name in vocabulary], query, fuzzy)
+            if not hits:
+                return
+            matched = {vocabulary[i][0]: vocabulary[i][1] for i in hits}
+            query_obj = (session.query(File.path, file_tags.c.tag_id)
+                         .join(file_tags, File.id == file_tags.c.file_id))
+            if len(matched) <= IN_CHUNK:
+                query_obj = query_obj.filter(file_tags.c.tag_id.in_(matched))
             if type_filter:
                 query_obj = query_obj.filter(File.type == type_filter)
+            if under:
+                # Range scan on the unique path index; LIKE would be case-insensitive
+                prefix = dir_prefix(under)
+                query_obj = query_obj.filter(File.path >= prefix, File.path < prefix[:-1] + chr(ord(os.sep) + 1))
+            query_obj = query_obj.order_by(File.path if sort else File.id)
             
-            results = {}
-            for file_obj in query_obj:
-                matching_tags = []
-                for tag in file_obj.tags:
-                    if fuzzy:
-                        if any(fuzz.partial_ratio(query, part) >= 70 for part in tag.name.split('/')):
-                            matching_tags.append(tag.name)
-                    else:
-                        # Regex search with wildcards
-                        query_regex = query.replace('*', '.*')
-                        try:
-                            if re.search(query_regex, tag.name):
-                                matching_tags.append(tag.name)
-                        except re.error:
-                            pass
+            rows = query_obj.yield_per(1000)
+            for file_path, group in groupby(rows, key=lambda row: row[0]):
+                matching_tags = [matched[tag_id] for _, tag_id in group if tag_id in matched]
                 if matching_tags:
-                    results[file_obj.path] = matching_tags
-            return results
+                    yield file_path, matching_tags
         finally:
             session.close()
     
+    def search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False, under: Optional[str] = None):
+        return dict(self.iter_search(query, type_filter, fuzzy, under=under))
+    
     def remove_tags(self, file_path, tags):
         file_path = str(Path(file_path).resolve())
-        session = self.Session()
-        try:
-            file_obj = session.query(File).filter_by(path=file_path).first()
-            if file_obj:
-                for tag_key, tag_value in tags:
-                    full_tag = f"{tag_key}{self.config.get('separator', '/')}{tag_value}" if tag_value else tag_key
-                    tag_obj = session.query(Tag).filter_by(name=full_tag).first()
-                    if tag_obj and tag_obj in file_obj.tags:
-                        file_obj.tags.remove(tag_obj)
-                session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        separator = self.config.get('separator', '/')
+        names = [f"{tag_key}{separator}{tag_value}" if tag_value else tag_key for tag_key, tag_value in tags]
+        self._write([('remove', file_path, names, False)])
     
     def batch_apply(self, folder_path, tag, type_filter: Optional[str] = None):
         import os
@@ -160,7 +276,13 @@ class DatabaseStorage(StorageInterface):
             tag_obj = session.query(Tag).filter_by(name=old_tag).first()
             if tag_obj:
                 tag_obj.name = new_tag
+                session.execute(
+                    sqlite_insert(Meta.__table__).values(key=TAG_EPOCH, value=1)
+                    .on_conflict_do_update(index_elements=['key'], set_={'value': Meta.value + 1})
+                )
                 session.commit()
+                with self._tag_ids_lock:
+                    self._tag_ids.pop(old_tag, None)
         except Exception as e:
             session.rollback()
             raise e
@@ -176,11 +298,48 @@ class DatabaseStorage(StorageInterface):
             session.close()
     
     def get_all_data(self):
+        return dict(self.iter_all_data())
+    
+    def iter_all_data(self):
+        """Stream (path, tags) from a single join ordered by file, grouping rows as they arrive."""
+        session = self.Session()
+        try:
+            # Outer joins keep files whose tags were all removed
+            rows = (session.query(File.path, Tag.name)
+                    .outerjoin(file_tags, File.id == file_tags.c.file_id)
+                    .outerjoin(Tag, Tag.id == file_tags.c.tag_id)
+                    .order_by(File.id)
+                    .yield_per(1000))
+            for file_path, group in groupby(rows, key=lambda row: row[0]):
+                yield file_path, [name for _, name in group if name is not None]
+        finally:
+            session.close()
+    
+    def iter_recent(self, since: Optional[float] = None, until: Optional[float] = None,
+                    type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        """Range scan over the added_at index, newest first."""
         session = self.Session()
         try:
-            data = {}
-            for file_obj in session.query(File).all():
-                data[file_obj.path] = [tag.name for tag in file_obj.tags]
-            return data
+            query_obj = (session.query(File.path, Tag.name, file_tags.c.added_at)
+                         .join(file_tags, File.id == file_tags.c.file_id)
+                         .join(Tag, Tag.id == file_tags.c.tag_id)
+                         .filter(file_tags.c.added_at.isnot(None)))
+            if since is not None:
+                query_obj = query_obj.filter(file_tags.c.added_at >= to_utc_datetime(since))
+            if until is not None:
+                query_obj = query_obj.filter(file_tags.c.added_at < to_utc_datetime(until))
+            if type_filter:
+                query_obj = query_obj.filter(File.type == type_filter)
+            if under:
+                prefix = dir_prefix(under)
+                query_obj = query_obj.filter(File.path >= prefix, File.path < prefix[:-1] + chr(ord(os.sep) + 1))
+            for file_path, name, added_at in query_obj.order_by(file_tags.c.added_at.desc()).yield_per(1000):
+                yield file_path, name, added_at.replace(tzinfo=timezone.utc).timestamp()
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+    
+    def close(self):
+        """Stop the committer thread and release pooled connections."""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        self.engine.dispose()
@@ -0,0 +1,106 @@
+"""
+In-memory secondary indexes over file-tag data.
+Tag posting lists, a type -> files map and a sorted path list let searches
+start from the smallest candidate set instead of scanning every entry.
+"""
+import os
+import re
+import sys
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+def dir_prefix(directory: str) -> str:
+    """Path prefix shared by everything inside directory."""
+    return directory.rstrip(os.sep) + os.sep
+
+def compile_matcher(query: str, fuzzy: bool = False) -> Optional[Callable[[str], bool]]:
+    """Build a tag predicate for a search query, or None if the query is invalid."""
+    if fuzzy:
+        from fuzzywuzzy import fuzz
+        threshold = 70
+        return lambda tag: any(fuzz.partial_ratio(query, part) >= threshold for part in tag.split('/'))
+    try:
+        pattern = re.compile(query.replace('*', '.*'))
+    except re.error:
+        return None
+    return lambda tag: pattern.search(tag) is not None
+
+class FileIndex:
+    """Posting lists, type index and sorted path index for one snapshot of the store."""
+
+    def __init__(self, files: Dict[str, Dict]):
+        self.files = files
+        self.paths: List[str] = sorted(files)
+        self.by_type: Dict[str, Set[str]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        # Time-ordered (added, path, tag) entries, built on first recency query
+        self._timeline: Optional[Tuple[List[str], List[Tuple[str, str]]]] = None
+        for file_path, data in files.items():
+            self.by_type.setdefault(data['type'], set()).add(file_path)
+            for tag in data['tags']:
+                self.postings.setdefault(tag, set()).add(file_path)
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint, extrapolating file entries from a sample."""
+        from ..index_manager import estimate_size
+        sample = self.paths[::max(1, len(self.paths) // 256)]
+        per_file = estimate_size({p: self.files[p] for p in sample}) / len(sample) if sample else 0
+        containers = [self.files, self.paths, self.by_type, self.postings,
+                      *self.by_type.values(), *self.postings.values()]
+        return int(per_file * len(self.files)) + sum(sys.getsizeof(c) for c in containers)
+
+    def added_between(self, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """(path, tag, added) for tags added in [since, until), newest first.
+
+        Timestamps are ISO-8601 UTC strings, which sort chronologically.
+        """
+        if self._timeline is None:
+            rows = sorted((added, file_path, tag) for file_path, data in self.files.items()
+                          for tag, added in data.get('added', {}).items())
+            self._timeline = [row[0] for row in rows], [row[1:] for row in rows]
+        times, entries = self._timeline
+        lo = bisect_left(times, since) if since else 0
+        hi = bisect_left(times, until) if until else len(times)
+        return [(*entries[i], times[i]) for i in range(hi - 1, lo - 1, -1)]
+
+    def under(self, directory: str) -> List[str]:
+        """Sorted paths inside directory, found by a bisect range over the path index."""
+        prefix = dir_prefix(directory)
+        # Every path starting with 'dir/' sorts between 'dir/' and 'dir' + chr(ord('/') + 1)
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        return self.paths[bisect_left(self.paths, prefix):bisect_left(self.paths, upper)]
+
+    def tag_files(self, tags: Iterable[str]) -> Set[str]:
+        """Union of the posting lists for the given tags."""
+        result: Set[str] = set()
+        for tag in tags:
+            result |= self.postings.get(tag, set())
+        return result
+
+    def search(self, matcher: Callable[[str], bool], type_filter: Optional[str] = None,
+               under: Optional[str] = None,
+               match_vocabulary: Optional[Callable[[List[str]], Iterable[str]]] = None) -> List[Tuple[str, List[str]]]:
+        """Sorted (path, tags) matches, starting from whichever candidate set is smallest.
+        
+        ``match_vocabulary`` may replace the per-tag matcher loop over the
+        vocabulary, e.g. with a parallel scan.
+        """
+        scope = self.under(under) if under else None
+        if scope is not None and len(scope) < len(self.postings):
+            # A narrow folder is cheaper to check file by file than the whole vocabulary
+            hits = [p for p in scope if any(matcher(tag) for tag in self.files[p]['tags'])]
+            if type_filter:
+                hits = [p for p in hits if self.files[p]['type'] == type_filter]
+        else:
+            if match_vocabulary is not None:
+                hit_set = self.tag_files(match_vocabulary([*self.postings]))
+            else:
+                hit_set = self.tag_files(tag for tag in self.postings if matcher(tag))
+            if type_filter:
+                hit_set &= self.by_type.get(type_filter, set())
+            if scope is not None:
+                prefix = dir_prefix(under)
+                hit_set = {p for p in hit_set if p.startswith(prefix)}
+            hits = sorted(hit_set)
+        return [(p, list(self.files[p]['tags'])) for p in hits]
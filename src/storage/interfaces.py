@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Tuple
 
 class StorageInterface(ABC):
     @abstractmethod
@@ -15,7 +15,12 @@ class StorageInterface(ABC):
         pass
     
     @abstractmethod
-    def search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False):
+    def search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False, under: Optional[str] = None):
+        pass
+    
+    @abstractmethod
+    def iter_search(self, query, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    sort: bool = False, under: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
         pass
     
     @abstractmethod
@@ -32,4 +37,21 @@ class StorageInterface(ABC):
     
     @abstractmethod
     def get_all_data(self) -> Dict[str, List[str]]:
+        pass
+    
+    @abstractmethod
+    def iter_all_data(self) -> Iterator[Tuple[str, List[str]]]:
+        pass
+    
+    @abstractmethod
+    def iter_recent(self, since: Optional[float] = None, until: Optional[float] = None,
+                    type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        pass
+    
+    @abstractmethod
+    def bulk_add_tags(self, entries: Dict[str, List[Tuple[str, str]]], replace: bool = False) -> Optional[int]:
+        pass
+    
+    @abstractmethod
+    def move_files(self, moves: Dict[str, Optional[str]]) -> None:
         pass
\ No newline at end of file
@@ -2,11 +2,21 @@
 Markdown-based storage backend for tags.
 Stores data in a human-readable MD file.
 """
+import json
 import os
-import re
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Callable, Iterator, Optional
 from .interfaces import StorageInterface
+from .indexes import FileIndex, compile_matcher, dir_prefix
+from .parallel import ParallelScanner
+from ..index_manager import IndexManager
+from ..recency import iso_to_timestamp, utc_iso
+from ..fileio import atomic_open, store_lock
+from ..compression import codec_for, existing_path, open_read, write_text
+
+ADDED_MARK = ' <!-- added: '
+# (added, path, type, tag) JSON lines, newest first, for recency queries in processes without a warm index
+RECENT_FILE = 'recent_index.jsonl'
 
 class MarkdownStorage(StorageInterface):
     """Storage implementation using Markdown file."""
@@ -14,14 +24,38 @@ class MarkdownStorage(StorageInterface):
     def __init__(self, config):
         self.config = config
         storage_path = Path(config.get_storage_path())
-        self.tags_file = storage_path / "tags.md"
+        # tags.md, or tags.md.gz / tags.md.zst when compressed
+        self.tags_file = self._resolve_tags_file()
         self.tags_file.parent.mkdir(parents=True, exist_ok=True)
+        self.recent_file = storage_path / RECENT_FILE
+        # Serializes read-modify-write cycles across threads and processes; readers never take it
+        self.lock = store_lock(storage_path)
+        # Checked again under the lock: a process that started alongside may already have created and written it
         if not self.tags_file.exists():
-            self._init_file()
+            with self.lock:
+                if not self._resolve_tags_file().exists():
+                    self._init_file()
+        # Parsed data plus secondary indexes, valid while tags.md is unchanged on disk;
+        # held by the index manager so it can be spilled under memory pressure
+        self.indexes = IndexManager.for_config(config, storage_path)
+        self._index_name = f"markdown:{self.tags_file}"
+        self._index_stamp = None
+        # Set when the parsed store exceeds index_memory_mb; searches then stream without collecting it
+        self._index_too_large = False
+        # Distinct tags at the last parse, to judge whether parallel fuzzy matching pays off
+        self._vocabulary_size = 0
+        self.scanner = ParallelScanner.from_config(config)
+        self.fsync = bool(config.get('fsync_writes', True))
+    
+    def _resolve_tags_file(self) -> Path:
+        """Current name of the store file; 'tagg compact' in another process may have renamed it."""
+        self.tags_file = existing_path(Path(self.config.get_storage_path()) / "tags.md", codec_for(self.config))
+        return self.tags_file
     
     def _init_file(self) -> None:
         """Initialize the tags.md file with structure."""
-        self.tags_file.write_text(
+        write_text(
+            self.tags_file,
             "# Tagging System Data\n\n"
             "## Files and Tags\n\n"
             "## Tag Exclusions\n\n"
@@ -35,130 +69,325 @@ class MarkdownStorage(StorageInterface):
         """Extract file extension as type."""
         return Path(file_path).suffix.lstrip('.').lower() or 'unknown'
     
+    def _iter_entries(self) -> Iterator[Tuple[str, str, List[str], Dict[str, str]]]:
+        """Stream (path, type, tags, added) entries from tags.md line by line.
+        
+        Tag lines may carry an add time as ``- tag <!-- added: ISO -->``;
+        files written before timestamps existed simply have none.
+        """
+        entry = None
+        pending_path = None
+        with open_read(self.tags_file) as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if entry is not None:
+                    if line.startswith('- '):
+                        if not line.startswith('- Type: '):
+                            tag = line[2:].strip()
+                            if tag.endswith(' -->') and ADDED_MARK in tag:
+                                tag, _, added = tag[:-4].rpartition(ADDED_MARK)
+                                entry[3][tag] = added
+                            entry[2].append(tag)
+                        continue
+                    yield tuple(entry)
+                    entry = None
+                if pending_path is not None and line.startswith('- Type: '):
+                    entry = [pending_path, line[len('- Type: '):], [], {}]
+                    pending_path = None
+                    continue
+                pending_path = line[4:] if line.startswith('### ') else None
+        if entry is not None:
+            yield tuple(entry)
+    
+    def _stamp(self) -> Tuple[int, int, int]:
+        """Identify the current on-disk version of tags.md."""
+        try:
+            st = os.stat(self.tags_file)
+        except FileNotFoundError:
+            st = os.stat(self._resolve_tags_file())
+        return st.st_mtime_ns, st.st_size, st.st_ino
+    
+    def _warm_index(self) -> Optional[FileIndex]:
+        """Return the in-memory index if tags.md has not changed since it was built."""
+        if self._index_stamp is None or self._index_stamp != self._stamp():
+            return None
+        return self.indexes.get(self._index_name)
+    
+    def _get_index(self) -> FileIndex:
+        """Return the in-memory index, parsing tags.md if it is stale."""
+        index = self._warm_index()
+        if index is None:
+            stamp = self._stamp()
+            files = {file_path: {'tags': tags, 'type': file_type, 'added': added}
+                     for file_path, file_type, tags, added in self._iter_entries()}
+            index = self._install_index(files, stamp)
+        return index
+    
+    def _install_index(self, files: Dict[str, Dict], stamp) -> FileIndex:
+        index = FileIndex(files)
+        self._index_too_large = not self.indexes.put(self._index_name, index, index.nbytes())
+        self._vocabulary_size = len(index.postings)
+        self._index_stamp = stamp
+        return index
+    
     def _load_data(self) -> Tuple[Dict[str, Dict], List, Dict]:
-        """Load and parse tags.md into dicts."""
-        content = self.tags_file.read_text()
-        files = {}
-        for match in re.finditer(r'### (.*?)\n- Type: (.*?)\n((?:- .*?\n)*)', content):
-            file_path = match.group(1)
-            file_type = match.group(2)
-            tags_str = match.group(3)
-            tags = [line[2:].strip() for line in tags_str.split('\n') if line.startswith('- ') and not line.startswith('- Type: ')]
-            files[file_path] = {'tags': tags, 'type': file_type}
+        """Load and parse tags.md into dicts.
+        
+        Entries may be shared with the cached index; take them through
+        ``_writable`` before changing them.
+        """
+        self._resolve_tags_file()
+        index = self._warm_index()
+        if index is not None:
+            files = dict(index.files)
+        else:
+            files = {}
+            for file_path, file_type, tags, added in self._iter_entries():
+                files[file_path] = {'tags': tags, 'type': file_type, 'added': added}
         return files, [], {}
     
+    @staticmethod
+    def _writable(files: Dict[str, Dict], file_path: str) -> Dict[str, Any]:
+        """Replace one loaded entry with a private copy and return it."""
+        data = files[file_path]
+        files[file_path] = data = {'tags': list(data['tags']), 'type': data['type'], 'added': dict(data['added'])}
+        return data
+    
     def _save_data(self, files: Dict[str, Dict], exclusions: List, metadata: Dict) -> None:
         """Save data back to tags.md."""
         content = "# Tagging System Data\n\n## Files and Tags\n\n"
         for file_path, data in sorted(files.items()):
             content += f"### {file_path}\n"
             content += f"- Type: {data['type']}\n"
+            added = data['added']
             for tag in sorted(data['tags']):
-                content += f"- {tag}\n"
+                content += f"- {tag}{ADDED_MARK}{added[tag]} -->\n" if tag in added else f"- {tag}\n"
             content += "\n"
         
         content += "## Tag Exclusions\n\n## Metadata\n"
         for key, value in metadata.items():
             content += f"- {key}: {value}\n"
         
-        self.tags_file.write_text(content)
+        # Resolved under the writer lock, so a plain tags.md never lands next to a compacted tags.md.gz
+        with self.lock:
+            write_text(self._resolve_tags_file(), content, self.fsync)
+        self._install_index(files, self._stamp())
     
     def add_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
         """Add tags to a file."""
-        file_path = str(Path(file_path).resolve())
-        files, exclusions, metadata = self._load_data()
-        file_type = self._extract_type(file_path)
-        
-        if file_path not in files:
-            files[file_path] = {'tags': [], 'type': file_type}
-        else:
-            files[file_path]['type'] = file_type  # Update type if changed
+        self.bulk_add_tags({file_path: tags})
+    
+    def bulk_add_tags(self, entries: Dict[str, List[Tuple[str, str]]], replace: bool = False) -> None:
+        """Add tags to many files with a single load and save of tags.md."""
+        with self.lock:
+            files, exclusions, metadata = self._load_data()
+            separator = self.config.get('separator', '/')
+            now = utc_iso()
         
-        separator = self.config.get('separator', '/')
-        for tag_key, tag_value in tags:
-            full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
-            if full_tag not in files[file_path]['tags']:
-                files[file_path]['tags'].append(full_tag)
+            for file_path, tags in entries.items():
+                file_path = str(Path(file_path).resolve())
+                file_type = self._extract_type(file_path)
+            
+                previous = files[file_path]['added'] if file_path in files else {}
+                if file_path not in files or replace:
+                    files[file_path] = {'tags': [], 'type': file_type, 'added': {}}
+                else:
+                    self._writable(files, file_path)['type'] = file_type  # Update type if changed
+            
+                data = files[file_path]
+                for tag_key, tag_value in tags:
+                    full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
+                    if full_tag not in data['tags']:
+                        data['tags'].append(full_tag)
+                        # Re-applied tags keep their original add time
+                        data['added'][full_tag] = previous.get(full_tag, now)
         
-        # Update metadata
-        metadata['Total Files'] = str(len(files))
-        metadata['Total Tags'] = str(sum(len(data['tags']) for data in files.values()))
-        from datetime import datetime
-        metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            # Update metadata
+            metadata['Total Files'] = str(len(files))
+            metadata['Total Tags'] = str(sum(len(data['tags']) for data in files.values()))
+            from datetime import datetime
+            metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        self._save_data(files, exclusions, metadata)
+            self._save_data(files, exclusions, metadata)
+    
+    def move_files(self, moves: Dict[str, Optional[str]]) -> None:
+        """Re-key files to new paths (merging tags and add times), or drop them when the target is None."""
+        with self.lock:
+            files, exclusions, metadata = self._load_data()
+            for old_path, new_path in moves.items():
+                data = files.pop(old_path, None)
+                if data is None or new_path is None:
+                    continue
+                if new_path in files:
+                    target = self._writable(files, new_path)
+                else:
+                    target = files[new_path] = {'tags': [], 'type': self._extract_type(new_path), 'added': {}}
+                for tag in data['tags']:
+                    if tag not in target['tags']:
+                        target['tags'].append(tag)
+                        if tag in data['added']:
+                            target['added'][tag] = data['added'][tag]
+            metadata['Total Files'] = str(len(files))
+            metadata['Total Tags'] = str(sum(len(data['tags']) for data in files.values()))
+            from datetime import datetime
+            metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._save_data(files, exclusions, metadata)
     
     def get_tags(self, file_path: str) -> List[str]:
         """Get tags for a file."""
         file_path = str(Path(file_path).resolve())
-        files, _, _ = self._load_data()
-        return files.get(file_path, {}).get('tags', [])
+        index = self._warm_index()
+        if index is None and self._index_too_large:
+            return next((tags for path, _, tags, _ in self._iter_entries() if path == file_path), [])
+        return list((index or self._get_index()).files.get(file_path, {}).get('tags', []))
     
-    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False) -> Dict[str, List[str]]:
-        """Search files by tags."""
-        files, _, _ = self._load_data()
-        results = {}
+    def _compile_matcher(self, query: str, fuzzy: bool) -> Optional[Callable[[str], bool]]:
+        """Build a tag predicate for the query, or None if the query is invalid."""
+        return compile_matcher(query, fuzzy)
+    
+    def iter_search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    sort: bool = False, under: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
+        """Yield (path, tags) for matching files.
         
-        if fuzzy:
-            from fuzzywuzzy import fuzz
-            threshold = 70
-            for file_path, data in files.items():
-                if type_filter and data['type'] != type_filter:
-                    continue
-                matching_tags = [tag for tag in data['tags'] if any(fuzz.partial_ratio(query, part) >= threshold for part in tag.split('/'))]
-                if matching_tags:
-                    results[file_path] = data['tags']
-        else:
-            query = query.replace('*', '.*')
-            for file_path, data in files.items():
-                if type_filter and data['type'] != type_filter:
-                    continue
-                try:
-                    if any(re.search(query, tag) for tag in data['tags']):
-                        results[file_path] = data['tags']
-                except re.error:
-                    pass
+        Uses the in-memory indexes when they are current; otherwise streams
+        matches while parsing and keeps the parsed data as the new index,
+        unless the last parse showed it does not fit in index_memory_mb.
+        """
+        matcher = self._compile_matcher(query, fuzzy)
+        if matcher is None:
+            return
+        def match_vocabulary(vocabulary: List[str]) -> List[str]:
+            return [vocabulary[i] for i in self.scanner.match(vocabulary, query, fuzzy)]
         
-        return results
+        index = self._warm_index()
+        # Fuzzy scoring dwarfs parsing, so it is worth indexing first to match a large vocabulary in parallel
+        parallel_fuzzy = fuzzy and self.scanner.workers > 1 and not self._index_too_large \
+            and self._vocabulary_size >= self.scanner.threshold
+        if index is not None or sort or parallel_fuzzy:
+            yield from (index or self._get_index()).search(matcher, type_filter, under, match_vocabulary)
+            return
+        
+        stamp = self._stamp()
+        prefix = dir_prefix(under) if under else None
+        files = None if self._index_too_large else {}
+        for file_path, file_type, tags, added in self._iter_entries():
+            if files is not None:
+                files[file_path] = {'tags': tags, 'type': file_type, 'added': added}
+            if (not type_filter or file_type == type_filter) and (prefix is None or file_path.startswith(prefix)) \
+                    and any(matcher(tag) for tag in tags):
+                yield file_path, list(tags)
+        if files is not None:
+            self._install_index(files, stamp)
+    
+    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+               under: Optional[str] = None) -> Dict[str, List[str]]:
+        """Search files by tags."""
+        return dict(self.iter_search(query, type_filter, fuzzy, under=under))
     
     def remove_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
         """Remove tags from a file."""
-        file_path = str(Path(file_path).resolve())
-        files, exclusions, metadata = self._load_data()
-        if file_path in files:
-            separator = self.config.get('separator', '/')
-            for tag_key, tag_value in tags:
-                full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
-                if full_tag in files[file_path]['tags']:
-                    files[file_path]['tags'].remove(full_tag)
-            metadata['Total Tags'] = str(sum(len(data['tags']) for data in files.values()))
-            from datetime import datetime
-            metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            self._save_data(files, exclusions, metadata)
+        with self.lock:
+            file_path = str(Path(file_path).resolve())
+            files, exclusions, metadata = self._load_data()
+            if file_path in files:
+                separator = self.config.get('separator', '/')
+                data = self._writable(files, file_path)
+                for tag_key, tag_value in tags:
+                    full_tag = f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
+                    if full_tag in data['tags']:
+                        data['tags'].remove(full_tag)
+                        data['added'].pop(full_tag, None)
+                metadata['Total Tags'] = str(sum(len(data['tags']) for data in files.values()))
+                from datetime import datetime
+                metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self._save_data(files, exclusions, metadata)
     
     def rename_tag(self, old_tag: str, new_tag: str) -> None:
         """Rename a tag across all files."""
-        files, exclusions, metadata = self._load_data()
-        for file_data in files.values():
-            if old_tag in file_data['tags']:
-                file_data['tags'].remove(old_tag)
-                file_data['tags'].append(new_tag)
-        from datetime import datetime
-        metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self._save_data(files, exclusions, metadata)
+        with self.lock:
+            files, exclusions, metadata = self._load_data()
+            for file_path in [path for path, data in files.items() if old_tag in data['tags']]:
+                file_data = self._writable(files, file_path)
+                if old_tag in file_data['tags']:
+                    file_data['tags'].remove(old_tag)
+                    file_data['tags'].append(new_tag)
+                    if old_tag in file_data['added']:
+                        file_data['added'][new_tag] = file_data['added'].pop(old_tag)
+            from datetime import datetime
+            metadata['Last Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._save_data(files, exclusions, metadata)
     
     def get_all_tags(self) -> List[str]:
         """Get all unique tags."""
-        files, _, _ = self._load_data()
-        all_tags = set()
-        for data in files.values():
-            all_tags.update(data['tags'])
-        return list(all_tags)
+        return [*self._get_index().postings]
     
     def get_all_data(self) -> Dict[str, List[str]]:
         """Get all file-tag data."""
-        files, _, _ = self._load_data()
-        return {k: v['tags'] for k, v in files.items()}
+        return {k: list(v['tags']) for k, v in self._get_index().files.items()}
+    
+    def iter_all_data(self) -> Iterator[Tuple[str, List[str]]]:
+        """Stream all file-tag data in file order."""
+        index = self._warm_index()
+        if index is not None:
+            for file_path in index.paths:
+                yield file_path, list(index.files[file_path]['tags'])
+            return
+        for file_path, _, tags, _ in self._iter_entries():
+            yield file_path, tags
+    
+    def iter_recent(self, since: Optional[float] = None, until: Optional[float] = None,
+                    type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        """Yield (path, tag, added_at) newest first from the time-ordered index.
+        
+        Without a warm in-memory index the persisted recency file is streamed,
+        stopping at ``since``; it is rebuilt once after each write to tags.md.
+        """
+        since_iso = utc_iso(since) if since is not None else None
+        until_iso = utc_iso(until) if until is not None else None
+        prefix = dir_prefix(under) if under else None
+        index = self._warm_index()
+        if index is not None:
+            rows = ((file_path, tag, added, index.files[file_path]['type'])
+                    for file_path, tag, added in index.added_between(since_iso, until_iso))
+        else:
+            rows = self._iter_recent_file(since_iso, until_iso)
+        for file_path, tag, added, file_type in rows:
+            if (not type_filter or file_type == type_filter) \
+                    and (prefix is None or file_path.startswith(prefix)):
+                yield file_path, tag, iso_to_timestamp(added)
+    
+    def _iter_recent_file(self, since: Optional[str], until: Optional[str]) -> Iterator[Tuple[str, str, str, str]]:
+        """Stream (path, tag, added, type) in [since, until) from the recency file, newest first."""
+        stamp = json.dumps(self._stamp())
+        rows = self._read_recent_file(stamp)
+        if rows is None:
+            built = sorted(((added, file_path, tag, file_type)
+                            for file_path, file_type, _, added_by_tag in self._iter_entries()
+                            for tag, added in added_by_tag.items()), reverse=True)
+            with atomic_open(self.recent_file) as out:
+                out.write(stamp + '\n')
+                out.writelines(json.dumps(row) + '\n' for row in built)
+            rows = iter(built)
+        for added, file_path, tag, file_type in rows:
+            if since is not None and added < since:
+                break
+            if until is None or added < until:
+                yield file_path, tag, added, file_type
+    
+    def _read_recent_file(self, stamp: str) -> Optional[Iterator[List[str]]]:
+        """Rows of the recency file if it was built from the current tags.md, else None."""
+        try:
+            f = open(self.recent_file, encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        if f.readline().rstrip('\n') != stamp:
+            f.close()
+            return None
+        def rows():
+            with f:
+                for line in f:
+                    yield json.loads(line)
+        return rows()
     
     def batch_apply(self, folder_path: str, tag: Tuple[str, str], type_filter: Optional[str] = None) -> int:
         """Apply tag to files in folder."""
@@ -0,0 +1,77 @@
+"""
+Parallel matcher evaluation for queries no index can answer.
+The distinct vocabulary is encoded once into a NUL-separated file that each
+worker process memory-maps, so only byte ranges and match indices cross the
+process boundary; small vocabularies are matched in-process.
+"""
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence
+
+from .indexes import compile_matcher
+
+DEFAULT_THRESHOLD = 50000  # vocabulary size below which scans stay single-threaded
+TASKS_PER_WORKER = 4  # smaller partitions even out slow (e.g. fuzzy-heavy) ranges
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for this worker count, shared by all scans in this process and started on first use.
+
+    Pools are never shut down early: a scan on another thread may still be using one.
+    Workers are started from a fork server (spawned where that is unavailable), not
+    forked, so they never inherit locks held by this process's other threads.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=multiprocessing.get_context(method))
+        return pool
+
+def _scan_range(path: str, start: int, end: int, first_index: int, query: str, fuzzy: bool) -> List[int]:
+    """Worker: match the entries stored in bytes [start, end) of the mapped vocabulary file."""
+    matcher = compile_matcher(query, fuzzy)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        entries = mm[start:end].decode('utf-8').split('\0')
+    return [first_index + i for i, entry in enumerate(entries) if matcher(entry)]
+
+class ParallelScanner:
+    """Evaluates a search matcher over a vocabulary, fanning out to processes when it is large."""
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, workers: int = 0):
+        self.threshold = threshold
+        self.workers = workers or os.cpu_count() or 1
+
+    @classmethod
+    def from_config(cls, config) -> 'ParallelScanner':
+        return cls(int(config.get('parallel_scan_threshold', DEFAULT_THRESHOLD)),
+                   int(config.get('parallel_scan_workers', 0)))
+
+    def match(self, vocabulary: Sequence[str], query: str, fuzzy: bool = False) -> Optional[List[int]]:
+        """Indices of matching entries in vocabulary order, or None if the query is invalid."""
+        matcher = compile_matcher(query, fuzzy)
+        if matcher is None:
+            return None
+        if len(vocabulary) < self.threshold or self.workers < 2 or any('\0' in entry for entry in vocabulary):
+            return [i for i, entry in enumerate(vocabulary) if matcher(entry)]
+        encoded = [entry.encode('utf-8') for entry in vocabulary]
+        # Byte offset where each entry starts (entries are followed by one NUL separator)
+        offsets = [0, *accumulate(len(entry) + 1 for entry in encoded)]
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        with tempfile.NamedTemporaryFile(prefix='tagg-vocab-', dir=directory) as f:
+            f.write(b'\0'.join(encoded))
+            f.flush()
+            step = -(-len(vocabulary) // (self.workers * TASKS_PER_WORKER))
+            pool = _get_pool(self.workers)
+            futures = [pool.submit(_scan_range, f.name, offsets[lo], offsets[min(lo + step, len(vocabulary))] - 1,
+                                   lo, query, fuzzy)
+                       for lo in range(0, len(vocabulary), step)]
+            return [index for future in futures for index in future.result()]
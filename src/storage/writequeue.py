@@ -0,0 +1,82 @@
+"""
+Group-commit write queue.
+Writers from many threads hand their mutations to one committer thread,
+which applies everything that arrived within a short window in a single
+transaction, so concurrent writers share one commit (and one fsync).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+class GroupCommitQueue:
+    """Batches submitted operations into shared transactions on a background thread."""
+
+    def __init__(self, commit: Callable[[List[Any]], None], interval_ms: float = 2, max_batch: int = 1000):
+        self._commit = commit
+        self.interval = interval_ms / 1000
+        self.max_batch = max_batch
+        self._pending: 'queue.Queue[Optional[Tuple[List[Any], Future]]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+
+    def submit(self, ops: List[Any]) -> None:
+        """Queue operations and block until the transaction containing them commits."""
+        future: Future = Future()
+        self._ensure_started()
+        self._pending.put((ops, future))
+        future.result()
+
+    def close(self) -> None:
+        """Flush outstanding work and stop the committer thread."""
+        with self._lock:
+            if self._thread is not None:
+                self._pending.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._pending.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[List[Any], Future]]) -> None:
+        """Commit a batch together, falling back to one transaction per writer on error."""
+        try:
+            self._commit([op for ops, _ in batch for op in ops])
+        except Exception:
+            # Isolate the failure so only the offending writer sees it
+            for ops, future in batch:
+                try:
+                    self._commit(ops)
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                future.set_result(None)
+        self.batches += 1
+        self.operations += len(batch)
@@ -0,0 +1,240 @@
+"""
+Extended-attribute storage backend.
+Tags live on the files themselves as user.tagging.* attributes, so they
+follow files across moves; another backend serves as a rebuildable index.
+"""
+import errno
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Tuple, Dict, Iterable, Iterator, Optional
+from .interfaces import StorageInterface
+from .markdown import MarkdownStorage
+
+XATTR_PREFIX = 'user.tagging.'
+XATTR_NAME_MAX = 255
+_UNSUPPORTED = {errno.ENOTSUP, errno.EOPNOTSUPP}
+
+class XattrStorage(StorageInterface):
+    """Storage implementation using extended attributes plus a central index."""
+
+    def __init__(self, config, index: Optional[StorageInterface] = None):
+        if not hasattr(os, 'setxattr'):
+            raise ValueError("Extended attributes are not supported on this platform")
+        self.config = config
+        storage_path = Path(config.get_storage_path())
+        storage_path.mkdir(parents=True, exist_ok=True)
+        self._check_support(storage_path)
+        self._supported_devices = {os.stat(storage_path).st_dev}
+        self.index = index if index is not None else self._create_index(config)
+
+    @staticmethod
+    def _create_index(config) -> StorageInterface:
+        """Build the central index backend named by 'xattr_index'."""
+        if config.get('xattr_index', 'md') == 'db':
+            from .database import DatabaseStorage
+            return DatabaseStorage(config)
+        return MarkdownStorage(config)
+
+    def _check_support(self, directory: Path) -> None:
+        """Probe the filesystem for user xattr support with a scratch file."""
+        # A private name, so processes starting together never remove each other's probe
+        fd, probe = tempfile.mkstemp(dir=directory, prefix='.xattr_probe.')
+        os.close(fd)
+        try:
+            os.setxattr(probe, XATTR_PREFIX + 'probe', b'')
+        except OSError as e:
+            if e.errno in _UNSUPPORTED:
+                raise ValueError(f"Filesystem at {directory} does not support user extended attributes")
+            raise
+        finally:
+            os.unlink(probe)
+
+    def _check_file_support(self, file_path: str) -> bool:
+        """Probe each filesystem holding target files once, returning False if the file no longer exists."""
+        try:
+            device = os.stat(file_path).st_dev
+        except FileNotFoundError:
+            return False
+        if device in self._supported_devices:
+            return True
+        probe = 'user.tagging_probe'  # outside the tag namespace so an existing 'probe' tag survives
+        try:
+            os.setxattr(file_path, probe, b'')
+            os.removexattr(file_path, probe)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            if e.errno in _UNSUPPORTED:
+                raise ValueError(f"Filesystem does not support user extended attributes: {file_path}")
+            raise
+        self._supported_devices.add(device)
+        return True
+
+    def _extract_type(self, file_path: str) -> str:
+        """Extract file extension as type."""
+        return Path(file_path).suffix.lstrip('.').lower() or 'unknown'
+
+    def _full_tag(self, tag_key: str, tag_value: str) -> str:
+        separator = self.config.get('separator', '/')
+        return f"{tag_key}{separator}{tag_value}" if tag_value else tag_key
+
+    def _attr_name(self, tag: str) -> str:
+        name = XATTR_PREFIX + tag
+        if len(name.encode()) > XATTR_NAME_MAX:
+            raise ValueError(f"Tag too long for an extended attribute: {tag}")
+        return name
+
+    def _read_tags(self, file_path: str) -> List[str]:
+        """Read the tags stored on a file with a single listxattr call."""
+        try:
+            names = os.listxattr(file_path)
+        except FileNotFoundError:
+            return []
+        return [name[len(XATTR_PREFIX):] for name in names if name.startswith(XATTR_PREFIX)]
+
+    def _write_tags(self, file_path: str, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        """Set and clear tag attributes on a file."""
+        try:
+            for tag in remove:
+                try:
+                    os.removexattr(file_path, self._attr_name(tag))
+                except OSError as e:
+                    if e.errno != errno.ENODATA:
+                        raise
+            for tag in add:
+                os.setxattr(file_path, self._attr_name(tag), b'')
+        except OSError as e:
+            if e.errno in _UNSUPPORTED:
+                raise ValueError(f"Filesystem does not support user extended attributes: {file_path}")
+            raise
+
+    def add_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
+        """Add tags to a file."""
+        self.bulk_add_tags({file_path: tags})
+
+    def bulk_add_tags(self, entries: Dict[str, List[Tuple[str, str]]], replace: bool = False) -> int:
+        """Write tags to each file's attributes, then update the index in one batch; returns missing files skipped."""
+        resolved = {}
+        # Fail before touching any file if one of them is on a filesystem without xattrs
+        paths = {str(Path(file_path).resolve()) for file_path in entries}
+        missing = {file_path for file_path in paths if not self._check_file_support(file_path)}
+        for file_path, tags in entries.items():
+            file_path = str(Path(file_path).resolve())
+            if file_path in missing:
+                continue
+            full_tags = [self._full_tag(tag_key, tag_value) for tag_key, tag_value in tags]
+            stale = set(self._read_tags(file_path)) - set(full_tags) if replace else ()
+            try:
+                self._write_tags(file_path, add=full_tags, remove=stale)
+            except FileNotFoundError:
+                # Deleted since the probe; there is nothing left to carry the attributes
+                missing.add(file_path)
+                continue
+            resolved[file_path] = tags
+        self.index.bulk_add_tags(resolved, replace=replace)
+        return len(missing)
+
+    def move_files(self, moves: Dict[str, Optional[str]]) -> None:
+        """Re-key index entries; attributes travel with a renamed file, so only the index changes."""
+        for old_path, new_path in moves.items():
+            if new_path is None:
+                # A dropped file that still exists must not keep carrying its tags
+                self._write_tags(old_path, remove=self._read_tags(old_path))
+        self.index.move_files(moves)
+
+    def get_tags(self, file_path: str) -> List[str]:
+        """Get tags for a file straight from its attributes."""
+        return self._read_tags(str(Path(file_path).resolve()))
+
+    def iter_search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+                    sort: bool = False, under: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
+        """Search through the central index."""
+        return self.index.iter_search(query, type_filter, fuzzy, sort, under)
+
+    def search(self, query: str, type_filter: Optional[str] = None, fuzzy: bool = False,
+               under: Optional[str] = None) -> Dict[str, List[str]]:
+        """Search files by tags."""
+        return self.index.search(query, type_filter, fuzzy, under)
+
+    def remove_tags(self, file_path: str, tags: List[Tuple[str, str]]) -> None:
+        """Remove tags from a file."""
+        file_path = str(Path(file_path).resolve())
+        self._write_tags(file_path, remove=[self._full_tag(k, v) for k, v in tags])
+        self.index.remove_tags(file_path, tags)
+
+    def rename_tag(self, old_tag: str, new_tag: str) -> None:
+        """Rename a tag on every indexed file carrying it."""
+        for file_path, tags in self.index.iter_all_data():
+            if old_tag in tags and os.path.exists(file_path):
+                self._write_tags(file_path, add=[new_tag], remove=[old_tag])
+        self.index.rename_tag(old_tag, new_tag)
+
+    def get_all_tags(self) -> List[str]:
+        """Get all unique tags."""
+        return self.index.get_all_tags()
+
+    def get_all_data(self) -> Dict[str, List[str]]:
+        """Get all file-tag data."""
+        return self.index.get_all_data()
+
+    def iter_all_data(self) -> Iterator[Tuple[str, List[str]]]:
+        """Stream all file-tag data."""
+        return self.index.iter_all_data()
+
+    def iter_recent(self, since: Optional[float] = None, until: Optional[float] = None,
+                    type_filter: Optional[str] = None, under: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        """Recently added tags, as recorded by the search index."""
+        return self.index.iter_recent(since, until, type_filter, under)
+
+    def batch_apply(self, folder_path: str, tag: Tuple[str, str], type_filter: Optional[str] = None) -> int:
+        """Apply tag to files in folder."""
+        entries = {}
+        for root, _, filenames in os.walk(folder_path):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                if not type_filter or self._extract_type(file_path) == type_filter:
+                    entries[file_path] = [tag]
+        if entries:
+            self.bulk_add_tags(entries)
+        return len(entries)
+
+    def scan(self, roots: List[str], workers: int = 8) -> Iterator[Tuple[str, List[str]]]:
+        """Read tag attributes for every file under roots using a thread pool."""
+        def paths():
+            for root in roots:
+                for dirpath, _, filenames in os.walk(root):
+                    for filename in filenames:
+                        yield os.path.join(dirpath, filename)
+
+        pending = paths()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = [*islice(pending, 1024)]
+                if not batch:
+                    break
+                for file_path, tags in zip(batch, pool.map(self._read_tags, batch)):
+                    if tags:
+                        yield file_path, tags
+
+    def rebuild_index(self, roots: List[str], workers: int = 8, chunk_size: int = 500) -> int:
+        """Rebuild index entries under roots from the attributes on disk."""
+        roots = [str(Path(root).resolve()) for root in roots]
+        found = set()
+        chunk = {}
+        for file_path, tags in self.scan(roots, workers):
+            found.add(file_path)
+            chunk[file_path] = [(tag, '') for tag in tags]
+            if len(chunk) >= chunk_size:
+                self.index.bulk_add_tags(chunk, replace=True)
+                chunk = {}
+        if chunk:
+            self.index.bulk_add_tags(chunk, replace=True)
+        # Drop index entries under the roots whose files are gone or no longer carry tags
+        stale = [file_path for file_path, _ in self.index.iter_all_data()
+                 if file_path not in found and any(file_path.startswith(root + os.sep) for root in roots)]
+        if stale:
+            self.index.move_files({file_path: None for file_path in stale})
+        return len(found)
@@ -3,14 +3,29 @@ Tagging System CLI - Core implementation.
 Use main.py for entry point.
 """
 
+import json
+from contextlib import closing
+from datetime import datetime
+from itertools import islice
 import click
 from rich.console import Console
 from typing import List
 from .config import ConfigManager
 from .engine import TagEngine
+from .transfer import FORMATS, read_records, write_records
+from .completion import complete_tags, complete_tag_args
+from .recency import parse_time_spec
+from .federation import FederatedEngine
+from .compression import CODECS
 import argcomplete
 
+try:
+    from tqdm import tqdm
+except ImportError:  # progress bars are optional
+    tqdm = None
+
 console = Console()
+err_console = Console(stderr=True)
 app_config = ConfigManager()
 config_path = '.tagconfig'
 engine = None
@@ -29,8 +44,8 @@ def cli(config):
             engine = None
 
 @cli.command()
-@click.argument('file_path')
-@click.argument('tags', nargs=-1)
+@click.argument('file_path', type=click.Path())
+@click.argument('tags', nargs=-1, shell_complete=complete_tag_args)
 def add(file_path: str, tags: List[str]) -> None:
     """Add tags to a file."""
     parsed_tags = [tuple(tag.split(':', 1)) if ':' in tag else (tag, '') for tag in tags]
@@ -40,25 +55,60 @@ def add(file_path: str, tags: List[str]) -> None:
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
         # Suggestions for existing tags
-        all_tags = engine.get_all_tags()
-        suggestions = [tag for tag in all_tags if any(t.lower() in tag.lower() for t in tags)][:3]
+        suggestions = []
+        for t in tags:
+            suggestions += [s for s in engine.suggest_tags(t.split(':', 1)[0], 3) if s not in suggestions]
+        suggestions = suggestions[:3]
         if suggestions:
             console.print(f"[cyan]Similar tags: {', '.join(suggestions)}[/cyan]")
+        return
+    # Only a hint: never rebuild the co-occurrence matrix for it, and never fail the add over it
+    try:
+        related = engine.suggest_related(engine.get_tags(file_path), 3, build=False)
+    except Exception:
+        related = []
+    if related:
+        console.print(f"[cyan]Often used with: {', '.join(related)}[/cyan]")
+
+def _time_window(since, until):
+    """Parse --since/--until options into POSIX timestamps."""
+    return (parse_time_spec(since) if since else None, parse_time_spec(until) if until else None)
 
 @cli.command()
-@click.argument('query')
+@click.argument('query', default='*', shell_complete=complete_tags)
 @click.option('--type', help='Filter by file type')
+@click.option('--under', type=click.Path(file_okay=False), help='Only files inside this folder')
 @click.option('--fuzzy', is_flag=True, help='Use fuzzy matching')
-def find(query, type, fuzzy):
-    """Search files by tags"""
-    results = engine.search(query, type, fuzzy)
-    for path, tags in results.items():
-        console.print(f"{path}: {tags}")
+@click.option('--limit', type=click.IntRange(min=0), default=None, help='Stop after this many results')
+@click.option('--offset', type=click.IntRange(min=0), default=0, help='Skip this many results first')
+@click.option('--sort', is_flag=True, help='Sort results by path')
+@click.option('--format', 'fmt', type=click.Choice(['rich', 'jsonl', 'paths0']), default='rich', help='Output format')
+@click.option('--paths0', is_flag=True, help='Print NUL-delimited paths (same as --format paths0)')
+@click.option('--since', help='Only tags added since this age (1h, 2d) or ISO date')
+@click.option('--until', help='Only tags added before this age or ISO date')
+def find(query, type, under, fuzzy, limit, offset, sort, fmt, paths0, since, until):
+    """Search files by tags, or by ranges on typed keys (e.g. 'priority>=3 due<2026-12-01')"""
+    if paths0:
+        fmt = 'paths0'
+    found = False
+    try:
+        window = _time_window(since, until)
+        for path, tags in engine.iter_search(query, type, fuzzy, limit=limit, offset=offset, sort=sort, under=under,
+                                             since=window[0], until=window[1]):
+            found = True
+            if fmt == 'jsonl':
+                click.echo(json.dumps({'path': path, 'tags': tags}))
+            elif fmt == 'paths0':
+                click.echo(f"{path}\0", nl=False)
+            else:
+                console.print(f"{path}: {tags}")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
 
     # Auto-suggestions: show close matches if no results
-    if not results and not fuzzy:
-        all_tags = engine.get_all_tags()
-        suggestions = [tag for tag in all_tags if query.lower() in tag.lower()][:5]
+    if not found and not fuzzy and fmt == 'rich':
+        suggestions = engine.suggest_tags(query, 5)
         if suggestions:
             console.print(f"\n[cyan]Suggestions: {', '.join(suggestions)}[/cyan]")
 
@@ -66,15 +116,34 @@ def find(query, type, fuzzy):
 @click.argument('folder_path')
 @click.argument('tag')
 @click.option('--type', help='File type to apply to')
-def apply(folder_path, tag, type):
+@click.option('--full', is_flag=True, help='Rescan every file instead of only new or changed ones')
+def apply(folder_path, tag, type, full):
     """Batch apply tag to folder"""
     parsed_tag = tag.split(':', 1) if ':' in tag else (tag, '')
-    count = engine.batch_apply(folder_path, parsed_tag, type)
-    console.print(f"[green]Applied to {count} files[/green]")
+    report = engine.batch_apply_incremental(folder_path, parsed_tag, type, full=full)
+    console.print(f"[green]Applied to {report['tagged']} files[/green] "
+                  f"({report['skipped']} unchanged files skipped)")
 
 @cli.command()
-@click.argument('file_path')
-@click.argument('tags', nargs=-1)
+@click.argument('folder_path')
+@click.option('--dry-run', is_flag=True, help='Count matches without writing tags')
+@click.option('--full', is_flag=True, help='Rescan every file instead of only new or changed ones')
+def rules(folder_path, dry_run, full):
+    """Apply configured auto-tagging rules to a folder in one pass"""
+    try:
+        report = engine.apply_rules(folder_path, dry_run=dry_run, incremental=not full)
+    except (ValueError, NotADirectoryError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
+    for name, count in report['rules'].items():
+        console.print(f"  {name}: {count} files")
+    verb = "Would apply" if dry_run else "Applied"
+    console.print(f"[green]{verb} {report['tags']} tags to {report['files']} files[/green] "
+                  f"({report['skipped']} unchanged files skipped)")
+
+@cli.command()
+@click.argument('file_path', type=click.Path())
+@click.argument('tags', nargs=-1, shell_complete=complete_tag_args)
 def remove(file_path, tags):
     """Remove tags from a file"""
     parsed_tags = [tag.split(':', 1) if ':' in tag else (tag, '') for tag in tags]
@@ -99,7 +168,22 @@ def list(file_path, all):
         console.print("[red]Specify --all or a file path[/red]")
 
 @cli.command()
-@click.argument('old_tag')
+@click.argument('tag', required=False, shell_complete=complete_tags)
+@click.option('--limit', type=click.IntRange(min=1), default=10, help='Number of results')
+def related(tag, limit):
+    """Show tags most often used together with TAG (or the top tag pairs)"""
+    if tag is None:
+        for first, second, count in engine.cooccurrence_stats(limit):
+            console.print(f"  {first} + {second}: {count} files")
+        return
+    rows = engine.related_tags(tag, limit)
+    if not rows:
+        console.print(f"[yellow]No tags co-occur with '{tag}'[/yellow]")
+    for other, count, score in rows:
+        console.print(f"  {other}: {count} files ({score:.0%} overlap)")
+
+@cli.command()
+@click.argument('old_tag', shell_complete=complete_tags)
 @click.argument('new_tag')
 def rename(old_tag, new_tag):
     """Rename a tag across all files"""
@@ -110,15 +194,144 @@ def rename(old_tag, new_tag):
         console.print(f"[red]Error: {e}[/red]")
 
 @cli.command()
-def stats():
+@click.option('--indexes', is_flag=True, help='Show index memory residency and hit rates')
+@click.option('--since', help='Only count tags added since this age (1h, 2d) or ISO date')
+@click.option('--until', help='Only count tags added before this age or ISO date')
+def stats(indexes, since, until):
     """Show tag statistics"""
-    stats = engine.get_stats()
+    if indexes:
+        info = engine.get_index_stats()
+        mb = 1024 * 1024
+        console.print(f"Index memory: {info['resident_bytes'] / mb:.1f} / {info['budget_bytes'] / mb:.1f} MB")
+        console.print(f"Resident: {len(info['resident'])}  Spilled: {len(info['spilled'])} "
+                      f"({info['spilled_bytes'] / mb:.1f} MB)")
+        console.print(f"Index hits: {info['hits']}  Reloads: {info['reloads']}  "
+                      f"Spills: {info['spills']}  Hit rate: {info['hit_rate']:.0%}")
+        cache = info['query_cache']
+        console.print(f"Query cache hits: {cache['hits']}  Misses: {cache['misses']}")
+        return
+    try:
+        stats = engine.get_stats(*_time_window(since, until))
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
     console.print(f"Total tags: {stats['total_tags']}")
     console.print(f"Unique tags: {stats['unique_tags']}")
+    if 'files' in stats:
+        console.print(f"Files tagged: {stats['files']}")
     console.print("Top tags:")
     for tag, count in stats['top_tags']:
         console.print(f"  {tag}: {count}")
 
+@cli.command()
+@click.option('--since', default='1h', show_default=True, help='Age (30m, 1h, 2d) or ISO date to look back to')
+@click.option('--until', help='Only tags added before this age or ISO date')
+@click.option('--limit', type=click.IntRange(min=0), default=50, help='Maximum rows to show')
+@click.option('--type', help='Filter by file type')
+@click.option('--under', type=click.Path(file_okay=False), help='Only files inside this folder')
+@click.option('--format', 'fmt', type=click.Choice(['rich', 'jsonl']), default='rich', help='Output format')
+def recent(since, until, limit, type, under, fmt):
+    """Show recently added tags, newest first"""
+    try:
+        rows = engine.recent(*_time_window(since, until), limit=limit, type_filter=type, under=under)
+        for path, tag, added_at in rows:
+            if fmt == 'jsonl':
+                click.echo(json.dumps({'path': path, 'tag': tag, 'added_at': added_at}))
+            else:
+                when = datetime.fromtimestamp(added_at).strftime('%Y-%m-%d %H:%M:%S')
+                console.print(f"{when}  {path}: [green]{tag}[/green]")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+
+@cli.command()
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='jsonl', help='Record format')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout)')
+def export(fmt, output):
+    """Stream all file tags to a file or stdout"""
+    count = write_records(engine.export_data(), output, fmt)
+    if output.name != '<stdout>':
+        console.print(f"[green]Exported {count} files to {output.name}[/green]")
+
+@cli.command(name='import')
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='jsonl', help='Record format')
+@click.option('--mode', type=click.Choice(['merge', 'replace']), default='merge', help='Merge with or replace existing tags')
+@click.option('--dry-run', is_flag=True, help='Validate and count without writing')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=500, help='Files per bulk write')
+@click.option('--progress', is_flag=True, help='Show a progress bar (requires tqdm)')
+def import_(source, fmt, mode, dry_run, chunk_size, progress):
+    """Bulk import file tags from a file or stdin"""
+    if progress and tqdm is None:
+        console.print("[yellow]tqdm is not installed; progress disabled[/yellow]")
+    bar = tqdm(unit='file') if progress and tqdm else None
+    try:
+        totals = engine.import_data(read_records(source, fmt), mode=mode, dry_run=dry_run,
+                                    chunk_size=chunk_size, progress=bar.update if bar is not None else None)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
+    finally:
+        if bar is not None:
+            bar.close()
+    verb = "Would import" if dry_run else "Imported"
+    console.print(f"[green]{verb} {totals['tags']} tags on {totals['files']} files ({mode})[/green]")
+    if totals['skipped']:
+        console.print(f"[yellow]Skipped {totals['skipped']} files that no longer exist[/yellow]")
+
+@cli.command()
+@click.argument('source', type=click.File('r'), default='-')
+def batch(source):
+    """Apply JSONL add/remove/rename operations from a file or stdin in one write"""
+    counts = {'ok': 0, 'error': 0}
+    for result in engine.apply_batch(source):
+        counts[result['status']] += 1
+        click.echo(json.dumps(result))
+    err_console.print(f"[green]Applied {counts['ok']} operations[/green]"
+                      + (f", [red]{counts['error']} failed[/red]" if counts['error'] else ""))
+
+@cli.command()
+@click.argument('roots', nargs=-1, required=True)
+@click.option('--workers', type=click.IntRange(min=1), default=8, help='Parallel scan threads')
+def reindex(roots, workers):
+    """Rebuild the xattr central index by scanning folders"""
+    try:
+        count = engine.rebuild_index(roots, workers=workers)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    console.print(f"[green]Indexed {count} tagged files[/green]")
+
+@cli.command()
+@click.argument('roots', nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.option('--dry-run', is_flag=True, help='Report stale and moved entries without changing the store')
+@click.option('--workers', type=click.IntRange(min=1), default=8, help='Parallel stat threads')
+def gc(roots, dry_run, workers):
+    """Prune entries of deleted files, re-attaching tags of files moved under ROOTS"""
+    report = engine.reconcile(roots, dry_run=dry_run, workers=workers)
+    for old_path, new_path in report['moved'].items():
+        console.print(f"  [cyan]{old_path}[/cyan] -> [cyan]{new_path}[/cyan]")
+    for file_path in report['pruned']:
+        console.print(f"  [red]{file_path}[/red]")
+    for file_path, error in report['errors'].items():
+        console.print(f"  [yellow]{file_path}: {error} (kept)[/yellow]")
+    moved, pruned = ("would re-attach", "would prune") if dry_run else ("re-attached", "pruned")
+    console.print(f"[green]Checked {report['checked']} files: {moved} {len(report['moved'])} moved, "
+                  f"{pruned} {len(report['pruned'])} missing[/green]")
+    if report['errors']:
+        console.print(f"[yellow]Could not check {len(report['errors'])} files; their entries were kept[/yellow]")
+
+@cli.command()
+@click.option('--to', 'codec', type=click.Choice(CODECS), help='Codec to convert to (default: compression setting)')
+def compact(codec):
+    """Convert the store, history and index files to compressed (or plain) form"""
+    try:
+        report = engine.compact(codec)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
+    console.print(f"[green]Converted {report['files']} files to {report['codec']}: "
+                  f"{report['bytes_before']:,} -> {report['bytes_after']:,} bytes[/green]")
+
 @cli.command()
 def undo():
     """Undo the last operation"""
@@ -129,7 +342,7 @@ def undo():
         console.print(f"[red]Error: {e}[/red]")
 
 @cli.command()
-@click.option('--to', required=True, type=click.Choice(['md', 'db']))
+@click.option('--to', required=True, type=click.Choice(['md', 'db', 'xattr']))
 @click.option('--migrate', is_flag=True, help='Migrate data to new backend')
 def switch(to, migrate):
     """Switch storage backend"""
@@ -139,17 +352,17 @@ def switch(to, migrate):
         # Perform migration
         if to == 'db':
             raise ValueError("Database storage not available")
+        elif to == 'xattr':
+            from .storage.xattr import XattrStorage
+            new_storage = XattrStorage(app_config)
         else:
             from .storage.markdown import MarkdownStorage
             new_storage = MarkdownStorage(app_config)
         
-        # Get all data from current storage
-        all_data = engine.storage.get_all_data()
-        # Add to new storage
-        for file_path, tags in all_data.items():
-            new_storage.add_tags(file_path, [(tag, '') for tag in tags])
-        
+        totals = engine.migrate_to(new_storage)
         console.print(f"[green]Migrated data to {to} storage[/green]")
+        if totals['skipped']:
+            console.print(f"[yellow]Skipped {totals['skipped']} files that no longer exist[/yellow]")
     
     app_config.data['storage'] = to
     app_config.save(config_path)
@@ -197,6 +410,96 @@ def set_storage(path):
     # Recreate engine with new path
     engine = TagEngine(app_config)
 
+@cli.group()
+def federated():
+    """Query every store listed under 'federation' in the config at once"""
+
+def _federation():
+    """Open every federated store, or report why that is not possible."""
+    try:
+        return FederatedEngine(app_config)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return None
+
+def _print_timings(fed):
+    """Per-root timing report, on stderr so piped output stays clean."""
+    for name, timing in fed.timings.items():
+        status = f"[red]failed: {timing['error']}[/red]" if timing['error'] else f"{timing['results']} results"
+        err_console.print(f"  {name}: {timing['seconds'] * 1000:.1f} ms, {status}")
+
+@federated.command(name='find')
+@click.argument('query', default='*', shell_complete=complete_tags)
+@click.option('--type', help='Filter by file type')
+@click.option('--under', type=click.Path(file_okay=False), help='Only files inside this folder')
+@click.option('--fuzzy', is_flag=True, help='Use fuzzy matching')
+@click.option('--limit', type=click.IntRange(min=0), default=None, help='Stop after this many results')
+@click.option('--since', help='Only tags added since this age (1h, 2d) or ISO date')
+@click.option('--until', help='Only tags added before this age or ISO date')
+@click.option('--format', 'fmt', type=click.Choice(['rich', 'jsonl', 'paths0']), default='rich', help='Output format')
+@click.option('--timings', is_flag=True, help='Report per-store timing')
+def federated_find(query, type, under, fuzzy, limit, since, until, fmt, timings):
+    """Search all federated stores, merged by path"""
+    fed = _federation()
+    if fed is None:
+        return
+    try:
+        window = _time_window(since, until)
+        # Closed before fed.close() even on a broken pipe or ^C, so per-store readers are released
+        with closing(fed.iter_search(query, type, fuzzy, under=under, since=window[0], until=window[1])) as results:
+            for path, tags, roots in islice(results, limit):
+                if fmt == 'jsonl':
+                    click.echo(json.dumps({'path': path, 'tags': tags, 'stores': roots}))
+                elif fmt == 'paths0':
+                    click.echo(f"{path}\0", nl=False)
+                else:
+                    console.print(f"{path}: {tags} [dim]({', '.join(roots)})[/dim]")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    finally:
+        fed.close()
+    if timings:
+        _print_timings(fed)
+
+@federated.command(name='stats')
+@click.option('--timings', is_flag=True, help='Report per-store timing')
+def federated_stats(timings):
+    """Combined tag statistics for all federated stores"""
+    fed = _federation()
+    if fed is None:
+        return
+    try:
+        stats = fed.get_stats()
+    finally:
+        fed.close()
+    console.print(f"Total tags: {stats['total_tags']}")
+    console.print(f"Unique tags: {stats['unique_tags']}")
+    for name, root in stats['roots'].items():
+        console.print(f"  {name}: {root['total_tags']} tags")
+    console.print("Top tags:")
+    for tag, count in stats['top_tags']:
+        console.print(f"  {tag}: {count}")
+    if timings:
+        _print_timings(fed)
+
+@federated.command(name='export')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='jsonl', help='Record format')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout)')
+@click.option('--timings', is_flag=True, help='Report per-store timing')
+def federated_export(fmt, output, timings):
+    """Stream the merged file tags of all federated stores"""
+    fed = _federation()
+    if fed is None:
+        return
+    try:
+        count = write_records(((path, tags) for path, tags, _ in fed.export_data()), output, fmt)
+    finally:
+        fed.close()
+    if output.name != '<stdout>':
+        console.print(f"[green]Exported {count} files to {output.name}[/green]")
+    if timings:
+        _print_timings(fed)
+
 if __name__ == '__main__':
     argcomplete.autocomplete(cli)
     cli()
\ No newline at end of file
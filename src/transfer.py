@@ -0,0 +1,86 @@
+"""
+Streaming import/export of file-tag records.
+Supports JSONL, CSV and NUL-delimited formats without loading the store.
+"""
+import csv
+import json
+from itertools import groupby, islice
+from typing import Iterable, Iterator, List, TextIO, Tuple
+
+FORMATS = ('jsonl', 'csv', 'nul')
+
+def write_records(records: Iterable[Tuple[str, List[str]]], stream: TextIO, fmt: str) -> int:
+    """Write (path, tags) records to a text stream, returning the record count."""
+    count = 0
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(['path', 'tag'])
+    for file_path, tags in records:
+        if fmt == 'jsonl':
+            stream.write(json.dumps({'path': file_path, 'tags': tags}) + '\n')
+        elif fmt == 'csv':
+            # One row per association; untagged files keep an empty tag cell
+            writer.writerows([file_path, tag] for tag in tags or [''])
+        elif fmt == 'nul':
+            # path\0tag\0...\0 terminated by an empty field
+            stream.write('\0'.join([file_path, *tags]) + '\0\0')
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+        count += 1
+    return count
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Tuple[str, List[str]]]:
+    """Lazily parse (path, tags) records from a text stream."""
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield record['path'], list(record.get('tags', []))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Invalid JSONL record on line {line_no}: {e}")
+    elif fmt == 'csv':
+        rows = csv.reader(stream)
+        header = next(rows, None)
+        if header and header[:2] != ['path', 'tag']:
+            raise ValueError("CSV input must start with a 'path,tag' header")
+        # Rows for the same file are contiguous in our exports
+        # Blank lines parse as empty rows; skip them like blank JSONL lines
+        for file_path, group in groupby((row for row in rows if row), key=lambda row: row[0]):
+            yield file_path, [row[1] for row in group if len(row) > 1 and row[1]]
+    elif fmt == 'nul':
+        record: List[str] = []
+        for field in _iter_nul_fields(stream):
+            if field:
+                record.append(field)
+            elif record:
+                yield record[0], record[1:]
+                record = []
+        if record:
+            yield record[0], record[1:]
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+def _iter_nul_fields(stream: TextIO, chunk_size: int = 65536) -> Iterator[str]:
+    """Split a stream on NUL characters without reading it all at once."""
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        *fields, buffer = buffer.split('\0')
+        yield from fields
+    if buffer:
+        yield buffer
+
+def chunked(records: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most ``size`` items."""
+    iterator = iter(records)
+    while True:
+        chunk = [*islice(iterator, size)]
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,180 @@
+"""
+Sorted value indexes for typed tags.
+Tag keys declared in the ``tag_types`` config (int, float, date) get a
+per-key column of values sorted ascending, so range predicates such as
+``priority>=3`` or ``due<2026-12-01`` are answered by binary search.
+"""
+import json
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .compression import data_path, existing_path, open_read, open_write
+from .fileio import atomic_write
+
+INDEX_DIR = 'value_index'
+TYPE_PARSERS: Dict[str, Callable[[str], Any]] = {
+    'int': int,
+    'float': float,
+    'date': lambda text: date.fromisoformat(text).toordinal(),
+}
+PREDICATE = re.compile(r'^(?P<key>[^<>=\s]+?)(?P<op>>=|<=|==|=|>|<)(?P<value>\S+)$')
+
+def validate_tag_types(tag_types: Dict[str, str]) -> Dict[str, str]:
+    """Check the configured value type of each key."""
+    for key, kind in tag_types.items():
+        if kind not in TYPE_PARSERS:
+            raise ValueError(f"Unknown tag type '{kind}' for key '{key}' (expected one of: {', '.join(TYPE_PARSERS)})")
+    return tag_types
+
+def parse_value(kind: str, text: str) -> Any:
+    """Convert a tag value to its sortable form (dates become ordinals)."""
+    return TYPE_PARSERS[kind](text)
+
+def parse_predicates(query: str, tag_types: Dict[str, str]) -> Optional[List[Tuple[str, str, Any]]]:
+    """Parse whitespace-separated range predicates on typed keys, or None for a plain tag query."""
+    predicates = []
+    for term in query.split():
+        match = PREDICATE.match(term)
+        if not match or match['key'] not in tag_types:
+            return None
+        key, op, text = match['key'], match['op'], match['value']
+        try:
+            value = parse_value(tag_types[key], text)
+        except ValueError:
+            raise ValueError(f"Invalid {tag_types[key]} value for '{key}': {text!r}")
+        predicates.append((key, '=' if op == '==' else op, value))
+    return predicates or None
+
+class ValueIndex:
+    """Per-key sorted (value, path, tag) columns persisted next to the store.
+
+    Layout: ``value_index/stamp`` holds the stamp (store generation plus
+    tag type config) the columns were built at, and ``value_index/<key>.json``
+    holds ``{"values": [...], "paths": [...], "tags": [...]}`` sorted by value.
+    """
+
+    def __init__(self, storage_path: str, codec: Optional[str] = None):
+        self.directory = Path(storage_path) / INDEX_DIR
+        self.codec = codec
+
+    @property
+    def stamp(self) -> Optional[str]:
+        """Stamp the index was built at, or None if it was never built."""
+        try:
+            return (self.directory / 'stamp').read_text()
+        except FileNotFoundError:
+            return None
+
+    def _key_file(self, key: str) -> Path:
+        # Keys may contain characters that are unsafe in file names
+        return self.directory / (key.encode('utf-8').hex() + '.json')
+
+    @staticmethod
+    def _typed(tag: str, tag_types: Dict[str, str], separator: str) -> Optional[Tuple[str, Any]]:
+        """(key, sortable value) of a typed tag, or None for untyped tags and values that do not parse."""
+        key, sep, text = tag.partition(separator)
+        if not sep or key not in tag_types:
+            return None
+        try:
+            return key, parse_value(tag_types[key], text)
+        except ValueError:
+            return None
+
+    def build(self, records: Iterable[Tuple[str, List[str]]], tag_types: Dict[str, str],
+              separator: str, stamp: str) -> None:
+        """Rebuild every key column from (path, tags) records; values that do not parse are skipped."""
+        rows: Dict[str, List[Tuple[Any, str, str]]] = {key: [] for key in tag_types}
+        for file_path, tags in records:
+            for tag in tags:
+                typed = self._typed(tag, tag_types, separator)
+                if typed is not None:
+                    rows[typed[0]].append((typed[1], file_path, tag))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for stale in self.directory.glob('*.json*'):
+            stale.unlink()
+        for key, entries in rows.items():
+            entries.sort()
+            columns = {'values': [e[0] for e in entries], 'paths': [e[1] for e in entries],
+                       'tags': [e[2] for e in entries]}
+            with open_write(data_path(self._key_file(key), self.codec)) as f:
+                json.dump(columns, f)
+        # Written last so a crashed build is never mistaken for a current one
+        atomic_write(self.directory / 'stamp', stamp)
+
+    def apply_change(self, file_path: str, before: Set[str], after: Set[str], tag_types: Dict[str, str],
+                     separator: str, old_stamp: str, new_stamp: str) -> Optional[Dict[str, Dict[str, List]]]:
+        """Move one file's changed typed tags into place in their columns and restamp the index.
+
+        Only applies when the index is at ``old_stamp``; otherwise returns None
+        and leaves it stale for the next query to rebuild. Returns the
+        rewritten columns by key.
+        """
+        if self.stamp != old_stamp:
+            return None
+        changes: Dict[str, List[Tuple[Any, str, bool]]] = {}
+        for tag in before ^ after:
+            typed = self._typed(tag, tag_types, separator)
+            if typed is not None:
+                changes.setdefault(typed[0], []).append((typed[1], tag, tag in after))
+        updated = {}
+        for key, entries in changes.items():
+            columns = self.load(key)
+            for value, tag, present in entries:
+                i = self._position(columns, value, file_path, tag)
+                found = i < len(columns['values']) and columns['paths'][i] == file_path \
+                    and columns['tags'][i] == tag and columns['values'][i] == value
+                if present and not found:
+                    for name, item in (('values', value), ('paths', file_path), ('tags', tag)):
+                        columns[name].insert(i, item)
+                elif found and not present:
+                    for name in ('values', 'paths', 'tags'):
+                        del columns[name][i]
+            with open_write(data_path(self._key_file(key), self.codec)) as f:
+                json.dump(columns, f)
+            updated[key] = columns
+        atomic_write(self.directory / 'stamp', new_stamp)
+        return updated
+
+    @staticmethod
+    def _position(columns: Dict[str, List], value: Any, file_path: str, tag: str) -> int:
+        """Index of (value, path, tag) in the columns' sort order."""
+        values, paths, tags = columns['values'], columns['paths'], columns['tags']
+        lo, hi = bisect_left(values, value), bisect_right(values, value)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (paths[mid], tags[mid]) < (file_path, tag):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def load(self, key: str) -> Dict[str, List]:
+        """Read one key's columns."""
+        try:
+            with open_read(existing_path(self._key_file(key), self.codec)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'values': [], 'paths': [], 'tags': []}
+
+    @staticmethod
+    def select(columns: Dict[str, List], op: str, value: Any) -> Dict[str, List[str]]:
+        """Files whose value satisfies ``op value``, found by bisecting the sorted column."""
+        values = columns['values']
+        lo, hi = 0, len(values)
+        if op == '>=':
+            lo = bisect_left(values, value)
+        elif op == '>':
+            lo = bisect_right(values, value)
+        elif op == '<=':
+            hi = bisect_right(values, value)
+        elif op == '<':
+            hi = bisect_left(values, value)
+        else:
+            lo, hi = bisect_left(values, value), bisect_right(values, value)
+        hits: Dict[str, List[str]] = {}
+        for file_path, tag in zip(columns['paths'][lo:hi], columns['tags'][lo:hi]):
+            hits.setdefault(file_path, []).append(tag)
+        return hits
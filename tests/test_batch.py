@@ -0,0 +1,25 @@
+import unittest
+from src.batch import parse_op, rename_in
+
+class TestBatchOps(unittest.TestCase):
+
+    def test_parse_op_normalizes_tags(self):
+        op = parse_op('{"op": "add", "path": "a.txt", "tags": ["status:done", "work"]}')
+        self.assertEqual(op, {'op': 'add', 'path': 'a.txt', 'tags': [('status', 'done'), ('work', '')]})
+        self.assertEqual(parse_op('{"op": "rename", "old": "a", "new": "b"}'), {'op': 'rename', 'old': 'a', 'new': 'b'})
+
+    def test_parse_op_rejects_invalid_records(self):
+        for line in ('not json', '[]', '{"op": "tag"}', '{"op": "add", "path": "a.txt"}',
+                     '{"op": "remove", "tags": ["x"]}', '{"op": "rename", "old": "a"}'):
+            with self.assertRaises(ValueError):
+                parse_op(line)
+
+    def test_rename_in(self):
+        tags = ["a", "b"]
+        rename_in(tags, "a", "b")
+        self.assertEqual(tags, ["b"])
+        rename_in(tags, "missing", "c")
+        self.assertEqual(tags, ["b"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import tempfile
+from pathlib import Path
+from src.cache import MISS, QueryCache
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.generation_file = self.temp_dir / '.generation'
+
+    def test_lru_eviction(self):
+        cache = QueryCache(self.generation_file, max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'a' becomes most recent
+        cache.put('c', 3)
+        self.assertIs(cache.get('b'), MISS)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_bump_from_another_process_invalidates(self):
+        cache = QueryCache(self.generation_file)
+        other = QueryCache(self.generation_file)
+        cache.put('q', [1])
+        other.bump()
+        self.assertIs(cache.get('q'), MISS)
+
+    def test_put_ignores_results_computed_before_a_bump(self):
+        cache = QueryCache(self.generation_file)
+        generation = cache.generation
+        QueryCache(self.generation_file).bump()
+        cache.put('q', [1], generation)
+        self.assertIs(cache.get('q'), MISS)
+
+    def test_shared_file_reused_until_bump(self):
+        shared = self.temp_dir / 'query_cache.json'
+        key = QueryCache.make_key('md', 'search', 'x', None, False)
+        QueryCache(self.generation_file, shared_file=shared).put(key, {'/a': ['x']})
+        reader = QueryCache(self.generation_file, shared_file=shared)
+        self.assertEqual(reader.get(key), {'/a': ['x']})
+        reader.bump()
+        self.assertIs(QueryCache(self.generation_file, shared_file=shared).get(key), MISS)
+
+    def test_zero_size_disables(self):
+        cache = QueryCache(self.generation_file, max_entries=0)
+        cache.put('a', 1)
+        self.assertIs(cache.get('a'), MISS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -50,6 +50,33 @@ class TestCLI(unittest.TestCase):
             self.assertIn("Relocated existing storage files to /new/path", result.output)
             mock_engine.relocate_storage.assert_called_with('/new/path')
             mock_config.set_storage_path.assert_called_with('/new/path')
+    @patch('src.tag.app_config')
+    @patch('src.tag.engine')
+    def test_find_paths0_streams_raw_paths(self, mock_engine, mock_config):
+        mock_engine.iter_search.return_value = iter([('/a b.txt', ['x']), ('/c.txt', ['x'])])
+        result = self.runner.invoke(cli, ['find', 'x', '--paths0', '--limit', '2'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '/a b.txt\0/c.txt\0')
+        mock_engine.iter_search.assert_called_with('x', None, False, limit=2, offset=0, sort=False, under=None,
+                                                   since=None, until=None)
+
+    @patch('src.tag.app_config')
+    @patch('src.tag.engine')
+    def test_find_jsonl_format(self, mock_engine, mock_config):
+        mock_engine.iter_search.return_value = iter([('/a.txt', ['x', 'y'])])
+        result = self.runner.invoke(cli, ['find', 'x', '--format', 'jsonl'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '{"path": "/a.txt", "tags": ["x", "y"]}\n')
+
+    @patch('src.tag.app_config')
+    @patch('src.tag.engine')
+    def test_add_reports_success_even_if_related_hint_fails(self, mock_engine, mock_config):
+        mock_engine.suggest_related.side_effect = OSError("cooccurrence.json unreadable")
+        result = self.runner.invoke(cli, ['add', '/a.txt', 'x'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Added tags to /a.txt", result.output)
+        self.assertNotIn("Error", result.output)
+        self.assertEqual(mock_engine.suggest_related.call_args.kwargs, {'build': False})
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tempfile
+from pathlib import Path
+from src.completion import CompletionIndex, complete_tag_args
+
+class TestCompletionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = CompletionIndex(self.temp_dir)
+        records = [("/a", ["project/alpha", "Project/Beta", "work"]),
+                   ("/b", ["project/alpha", "homework"]),
+                   ("/c", ["project/alpha", "pro"])]
+        self.index.build(CompletionIndex.count_tags(records), "7-abc")
+
+    def test_generation_recorded(self):
+        self.assertEqual(self.index.generation, "7-abc")
+        self.assertIsNone(CompletionIndex(tempfile.mkdtemp()).generation)
+
+    def test_prefix_is_case_insensitive_and_ranked_by_frequency(self):
+        self.assertEqual(self.index.prefix("pro"), ["project/alpha", "pro", "Project/Beta"])
+        self.assertEqual(self.index.prefix("project/b"), ["Project/Beta"])
+        self.assertEqual(self.index.prefix("zzz"), [])
+        self.assertEqual(self.index.prefix("a"), [])
+
+    def test_substring_and_suggest(self):
+        self.assertEqual(sorted(self.index.substring("work")), ["homework", "work"])
+        self.assertEqual(self.index.suggest("wor", 5), ["work", "homework"])
+
+    def test_binary_search_over_many_entries(self):
+        counts = {f"tag{i:05d}": 1 for i in range(5000)}
+        self.index.build(counts, "1")
+        self.assertEqual(self.index.prefix("tag0420"), [f"tag0420{i}" for i in range(10)])
+        self.assertEqual(self.index.prefix("tag04999"), ["tag04999"])
+
+    def test_prefix_ranks_all_matches_before_limiting(self):
+        counts = {f"tag{i:05d}": 1 for i in range(6000)}
+        counts["tagzzz"] = 50
+        self.index.build(counts, "1")
+        self.assertEqual(self.index.prefix("tag", limit=1), ["tagzzz"])
+        self.assertEqual(self.index.substring("zz", limit=1), ["tagzzz"])
+
+    def test_empty_and_one_character_prefixes_use_precomputed_ranking(self):
+        counts = {f"tag{i:05d}": 1 for i in range(6000)}
+        counts.update({"tagzzz": 50, "Zulu": 20, "zeta": 30})
+        self.index.build(counts, "1")
+        with patch.object(CompletionIndex, '_scan_prefix', side_effect=AssertionError):
+            self.assertEqual(self.index.prefix("", limit=3), ["tagzzz", "zeta", "Zulu"])
+            self.assertEqual(self.index.prefix("Z"), ["zeta", "Zulu"])
+            self.assertEqual(self.index.prefix("q"), [])
+        # Beyond the stored ranking, lookups fall back to a scan
+        self.assertEqual(len(self.index.prefix("t", limit=100)), 100)
+
+    def test_index_without_shortcut_lines_still_readable(self):
+        self.index.path.write_text("3\npro\tpro\t2\nwork\twork\t1\n")
+        self.assertEqual(self.index.generation, "3")
+        self.assertEqual(self.index.prefix(""), ["pro", "work"])
+        self.assertEqual(self.index.substring("or"), ["work"])
+
+    def test_click_completer_uses_colon_form_without_engine(self):
+        ctx = MagicMock()
+        ctx.find_root.return_value.params = {'config': '/nonexistent/.tagconfig'}
+        (Path(self.temp_dir) / '.generation').write_text("7-abc")
+        with patch('src.config.ConfigManager.get_storage_path', return_value=self.temp_dir), \
+             patch('src.engine.TagEngine.__init__', side_effect=AssertionError):
+            self.assertEqual(complete_tag_args(ctx, None, "project:a"), ["project:alpha"])
+
+    def test_click_completer_rebuilds_stale_index_from_store(self):
+        ctx = MagicMock()
+        ctx.find_root.return_value.params = {'config': '/nonexistent/.tagconfig'}
+        (Path(self.temp_dir) / '.generation').write_text("8-def")
+        storage = MagicMock()
+        storage.iter_all_data.return_value = iter([("/a", ["fresh/tag"])])
+        with patch('src.config.ConfigManager.get_storage_path', return_value=self.temp_dir), \
+             patch('src.storage.StorageFactory.create', return_value=storage):
+            self.assertEqual(complete_tag_args(ctx, None, "fr"), ["fresh:tag"])
+        self.assertEqual(self.index.generation, "8-def")
+        storage.close.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from src import compression
+from src.compression import (convert, existing_path, iter_log, open_append, open_read, open_write, resolve_codec,
+                             write_text)
+from src.cooccurrence import CooccurrenceIndex, CooccurrenceMatrix
+from src.reconcile import FingerprintLog
+from src.storage.markdown import MarkdownStorage
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def test_gzip_round_trip_and_append(self):
+        path = self.temp_dir / "log.txt.gz"
+        write_text(path, "one\n")
+        with open_append(path) as f:
+            f.write("two\n")
+        self.assertEqual(path.read_bytes()[:2], b"\x1f\x8b")
+        with open_read(path) as f:
+            self.assertEqual(f.readlines(), ["one\n", "two\n"])
+
+    def test_failed_write_keeps_previous_file(self):
+        path = self.temp_dir / "data.json.gz"
+        write_text(path, "old")
+        with self.assertRaises(RuntimeError):
+            with open_write(path) as f:
+                f.write("new")
+                raise RuntimeError("boom")
+        with open_read(path) as f:
+            self.assertEqual(f.read(), "old")
+
+    def test_convert_and_existing_path(self):
+        base = self.temp_dir / "tags.md"
+        write_text(base, "# data\n")
+        self.assertEqual(existing_path(base, 'gzip'), base)
+        converted = convert(base, 'gzip')
+        self.assertEqual(converted, self.temp_dir / "tags.md.gz")
+        self.assertFalse(base.exists())
+        self.assertEqual(existing_path(base), converted)
+        with open_read(convert(converted, None)) as f:
+            self.assertEqual(f.read(), "# data\n")
+
+    def test_resolve_codec(self):
+        self.assertIsNone(resolve_codec('none'))
+        self.assertEqual(resolve_codec('gzip'), 'gzip')
+        with patch.object(compression, 'zstandard', None):
+            self.assertEqual(resolve_codec('zstd'), 'gzip')
+        with self.assertRaises(ValueError):
+            resolve_codec('lzma')
+
+    def test_markdown_store_compressed(self):
+        config = MagicMock()
+        config.get_storage_path.return_value = str(self.temp_dir)
+        config.get.side_effect = lambda key, default=None: {'separator': '/', 'compression': 'gzip'}.get(key, default)
+        storage = MarkdownStorage(config)
+        self.assertEqual(storage.tags_file, self.temp_dir / "tags.md.gz")
+        storage.bulk_add_tags({"/a.txt": [("x", "")]})
+        self.assertEqual(MarkdownStorage(config).get_all_data(), {"/a.txt": ["x"]})
+
+    def test_logs_survive_a_truncated_compressed_append(self):
+        legacy = self.temp_dir / "fingerprints.log.gz"
+        write_text(legacy, '["/a", 1, 2, 3, 4]\n')
+        first_member = legacy.stat().st_size
+        with open_append(legacy) as f:
+            f.write('["/b", 5, 6, 7, 8]\n')
+        legacy.write_bytes(legacy.read_bytes()[:first_member + 12])  # crash while appending the second member
+        self.assertEqual([*iter_log(self.temp_dir / "fingerprints.log")], ['["/a", 1, 2, 3, 4]\n'])
+        log = FingerprintLog(str(self.temp_dir))
+        log.record({"/c": (9, 9, 9, 9)})
+        self.assertEqual(log.path, self.temp_dir / "fingerprints.log")
+        self.assertEqual(log.load(), {"/a": (1, 2, 3, 4), "/c": (9, 9, 9, 9)})
+        log.save(log.load())
+        self.assertFalse(legacy.exists())
+        self.assertEqual(set(log.load()), {"/a", "/c"})
+
+    def test_cooccurrence_log_is_plain_and_tolerates_damage(self):
+        index = CooccurrenceIndex(str(self.temp_dir), 'gzip')
+        index.save(CooccurrenceMatrix.build([("/a", ["x", "y"])]), "1")
+        index.append("1", "2", {"x"}, {"x", "z"})
+        self.assertEqual(index.base_path.name, "cooccurrence.json.gz")
+        self.assertEqual(index.log_path.name, "cooccurrence.log")
+        self.assertIsNotNone(index.load("2"))
+        (self.temp_dir / "cooccurrence.log.gz").write_bytes(b"\x1f\x8b\x08garbage")
+        self.assertIsNotNone(index.load("2"))
+
+    def test_markdown_writer_follows_compaction_by_another_process(self):
+        config = MagicMock()
+        config.get_storage_path.return_value = str(self.temp_dir)
+        config.get.side_effect = lambda key, default=None: '/' if key == 'separator' else default
+        storage = MarkdownStorage(config)
+        storage.bulk_add_tags({"/a.txt": [("x", "")]})
+        convert(self.temp_dir / "tags.md", 'gzip')  # 'tagg compact --to gzip' elsewhere
+        storage.bulk_add_tags({"/b.txt": [("y", "")]})
+        self.assertFalse((self.temp_dir / "tags.md").exists())
+        self.assertEqual(MarkdownStorage(config).get_all_data(), {"/a.txt": ["x"], "/b.txt": ["y"]})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+from unittest.mock import patch
+from src import cooccurrence
+from src.cooccurrence import CooccurrenceIndex, CooccurrenceMatrix
+
+RECORDS = [
+    ('/a', ['python', 'code', 'work']),
+    ('/b', ['python', 'code']),
+    ('/c', ['python', 'notes']),
+    ('/d', ['recipes']),
+]
+
+class TestCooccurrence(unittest.TestCase):
+
+    def setUp(self):
+        with patch.object(cooccurrence, 'sparse', None):
+            self.matrix = CooccurrenceMatrix.build(RECORDS)
+
+    def test_counts_and_related_ranking(self):
+        self.assertEqual(self.matrix.counts['python'], 3)
+        self.assertEqual(self.matrix.pairs['code'], {'python': 2, 'work': 1})
+        related = self.matrix.related('code')
+        self.assertEqual([(tag, count) for tag, count, _ in related], [('python', 2), ('work', 1)])
+        self.assertAlmostEqual(related[0][2], 2 / 3)
+        self.assertEqual(self.matrix.related('recipes'), [])
+
+    def test_suggest_and_top_pairs(self):
+        self.assertEqual(self.matrix.suggest(['code'], 2), ['python', 'work'])
+        self.assertEqual(self.matrix.top_pairs(1), [('code', 'python', 2)])
+
+    def test_apply_change_matches_rebuild(self):
+        self.matrix.apply_change({'python', 'notes'}, {'python', 'code'})
+        rebuilt = CooccurrenceMatrix.build(RECORDS[:2] + [('/c', ['python', 'code'])] + RECORDS[3:])
+        self.assertEqual((self.matrix.counts, self.matrix.pairs), (rebuilt.counts, rebuilt.pairs))
+
+    @unittest.skipIf(cooccurrence.sparse is None, "scipy not installed")
+    def test_sparse_build_matches_fallback(self):
+        built = CooccurrenceMatrix.build(RECORDS)
+        self.assertEqual((built.counts, built.pairs), (self.matrix.counts, self.matrix.pairs))
+
+    def test_index_replays_change_log(self):
+        index = CooccurrenceIndex(tempfile.mkdtemp())
+        self.assertIsNone(index.load('1'))
+        index.save(self.matrix, '1')
+        index.append('1', '2', {'recipes'}, {'recipes', 'dinner'})
+        self.assertEqual(index.load('2').pairs['dinner'], {'recipes': 1})
+        # A change the log never saw means the matrix has to be rebuilt
+        self.assertIsNone(index.load('3'))
+
+if __name__ == '__main__':
+    unittest.main()
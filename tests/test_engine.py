@@ -1,4 +1,8 @@
 import unittest
+import os
+import subprocess
+import sys
+import time
 from unittest.mock import MagicMock, patch
 import tempfile
 from pathlib import Path
@@ -11,7 +15,7 @@ class TestTagEngine(unittest.TestCase):
         self.temp_dir = tempfile.mkdtemp()
         self.config_mock = MagicMock(spec=ConfigManager)
         self.config_mock.get_storage_path.return_value = self.temp_dir
-        self.config_mock.get.return_value = '/'
+        self.config_mock.get.side_effect = lambda key, default=None: '/' if key == 'separator' else default
 
     def test_engine_init_with_storage_path(self):
         """Test engine initializes and calls get_storage_path."""
@@ -73,5 +77,373 @@ class TestTagEngine(unittest.TestCase):
         engine.batch_apply(str(folder), ("key", "value"))
         storage_mock.batch_apply.assert_called_with(abs_folder, ("key", "value"), None)
 
+    def test_iter_search_applies_offset_and_limit_lazily(self):
+        """Test iter_search stops pulling from storage once the limit is met."""
+        storage_mock = MagicMock()
+        pulled = []
+        def rows(*args):
+            for i in range(100):
+                pulled.append(i)
+                yield f"/f{i}", ["tag"]
+        storage_mock.iter_search.side_effect = rows
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        results = list(engine.iter_search("tag", limit=2, offset=3, sort=True))
+        self.assertEqual([p for p, _ in results], ["/f3", "/f4"])
+        self.assertEqual(len(pulled), 5)
+        storage_mock.iter_search.assert_called_with("tag", None, False, True, None)
+
+    def test_import_data_chunks_and_dry_run(self):
+        """Test import_data writes in chunks and skips writes on dry run."""
+        storage_mock = MagicMock()
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        records = [(f"/f{i}", ["a", "b"]) for i in range(5)]
+        storage_mock.bulk_add_tags.return_value = None
+        totals = engine.import_data(iter(records), mode='replace', chunk_size=2)
+        self.assertEqual(totals, {'files': 5, 'tags': 10, 'skipped': 0})
+        self.assertEqual(storage_mock.bulk_add_tags.call_count, 3)
+        storage_mock.bulk_add_tags.assert_called_with({"/f4": [("a", ""), ("b", "")]}, replace=True)
+        storage_mock.reset_mock()
+        engine.import_data(iter(records), dry_run=True)
+        storage_mock.bulk_add_tags.assert_not_called()
+
+    def test_batch_apply_incremental_skips_on_repeat(self):
+        """Test a repeat incremental apply writes nothing for an unchanged folder."""
+        storage_mock = MagicMock()
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        folder = Path(tempfile.mkdtemp())
+        (folder / "a.txt").write_text("a")
+        (folder / "b.py").write_text("b")
+        first = engine.batch_apply_incremental(str(folder), ["key", "value"], "txt")
+        self.assertEqual(first, {'tagged': 1, 'skipped': 0, 'dirs_skipped': 0})
+        storage_mock.bulk_add_tags.assert_called_once_with({str(folder.resolve() / "a.txt"): [("key", "value")]})
+        second = engine.batch_apply_incremental(str(folder), ["key", "value"], "txt")
+        self.assertEqual(second, {'tagged': 0, 'skipped': 2, 'dirs_skipped': 1})
+        self.assertEqual(storage_mock.bulk_add_tags.call_count, 1)
+
+    def test_search_cached_until_mutation(self):
+        """Test repeated searches hit the cache and writes invalidate it."""
+        storage_mock = MagicMock()
+        storage_mock.search.return_value = {"/a": ["x"]}
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(engine.search("x"), {"/a": ["x"]})
+        self.assertEqual(engine.search("x"), {"/a": ["x"]})
+        self.assertEqual(storage_mock.search.call_count, 1)
+        # Whitespace is part of the regex, so it is a different query
+        engine.search(" x ")
+        self.assertEqual(storage_mock.search.call_count, 2)
+        self.assertEqual(list(engine.iter_search("x")), [("/a", ["x"])])
+        storage_mock.iter_search.assert_not_called()
+        engine.rename_tag("x", "y")
+        engine.search("x")
+        self.assertEqual(storage_mock.search.call_count, 3)
+
+    def test_undo_and_reindex_bump_generation_after_writing(self):
+        """Test the generation advances only once the store has been changed."""
+        storage_mock = MagicMock()
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        engine.rename_tag("x", "y")
+        before = engine.cache.generation
+        seen = []
+        storage_mock.rename_tag.side_effect = lambda *args: seen.append(engine.cache.generation)
+        engine.undo()
+        self.assertEqual(seen, [before])
+        self.assertNotEqual(engine.cache.generation, before)
+        before = engine.cache.generation
+        engine.rebuild_index(["/tmp"])
+        self.assertNotEqual(engine.cache.generation, before)
+
+    def test_suggest_tags_rebuilds_index_only_when_stale(self):
+        """Test suggestions come from the completion index, rebuilt after writes."""
+        storage_mock = MagicMock()
+        storage_mock.iter_all_data.side_effect = lambda: iter([("/a", ["project/alpha", "work"])])
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(engine.suggest_tags("proj"), ["project/alpha"])
+        self.assertEqual(engine.suggest_tags("ork"), ["work"])
+        self.assertEqual(storage_mock.iter_all_data.call_count, 1)
+        engine.rename_tag("work", "play")
+        engine.suggest_tags("ork")
+        self.assertEqual(storage_mock.iter_all_data.call_count, 2)
+
+    def test_range_query_uses_value_index(self):
+        """Test typed-key predicates are answered from the value index with type/folder filters."""
+        self.config_mock.get.side_effect = lambda key, default=None: {
+            'separator': '/', 'tag_types': {'priority': 'int'}}.get(key, default)
+        storage_mock = MagicMock()
+        storage_mock.iter_all_data.side_effect = lambda: iter([
+            ("/x/a.txt", ["priority/2"]), ("/x/b.md", ["priority/4"]), ("/y/c.txt", ["priority/9"])])
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(dict(engine.iter_search("priority>2", sort=True)),
+                         {"/x/b.md": ["priority/4"], "/y/c.txt": ["priority/9"]})
+        self.assertEqual([*engine.iter_search("priority>=2 priority<5", type_filter="txt", under="/x")],
+                         [("/x/a.txt", ["priority/2"])])
+        storage_mock.iter_search.assert_not_called()
+        self.assertEqual(storage_mock.iter_all_data.call_count, 1)
+
+    def test_history_follows_compaction_by_another_engine(self):
+        """Test a running engine keeps logging to the history file another engine compacted."""
+        first, second = TagEngine(self.config_mock), TagEngine(self.config_mock)
+        with tempfile.NamedTemporaryFile() as f:
+            second.add_tags(f.name, [("x", "")])
+            first.compact('gzip')
+            second.add_tags(f.name, [("y", "")])
+            second.undo()
+            self.assertEqual(second.get_tags(f.name), ["x"])
+        self.assertFalse((Path(self.temp_dir) / 'tag_history.json').exists())
+        history = TagEngine(self.config_mock).history
+        self.assertEqual([(op['type'], op['tags']) for op in history], [('add_tags', [['x', '']])])
+
+    def test_bulk_import_in_another_process_is_not_lost_from_related_tags(self):
+        """Test a single-file change-log delta never chains past a concurrent import's generation bump."""
+        root = Path(self.temp_dir) / "files"
+        root.mkdir()
+        files = [root / f"f{i}.txt" for i in range(4)]
+        for file_path in files:
+            file_path.write_text("x")
+        config = ConfigManager()
+        config.data['storage_path'] = self.temp_dir
+        engine = TagEngine(config)
+        engine.add_tags(str(files[0]), [("x", ""), ("w", "")])
+        engine.related_tags("x")  # persist a matrix so later writes are chained onto its log
+        importer = subprocess.Popen([sys.executable, '-c', (
+            "import sys, time\n"
+            "from src.config import ConfigManager\n"
+            "from src.engine import TagEngine\n"
+            "config = ConfigManager()\n"
+            "config.data['storage_path'] = sys.argv[1]\n"
+            "bump = TagEngine._mutated\n"
+            "def slow_bump(self):\n"
+            "    print('written', flush=True)\n"
+            "    time.sleep(0.3)\n"
+            "    return bump(self)\n"
+            "TagEngine._mutated = slow_bump\n"
+            "TagEngine(config).import_data((p, ['x', 'z']) for p in sys.argv[2:])\n"
+        ), self.temp_dir, *map(str, files[2:])], cwd=Path(__file__).resolve().parent.parent,
+            stdout=subprocess.PIPE, text=True)
+        self.assertEqual(importer.stdout.readline(), "written\n")
+        add = engine.storage.add_tags
+        # Keep this write's critical section open across the importer's bump
+        with patch.object(engine.storage, 'add_tags', side_effect=lambda *args: add(*args) or time.sleep(0.6)):
+            engine.add_tags(str(files[1]), [("x", ""), ("y", "")])
+        self.assertEqual(importer.wait(), 0)
+        importer.stdout.close()
+        for current in (engine, TagEngine(config)):  # warm matrix, and the persisted base plus log
+            self.assertEqual({tag: count for tag, count, _ in current.related_tags("x")},
+                             {'w': 1, 'y': 1, 'z': 2})
+
+    def test_writes_hold_the_store_lock_from_check_to_history(self):
+        """Test add, remove and undo read, write and log inside one critical section."""
+        storage_mock = MagicMock()
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        held = []
+        record = lambda *args, **kwargs: held.append(engine.lock._depth > 0)
+        storage_mock.get_tags.side_effect = lambda *args: record() or []
+        storage_mock.add_tags.side_effect = record
+        storage_mock.remove_tags.side_effect = record
+        save_history = engine._save_history
+        with patch.object(engine, '_save_history', side_effect=lambda: record() or save_history()), \
+                tempfile.NamedTemporaryFile() as f:
+            engine.add_tags(f.name, [("x", "")])
+            engine.remove_tags(f.name, [("x", "")])
+            engine.undo()
+        self.assertEqual(len(held), 8)
+        self.assertTrue(all(held))
+        self.assertEqual(engine.lock._depth, 0)
+
+    def test_value_index_updated_incrementally_on_add_and_remove(self):
+        """Test single-file writes move typed values in their column instead of rebuilding the index."""
+        self.config_mock.get.side_effect = lambda key, default=None: {
+            'separator': '/', 'tag_types': {'priority': 'int'}}.get(key, default)
+        storage_mock = MagicMock()
+        storage_mock.iter_all_data.side_effect = lambda: iter([("/a", ["priority/2"]), ("/b", ["priority/7"])])
+        storage_mock.get_tags.return_value = ["priority/7"]
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual([*engine.iter_search("priority>5")], [("/b", ["priority/7"])])
+        with tempfile.NamedTemporaryFile() as f:
+            path = str(Path(f.name).resolve())
+            storage_mock.get_tags.return_value = []
+            engine.add_tags(path, [("priority", "9")])
+            self.assertEqual(dict(engine.iter_search("priority>5", sort=True)),
+                             {"/b": ["priority/7"], path: ["priority/9"]})
+            storage_mock.get_tags.return_value = ["priority/9"]
+            engine.remove_tags(path, [("priority", "9")])
+        self.assertEqual([*engine.iter_search("priority>5")], [("/b", ["priority/7"])])
+        # A fresh process reads the incrementally updated columns from disk
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            other = TagEngine(self.config_mock)
+        self.assertEqual([*other.iter_search("priority<5")], [("/a", ["priority/2"])])
+        self.assertEqual(storage_mock.iter_all_data.call_count, 1)
+
+    def test_time_window_search_and_stats_use_recency_index(self):
+        """Test --since style queries filter the recency range scan instead of searching storage."""
+        storage_mock = MagicMock()
+        storage_mock.iter_recent.side_effect = lambda *args: iter([
+            ("/b", "project/beta", 200.0), ("/a", "project/alpha", 150.0), ("/a", "todo", 120.0)])
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(list(engine.iter_search("project*", since=100.0)),
+                         [("/b", ["project/beta"]), ("/a", ["project/alpha"])])
+        storage_mock.iter_recent.assert_called_with(100.0, None, None, None)
+        storage_mock.iter_search.assert_not_called()
+        stats = engine.get_stats(since=100.0)
+        self.assertEqual((stats['total_tags'], stats['files']), (3, 2))
+
+    def test_related_tags_updated_incrementally(self):
+        """Test single-file adds update the co-occurrence matrix without rescanning storage."""
+        storage_mock = MagicMock()
+        storage_mock.iter_all_data.side_effect = lambda: iter([("/a", ["python", "code"]), ("/b", ["python"])])
+        storage_mock.get_tags.return_value = ["python"]
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(engine.related_tags("python")[0][:2], ("code", 1))
+        with tempfile.NamedTemporaryFile() as f:
+            engine.add_tags(f.name, [("code", "")])
+        self.assertEqual(engine.related_tags("python")[0][:2], ("code", 2))
+        self.assertEqual(engine.suggest_related(["code"]), ["python"])
+        self.assertEqual(storage_mock.iter_all_data.call_count, 1)
+
+    def test_suggest_related_without_build_needs_a_current_matrix(self):
+        """Test the add-time hint never rebuilds the co-occurrence matrix from storage."""
+        storage_mock = MagicMock()
+        storage_mock.iter_all_data.side_effect = lambda: iter([("/a", ["python", "code"])])
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(self.config_mock)
+        self.assertEqual(engine.suggest_related(["code"], build=False), [])
+        storage_mock.iter_all_data.assert_not_called()
+        engine.related_tags("python")
+        self.assertEqual(engine.suggest_related(["code"], build=False), ["python"])
+
+    def test_reconcile_prunes_deleted_and_reattaches_moved(self):
+        """Test gc drops entries of deleted files and follows moved ones by fingerprint."""
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        kept, deleted, moved = root / "kept.txt", root / "deleted.txt", root / "moved.txt"
+        for file_path in (kept, deleted, moved):
+            file_path.write_text(file_path.name)
+            engine.add_tags(str(file_path), [("project", file_path.stem)])
+        deleted.unlink()
+        (root / "archive").mkdir()
+        moved.rename(root / "archive" / "moved.txt")
+        report = engine.reconcile([str(root)], dry_run=True)
+        self.assertEqual(report['pruned'], [str(deleted)])
+        self.assertEqual(len(engine.get_all_tags()), 3)
+        report = engine.reconcile([str(root)])
+        self.assertEqual(report['moved'], {str(moved): str(root / "archive" / "moved.txt")})
+        self.assertEqual(engine.get_tags(str(root / "archive" / "moved.txt")), ["project/moved"])
+        self.assertEqual(sorted(engine.storage.get_all_data()), [str(root / "archive" / "moved.txt"), str(kept)])
+        self.assertEqual(engine.reconcile()['missing'], 0)
+
+    def test_reconcile_keeps_entries_it_cannot_stat(self):
+        """Test gc reports unreadable paths instead of crashing or pruning them."""
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        locked = root / "locked.txt"
+        locked.write_text("x")
+        engine.add_tags(str(locked), [("secret", "")])
+        real_stat = os.stat
+        def stat(path, *args, **kwargs):
+            if str(path) == str(locked):
+                raise PermissionError(13, "Permission denied")
+            return real_stat(path, *args, **kwargs)
+        with patch('src.reconcile.os.stat', side_effect=stat):
+            report = engine.reconcile()
+        self.assertEqual((report['missing'], report['pruned']), (0, []))
+        self.assertEqual(report['errors'], {str(locked): "Permission denied"})
+        self.assertEqual(engine.get_tags(str(locked)), ["secret"])
+        self.assertIn(str(locked), engine.fingerprints.load())
+
+    def test_imported_files_can_be_followed_after_a_move(self):
+        """Test bulk imports record fingerprints so gc can re-attach moved files."""
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        (root / "a.txt").write_text("a")
+        engine.import_data([(str(root / "a.txt"), ["imported"]), ("/nonexistent/b.txt", ["imported"])])
+        (root / "sub").mkdir()
+        (root / "a.txt").rename(root / "sub" / "a.txt")
+        report = engine.reconcile([str(root)])
+        self.assertEqual(report['moved'], {str(root / "a.txt"): str(root / "sub" / "a.txt")})
+        self.assertEqual(report['pruned'], ["/nonexistent/b.txt"])
+
+    def test_import_replace_keeps_tags_of_a_file_spanning_chunks(self):
+        """Test replace mode only overwrites a file's tags on its first record in the stream."""
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        a, b = str(root / "a.txt"), str(root / "b.txt")
+        engine.import_data([(a, ["old"])])
+        records = [(a, ["x"]), (b, ["y"]), (a, ["z"])]
+        totals = engine.import_data(iter(records), mode='replace', chunk_size=2)
+        self.assertEqual(sorted(engine.get_tags(a)), ["x", "z"])
+        self.assertEqual(totals['files'], 2)
+        self.assertEqual(engine.import_data(iter(records), dry_run=True)['files'], 2)
+
+    def test_migrate_to_xattr_skips_deleted_files(self):
+        """Test migrating into xattr storage skips and counts files deleted since they were tagged."""
+        from src.storage.xattr import XattrStorage
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        kept, gone = root / "kept.txt", root / "gone.txt"
+        kept.write_text("a")
+        gone.write_text("b")
+        engine.add_tags(str(kept), [("project", "x")])
+        engine.add_tags(str(gone), [("project", "y")])
+        gone.unlink()
+        totals = engine.migrate_to(XattrStorage(self.config_mock))
+        self.assertEqual(totals, {'files': 2, 'skipped': 1})
+        self.assertIn("user.tagging.project/x", os.listxattr(kept))
+
+    def test_apply_batch_single_write_and_undo(self):
+        """Test batch ops are validated, coalesced into one bulk write and undone as a group."""
+        self.config_mock.get.side_effect = lambda key, default=None: {
+            'separator': '/', 'exclusions': [['draft', 'final']]}.get(key, default)
+        engine = TagEngine(self.config_mock)
+        root = Path(tempfile.mkdtemp())
+        a, b = root / "a.txt", root / "b.txt"
+        a.write_text("a")
+        b.write_text("b")
+        engine.add_tags(str(b), [("old", "")])
+        lines = [
+            f'{{"op": "add", "path": "{a}", "tags": ["draft", "project:x"]}}',
+            f'{{"op": "add", "path": "{a}", "tags": ["final"]}}',
+            f'{{"op": "remove", "path": "{a}", "tags": ["draft"]}}',
+            '{"op": "rename", "old": "old", "new": "new"}',
+            f'{{"op": "add", "path": "{root / "missing.txt"}", "tags": ["x"]}}',
+        ]
+        with patch.object(engine.storage, 'bulk_add_tags', wraps=engine.storage.bulk_add_tags) as bulk, \
+                patch.object(engine.storage, 'rename_tag', side_effect=AssertionError):
+            results = list(engine.apply_batch(lines))
+            self.assertEqual([r['status'] for r in results], ["ok", "error", "ok", "ok", "error"])
+            self.assertIn("conflicts", results[1]['error'])
+            bulk.assert_called_once()
+            self.assertEqual(engine.get_tags(str(a)), ["project/x"])
+            self.assertEqual(engine.get_tags(str(b)), ["new"])
+            bulk.reset_mock()
+            self.assertIn("batch of 3 operations on 2 files", engine.undo())
+            bulk.assert_called_once()
+        self.assertEqual(engine.get_tags(str(b)), ["old"])
+        # a had no entry before the batch, so undo drops it instead of keeping an empty tag list
+        self.assertNotIn(str(a), engine.storage.get_all_data())
+
+    def test_compact_converts_store_and_sidecars(self):
+        """Test compact rewrites existing files compressed and the engine keeps working on them."""
+        engine = TagEngine(self.config_mock)
+        with tempfile.NamedTemporaryFile() as f:
+            engine.add_tags(f.name, [("project", "x")])
+            report = engine.compact('gzip')
+            self.assertEqual(report['codec'], 'gzip')
+            self.assertLess(report['bytes_after'], report['bytes_before'])
+            self.assertTrue((Path(self.temp_dir) / 'tags.md.gz').exists())
+            self.assertFalse((Path(self.temp_dir) / 'tag_history.json').exists())
+            self.assertEqual(engine.get_tags(f.name), ["project/x"])
+            engine.undo()
+            self.assertEqual(engine.get_tags(f.name), [])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
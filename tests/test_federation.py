@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+from pathlib import Path
+from src.config import ConfigManager
+from src.engine import TagEngine
+from src.federation import FederatedEngine
+
+class TestFederatedEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.config = ConfigManager()
+        self.config.data['federation'] = [
+            {'name': 'eng', 'path': str(self.temp_dir / 'eng')},
+            {'name': 'ops', 'path': str(self.temp_dir / 'ops'), 'storage': 'xattr'},
+        ]
+        self.files = {name: self.temp_dir / f"{name}.txt" for name in ('a', 'b', 'c')}
+        for path in self.files.values():
+            path.touch()
+        eng = TagEngine(self.config.for_root(self.config.data['federation'][0]))
+        eng.add_tags(str(self.files['a']), [('project', 'x')])
+        eng.add_tags(str(self.files['b']), [('project', 'y')])
+        ops = TagEngine(self.config.for_root(self.config.data['federation'][1]))
+        ops.add_tags(str(self.files['b']), [('oncall', '')])
+        ops.add_tags(str(self.files['c']), [('project', 'z')])
+        self.fed = FederatedEngine(self.config)
+
+    def tearDown(self):
+        self.fed.close()
+
+    def test_search_merges_sorted_and_deduplicates(self):
+        results = list(self.fed.iter_search('*'))
+        self.assertEqual([Path(p).name for p, _, _ in results], ['a.txt', 'b.txt', 'c.txt'])
+        self.assertEqual(results[1][1:], (['project/y', 'oncall'], ['eng', 'ops']))
+        self.assertEqual(self.fed.timings['ops']['results'], 2)
+        self.assertIsNone(self.fed.timings['eng']['error'])
+
+    def test_early_stop_and_export(self):
+        first = self.fed.iter_search('project*')
+        self.assertEqual(Path(next(first)[0]).name, 'a.txt')
+        first.close()
+        self.assertEqual(len(list(self.fed.export_data())), 3)
+
+    def test_stats_combine_roots(self):
+        stats = self.fed.get_stats()
+        self.assertEqual(set(stats['roots']), {'eng', 'ops'})
+        self.assertEqual(stats['unique_tags'], 4)
+
+    def test_stats_merge_full_counts_not_top_tens(self):
+        eng = TagEngine(self.config.for_root(self.config.data['federation'][0]))
+        eng.add_tags(str(self.files['c']), [(f"z{i}", '') for i in range(10)] + [('zz', '')])
+        ops = TagEngine(self.config.for_root(self.config.data['federation'][1]))
+        ops.add_tags(str(self.files['a']), [('zz', '')])
+        stats = self.fed.get_stats()
+        self.assertNotIn(('zz', 1), stats['roots']['eng']['top_tags'])
+        self.assertEqual(stats['top_tags'][0], ('zz', 2))
+
+    def test_stats_count_files_per_tag_within_a_root(self):
+        ops = TagEngine(self.config.for_root(self.config.data['federation'][1]))
+        ops.add_tags(str(self.files['a']), [('oncall', '')])
+        self.assertEqual(ops.tag_counts(), {'oncall': 2, 'project/z': 1})
+        stats = self.fed.get_stats()
+        self.assertEqual(stats['roots']['ops']['top_tags'][0], ('oncall', 2))
+        self.assertEqual(dict(stats['top_tags'])['oncall'], 2)
+
+    def test_requires_roots(self):
+        with self.assertRaises(ValueError):
+            FederatedEngine(ConfigManager())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import multiprocessing
+import tempfile
+from pathlib import Path
+from src.fileio import atomic_open, atomic_write, store_lock
+from src.storage.markdown import MarkdownStorage
+
+class _Config:
+    """Picklable stand-in for ConfigManager used by child processes."""
+
+    def __init__(self, storage_path):
+        self.storage_path = storage_path
+
+    def get_storage_path(self):
+        return self.storage_path
+
+    def get(self, key, default=None):
+        return {'separator': '/', 'fsync_writes': False}.get(key, default)
+
+def _tag_many(storage_path, worker):
+    storage = MarkdownStorage(_Config(storage_path))
+    for i in range(20):
+        storage.add_tags(f"{storage_path}/w{worker}_{i}.txt", [("worker", str(worker))])
+
+class TestFileIO(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def test_atomic_write_keeps_old_file_on_error(self):
+        target = Path(self.temp_dir) / "data.txt"
+        atomic_write(target, "old")
+        with self.assertRaises(RuntimeError):
+            with atomic_open(target) as f:
+                f.write("partial")
+                raise RuntimeError("boom")
+        self.assertEqual(target.read_text(), "old")
+        self.assertEqual([p.name for p in Path(self.temp_dir).iterdir()], ["data.txt"])
+
+    def test_store_lock_is_shared_and_reentrant(self):
+        lock = store_lock(self.temp_dir)
+        self.assertIs(lock, store_lock(self.temp_dir))
+        with lock:
+            with lock:
+                self.assertIsNotNone(lock._fd)
+        self.assertIsNone(lock._fd)
+
+    def test_concurrent_writers_lose_no_updates(self):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_tag_many, args=(self.temp_dir, n)) for n in range(3)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        storage = MarkdownStorage(_Config(self.temp_dir))
+        self.assertEqual(len(storage.get_all_data()), 60)
+
+if __name__ == '__main__':
+    unittest.main()
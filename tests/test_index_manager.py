@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+from pathlib import Path
+from src.cache import QueryCache
+from src.index_manager import IndexManager, estimate_size
+
+class TestIndexManager(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.manager = IndexManager(1 / 1024, self.temp_dir / '.index_segments')  # 1 KiB budget
+
+    def test_lru_structure_spilled_and_reloaded(self):
+        self.manager.put('a', {'x': ['1'] * 10}, 600)
+        self.manager.put('b', {'y': ['2'] * 10}, 600)
+        stats = self.manager.stats()
+        self.assertEqual((stats['resident'], stats['spilled']), (['b'], ['a']))
+        self.assertLessEqual(stats['resident_bytes'], stats['budget_bytes'])
+        self.assertEqual(self.manager.get('a'), {'x': ['1'] * 10})
+        stats = self.manager.stats()
+        self.assertEqual((stats['resident'], stats['spilled']), (['a'], ['b']))
+        self.assertEqual((stats['reloads'], stats['spills']), (1, 2))
+
+    def test_oversized_structure_is_not_kept(self):
+        self.manager.put('a', 'x', 600)
+        self.assertFalse(self.manager.put('big', list(range(1000))))
+        self.assertIsNone(self.manager.get('big'))
+        stats = self.manager.stats()
+        self.assertEqual((stats['resident'], stats['rejected']), (['a'], 1))
+        self.assertLessEqual(stats['resident_bytes'], stats['budget_bytes'])
+
+    def test_discard_removes_spilled_segment(self):
+        self.manager.put('a', 'x', 600)
+        self.manager.put('b', 'y', 600)
+        self.manager.discard('a')
+        self.assertIsNone(self.manager.get('a'))
+        self.assertEqual([*self.manager.spill_dir.iterdir()], [])
+
+    def test_estimate_size_counts_shared_objects_once(self):
+        item = 'z' * 1000
+        self.assertLess(estimate_size([item, item]), 2 * estimate_size(item))
+
+    def test_query_cache_entries_count_against_budget(self):
+        cache = QueryCache(self.temp_dir / '.generation', manager=self.manager)
+        cache.put('q', ['/file'] * 10)
+        self.assertGreater(self.manager.stats()['resident_bytes'], 0)
+        self.manager.put('other', 'x', 1024)  # pushes the cache out to disk
+        self.assertIn(cache._name, self.manager.stats()['spilled'])
+        self.assertEqual(cache.get('q'), ['/file'] * 10)
+
+if __name__ == '__main__':
+    unittest.main()
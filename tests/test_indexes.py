@@ -0,0 +1,36 @@
+import unittest
+from src.storage.indexes import FileIndex
+
+FILES = {
+    '/data/a/1.txt': {'tags': ['x', 'y'], 'type': 'txt'},
+    '/data/a/2.py': {'tags': ['x'], 'type': 'py'},
+    '/data/ab/3.txt': {'tags': ['x'], 'type': 'txt'},
+    '/data/b/4.txt': {'tags': ['z'], 'type': 'txt'},
+}
+
+class TestFileIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = FileIndex(FILES)
+
+    def test_under_uses_directory_boundaries(self):
+        self.assertEqual(self.index.under('/data/a'), ['/data/a/1.txt', '/data/a/2.py'])
+        self.assertEqual(self.index.under('/data/a/'), ['/data/a/1.txt', '/data/a/2.py'])
+        self.assertEqual(len(self.index.under('/data')), 4)
+        self.assertEqual(self.index.under('/nope'), [])
+
+    def test_search_combines_postings_type_and_scope(self):
+        match_x = lambda tag: tag == 'x'
+        self.assertEqual([p for p, _ in self.index.search(match_x)],
+                         ['/data/a/1.txt', '/data/a/2.py', '/data/ab/3.txt'])
+        self.assertEqual([p for p, _ in self.index.search(match_x, type_filter='txt', under='/data/a')],
+                         ['/data/a/1.txt'])
+        self.assertEqual(self.index.search(lambda tag: tag == 'y'), [('/data/a/1.txt', ['x', 'y'])])
+        self.assertEqual(self.index.search(match_x, type_filter='md'), [])
+
+    def test_postings_and_type_index(self):
+        self.assertEqual(self.index.tag_files(['y', 'z']), {'/data/a/1.txt', '/data/b/4.txt'})
+        self.assertEqual(self.index.by_type['py'], {'/data/a/2.py'})
+
+if __name__ == '__main__':
+    unittest.main()
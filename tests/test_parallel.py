@@ -0,0 +1,37 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.storage.parallel import ParallelScanner, _get_pool
+
+VOCABULARY = [f"project/{i}" for i in range(300)] + ["café/menu", "work", "status/todo"] * 10
+
+class TestParallelScanner(unittest.TestCase):
+
+    def test_parallel_matches_serial(self):
+        serial = ParallelScanner(threshold=10 ** 9)
+        parallel = ParallelScanner(threshold=0, workers=2)
+        for query, fuzzy in (("project/1.*", False), ("café", False), ("todo", True)):
+            self.assertEqual(parallel.match(VOCABULARY, query, fuzzy), serial.match(VOCABULARY, query, fuzzy))
+        self.assertEqual(len(parallel.match(VOCABULARY, "^project/2\\d$")), 10)
+
+    def test_invalid_query_and_unsafe_entries(self):
+        scanner = ParallelScanner(threshold=0, workers=2)
+        self.assertIsNone(scanner.match(VOCABULARY, "(unclosed"))
+        # Entries containing the separator fall back to an in-process scan
+        self.assertEqual(scanner.match(["a\0b", "c"], "b"), [0])
+
+    def test_scans_with_different_worker_counts_share_pools_safely(self):
+        scanners = [ParallelScanner(threshold=0, workers=2), ParallelScanner(threshold=0, workers=3)]
+        expected = ParallelScanner(threshold=10 ** 9).match(VOCABULARY, "work")
+        # Alternating worker counts used to shut down the pool another thread was submitting to
+        with ThreadPoolExecutor(max_workers=4) as threads:
+            results = [*threads.map(lambda i: scanners[i % 2].match(VOCABULARY, "work"), range(8))]
+        self.assertEqual(results, [expected] * 8)
+        self.assertIs(_get_pool(2), _get_pool(2))
+        self.assertIsNot(_get_pool(2), _get_pool(3))
+
+    def test_pool_workers_are_not_forked(self):
+        # Forking a threaded process can leave workers holding copies of locks nobody will release
+        self.assertIn(_get_pool(2)._mp_context.get_start_method(), ('forkserver', 'spawn'))
+
+if __name__ == '__main__':
+    unittest.main()
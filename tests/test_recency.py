@@ -0,0 +1,21 @@
+import unittest
+from datetime import datetime
+from src.recency import iso_to_timestamp, parse_time_spec, utc_iso
+
+class TestRecency(unittest.TestCase):
+
+    def test_iso_round_trip_sorts_chronologically(self):
+        earlier, later = utc_iso(1_700_000_000), utc_iso(1_700_000_061)
+        self.assertEqual(earlier, '2023-11-14T22:13:20Z')
+        self.assertLess(earlier, later)
+        self.assertEqual(iso_to_timestamp(later), 1_700_000_061)
+
+    def test_time_specs(self):
+        self.assertEqual(parse_time_spec('90s', now=1000), 910)
+        self.assertEqual(parse_time_spec('2h', now=10000), 2800)
+        self.assertEqual(parse_time_spec('2026-12-01'), datetime(2026, 12, 1).timestamp())
+        with self.assertRaises(ValueError):
+            parse_time_spec('yesterday')
+
+if __name__ == '__main__':
+    unittest.main()
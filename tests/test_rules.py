@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import tempfile
+import time
+from pathlib import Path
+from src.rules import Rule, RuleSet, walk_files
+from src.engine import TagEngine
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        root = Path(self.temp_dir)
+        (root / "src").mkdir()
+        (root / "img").mkdir()
+        (root / "src" / "main.py").write_text("print()")
+        (root / "img" / "a.JPG").write_text("x" * 2048)
+        (root / "img" / "b.png").write_text("x")
+        old = root / "notes.txt"
+        old.write_text("old")
+        past = time.time() - 10 * 86400
+        os.utime(old, (past, past))
+
+    def _ruleset(self, specs):
+        config = MagicMock()
+        config.get.return_value = specs
+        return RuleSet.from_config(config)
+
+    def test_single_pass_matches_all_rules(self):
+        ruleset = self._ruleset([
+            {'name': 'images', 'extension': ['jpg', 'png'], 'tags': ['media', 'kind:image']},
+            {'name': 'large', 'min_size': 1024, 'tags': ['large']},
+            {'name': 'code', 'path_regex': '/src/', 'glob': '*.py', 'tags': ['code']},
+            {'name': 'stale', 'modified_before': time.time() - 86400, 'tags': ['stale']},
+        ])
+        matched = {Path(p).name: sorted(r.name for r in rules) for p, rules in ruleset.scan(self.temp_dir)}
+        self.assertEqual(matched, {
+            'a.JPG': ['images', 'large'],
+            'b.png': ['images'],
+            'main.py': ['code'],
+            'notes.txt': ['stale'],
+        })
+        self.assertEqual(ruleset.rules[0].tags, [('media', ''), ('kind', 'image')])
+
+    def test_walk_is_single_pass(self):
+        ruleset = self._ruleset([{'glob': '*', 'tags': ['a']}, {'extension': 'py', 'tags': ['b']}])
+        with patch('src.rules.walk_files', wraps=walk_files) as walker:
+            list(ruleset.scan(self.temp_dir))
+        walker.assert_called_once()
+
+    def test_invalid_rules_rejected(self):
+        with self.assertRaises(ValueError):
+            Rule({'glob': '*.py'})
+        with self.assertRaises(ValueError):
+            Rule({'glob': '*.py', 'tags': ['x'], 'colour': 'red'})
+
+    def test_engine_apply_rules_bulk_writes_and_dry_run(self):
+        specs = [{'name': 'images', 'extension': ['jpg', 'png'], 'tags': ['media']},
+                 {'name': 'large', 'min_size': 1024, 'tags': ['large', 'media']}]
+        config = MagicMock()
+        config.get_storage_path.return_value = tempfile.mkdtemp()
+        config.get.side_effect = lambda key, default=None: specs if key == 'rules' else default
+        storage_mock = MagicMock()
+        with patch('src.engine.StorageFactory.create', return_value=storage_mock):
+            engine = TagEngine(config)
+        report = engine.apply_rules(self.temp_dir, dry_run=True)
+        self.assertEqual(report, {'files': 2, 'tags': 3, 'skipped': 0, 'rules': {'images': 2, 'large': 1}})
+        storage_mock.bulk_add_tags.assert_not_called()
+        engine.apply_rules(self.temp_dir)
+        entries = storage_mock.bulk_add_tags.call_args[0][0]
+        self.assertEqual(entries[os.path.join(str(Path(self.temp_dir).resolve()), 'img', 'a.JPG')],
+                         [('media', ''), ('large', '')])
+
+    def test_engine_apply_rules_sees_files_grown_in_place(self):
+        root = Path(tempfile.mkdtemp())
+        (root / "log.txt").write_text("x" * 10)
+        specs = [{'name': 'big', 'min_size': 100, 'tags': ['big']}]
+        config = MagicMock()
+        config.get_storage_path.return_value = tempfile.mkdtemp()
+        config.get.side_effect = lambda key, default=None: specs if key == 'rules' else default
+        engine = TagEngine(config)
+        self.assertEqual(engine.apply_rules(str(root))['files'], 0)
+        # Rewriting the file leaves the directory's mtime and entry count untouched
+        (root / "log.txt").write_text("x" * 1000)
+        self.assertEqual(engine.apply_rules(str(root))['files'], 1)
+        self.assertEqual(engine.get_tags(str(root / "log.txt")), ['big'])
+
+if __name__ == '__main__':
+    unittest.main()
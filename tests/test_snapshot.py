@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+from src.snapshot import DirectorySnapshot, snapshot_signature
+
+class TestDirectorySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.snapshot_file = Path(tempfile.mkdtemp()) / "scan_snapshot.json"
+        for sub in ("a", "b"):
+            (self.root / sub).mkdir()
+            for i in range(3):
+                (self.root / sub / f"{i}.txt").write_text("x")
+
+    def _run(self, signature="sig", full=False):
+        snapshot = DirectorySnapshot(self.snapshot_file)
+        seen = sorted(os.path.relpath(e.path, self.root) for e in snapshot.walk(str(self.root), signature, full))
+        snapshot.commit()
+        return seen, snapshot
+
+    def test_repeat_run_skips_unchanged_directories(self):
+        seen, _ = self._run()
+        self.assertEqual(len(seen), 6)
+        seen, snapshot = self._run()
+        self.assertEqual(seen, [])
+        self.assertEqual(snapshot.skipped_files, 6)
+        self.assertEqual(snapshot.skipped_dirs, 3)
+
+    def test_new_file_rescans_only_its_directory(self):
+        self._run()
+        (self.root / "b" / "new.txt").write_text("x")
+        seen, snapshot = self._run()
+        self.assertIn(os.path.join("b", "new.txt"), seen)
+        self.assertFalse(any(path.startswith("a") for path in seen))
+        self.assertGreaterEqual(snapshot.skipped_files, 3)
+
+    def test_changed_directory_skips_files_older_than_last_scan(self):
+        self._run()
+        snapshot = DirectorySnapshot(self.snapshot_file)
+        state = snapshot.dirs[str(self.root / "b")]["sig"]
+        state[2] = 2 ** 62  # pretend the last scan happened after every ctime
+        snapshot._staged = {}
+        snapshot.commit()
+        (self.root / "b" / "0.txt").unlink()
+        seen, snapshot = self._run()
+        self.assertEqual(seen, [])
+        self.assertEqual(snapshot.skipped_files, 5)
+
+    def test_signature_and_full_force_rescan(self):
+        self._run()
+        self.assertEqual(len(self._run(signature=snapshot_signature({'tag': ('x', '')}))[0]), 6)
+        self.assertEqual(len(self._run(full=True)[0]), 6)
+
+if __name__ == '__main__':
+    unittest.main()
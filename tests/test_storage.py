@@ -1,10 +1,15 @@
 import unittest
+import errno
+import os
+import time
 from unittest.mock import MagicMock, patch
 import tempfile
 from pathlib import Path
 from src.storage.markdown import MarkdownStorage
 from src.storage.database import DatabaseStorage
+from src.storage.xattr import XattrStorage
 from src.config import ConfigManager
+from sqlalchemy import event
 
 class TestStorage(unittest.TestCase):
 
@@ -12,7 +17,7 @@ class TestStorage(unittest.TestCase):
         self.temp_dir = tempfile.mkdtemp()
         self.config_mock = MagicMock()
         self.config_mock.get_storage_path.return_value = self.temp_dir
-        self.config_mock.get.return_value = '/'
+        self.config_mock.get.side_effect = lambda key, default=None: '/' if key == 'separator' else default
 
     def test_markdown_storage_init_creates_file(self):
         storage = MarkdownStorage(self.config_mock)
@@ -66,5 +71,263 @@ class TestStorage(unittest.TestCase):
         data = storage.get_all_data()
         self.assertIn(abs_path, data)
 
+    def test_markdown_iter_search_sorted_and_lazy(self):
+        storage = MarkdownStorage(self.config_mock)
+        for name in ("b.txt", "a.txt", "c.py"):
+            test_file = Path(self.temp_dir) / name
+            test_file.write_text("content")
+            storage.add_tags(str(test_file), [("project", "alpha")])
+        results = list(storage.iter_search("project", sort=True))
+        self.assertEqual([Path(p).name for p, _ in results], ["a.txt", "b.txt", "c.py"])
+        self.assertEqual(results[0][1], ["project/alpha"])
+        only_txt = dict(storage.iter_search("alpha", type_filter="txt"))
+        self.assertEqual(len(only_txt), 2)
+        # Nothing is parsed until the generator is consumed
+        with patch.object(storage, '_iter_entries', side_effect=AssertionError):
+            storage.iter_search("project")
+
+    def test_markdown_iter_search_invalid_regex_yields_nothing(self):
+        storage = MarkdownStorage(self.config_mock)
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("content")
+        storage.add_tags(str(test_file), [("key", "value")])
+        self.assertEqual(list(storage.iter_search("key[")), [])
+
+    def test_database_iter_search_sorted(self):
+        storage = DatabaseStorage(self.config_mock)
+        for name in ("b.txt", "a.txt"):
+            test_file = Path(self.temp_dir) / name
+            test_file.write_text("content")
+            storage.add_tags(str(test_file), [("key", "value")])
+        results = list(storage.iter_search("key", sort=True))
+        self.assertEqual([Path(p).name for p, _ in results], ["a.txt", "b.txt"])
+
+    def test_bulk_add_tags_merge_and_replace(self):
+        for storage_cls in (MarkdownStorage, DatabaseStorage):
+            storage = storage_cls(self.config_mock)
+            a = str(Path(self.temp_dir) / f"{storage_cls.__name__}_a.txt")
+            b = str(Path(self.temp_dir) / f"{storage_cls.__name__}_b.txt")
+            storage.bulk_add_tags({a: [("x", "")], b: [("y", ""), ("k", "v")]})
+            storage.bulk_add_tags({a: [("z", "")]})
+            self.assertEqual(sorted(storage.get_tags(a)), ["x", "z"])
+            storage.bulk_add_tags({b: [("w", "")]}, replace=True)
+            self.assertEqual(storage.get_tags(b), ["w"])
+            streamed = dict(storage.iter_all_data())
+            self.assertEqual(streamed, storage.get_all_data())
+
+    def test_xattr_tags_follow_moved_files(self):
+        storage = XattrStorage(self.config_mock)
+        self.assertIsInstance(storage.index, MarkdownStorage)
+        test_file = Path(self.temp_dir) / "data" / "a.txt"
+        test_file.parent.mkdir()
+        test_file.write_text("content")
+        storage.add_tags(str(test_file), [("key", "value"), ("work", "")])
+        self.assertIn("user.tagging.key/value", os.listxattr(test_file))
+        self.assertEqual(sorted(storage.get_tags(str(test_file))), ["key/value", "work"])
+        self.assertIn(str(test_file.resolve()), storage.search("work"))
+
+        moved = test_file.with_name("b.txt")
+        test_file.rename(moved)
+        self.assertEqual(sorted(storage.get_tags(str(moved))), ["key/value", "work"])
+        self.assertEqual(storage.rebuild_index([str(test_file.parent)], workers=2), 1)
+        data = storage.get_all_data()
+        self.assertEqual(sorted(data[str(moved.resolve())]), ["key/value", "work"])
+        self.assertNotIn(str(test_file.resolve()), data)
+
+    def test_xattr_dropping_a_file_clears_its_attributes(self):
+        storage = XattrStorage(self.config_mock)
+        test_file = Path(self.temp_dir) / "dropped.txt"
+        test_file.write_text("content")
+        storage.add_tags(str(test_file), [("work", "")])
+        storage.move_files({str(test_file.resolve()): None})
+        self.assertEqual(storage.get_tags(str(test_file)), [])
+        self.assertNotIn(str(test_file.resolve()), storage.get_all_data())
+
+    def test_xattr_unsupported_filesystem_rejected(self):
+        unsupported = OSError(errno.ENOTSUP, "Operation not supported")
+        with patch('src.storage.xattr.os.setxattr', side_effect=unsupported):
+            with self.assertRaises(ValueError) as context:
+                XattrStorage(self.config_mock)
+        self.assertIn("does not support user extended attributes", str(context.exception))
+
+    def test_xattr_unsupported_target_filesystem_rejected_before_writing(self):
+        storage = XattrStorage(self.config_mock)
+        good, other = Path(self.temp_dir) / "good.txt", Path(self.temp_dir) / "other.txt"
+        good.write_text("a")
+        other.write_text("b")
+        real_stat = os.stat
+        def fake_stat(path, *args, **kwargs):
+            st = real_stat(path, *args, **kwargs)
+            if str(path) == str(other):
+                return os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1, *st[3:10]))
+            return st
+        unsupported = OSError(errno.ENOTSUP, "Operation not supported")
+        with patch('src.storage.xattr.os.stat', side_effect=fake_stat), \
+                patch('src.storage.xattr.os.setxattr', side_effect=unsupported):
+            with self.assertRaises(ValueError):
+                storage.bulk_add_tags({str(good): [("x", "")], str(other): [("x", "")]})
+        self.assertEqual(storage.get_tags(str(good)), [])
+
+    def test_database_group_commit_concurrent_writers(self):
+        from concurrent.futures import ThreadPoolExecutor
+        storage = DatabaseStorage(self.config_mock)
+        paths = [str(Path(self.temp_dir) / f"f{i}.txt") for i in range(8)]
+
+        def writer(path):
+            for i in range(25):
+                storage.add_tags(path, [("shared", ""), ("n", str(i))])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(writer, paths))
+        data = storage.get_all_data()
+        self.assertEqual(len(data[paths[0]]), 26)
+        self.assertEqual(len(storage.get_all_tags()), 26)
+        # Writers shared transactions instead of committing one by one
+        self.assertLess(storage.write_queue.batches, 8 * 25)
+        storage.remove_tags(paths[0], [("shared", ""), ("missing", "")])
+        self.assertNotIn("shared", storage.get_tags(paths[0]))
+        storage.close()
+
+    def test_scoped_search_under_folder_and_type(self):
+        for storage_cls in (MarkdownStorage, DatabaseStorage):
+            root = Path(tempfile.mkdtemp())
+            self.config_mock.get_storage_path.return_value = str(root / "store")
+            storage = storage_cls(self.config_mock)
+            storage.bulk_add_tags({
+                str(root / "proj" / "x" / "a.txt"): [("t", "")],
+                str(root / "proj" / "x" / "b.py"): [("t", "")],
+                str(root / "proj" / "xy" / "c.txt"): [("t", "")],
+                str(root / "other" / "d.txt"): [("t", ""), ("u", "")],
+            })
+            for _ in range(2):  # cold (streaming) and warm (indexed) paths
+                under_x = [Path(p).name for p, _ in storage.iter_search("t", under=str(root / "proj" / "x"), sort=True)]
+                self.assertEqual(under_x, ["a.txt", "b.py"], storage_cls.__name__)
+                txt = sorted(Path(p).name for p in storage.search("t", type_filter="txt", under=str(root / "proj")))
+                self.assertEqual(txt, ["a.txt", "c.txt"])
+                self.assertEqual(list(storage.search("u")), [str(root / "other" / "d.txt")])
+
+    def test_recent_tags_by_time_window(self):
+        for storage_cls in (MarkdownStorage, DatabaseStorage):
+            root = Path(tempfile.mkdtemp())
+            self.config_mock.get_storage_path.return_value = str(root / "store")
+            storage = storage_cls(self.config_mock)
+            a, b = str(root / "a.txt"), str(root / "b.md")
+            storage.bulk_add_tags({a: [("old", "")]})
+            with patch('time.time', return_value=time.time() + 7200):
+                storage.bulk_add_tags({a: [("old", ""), ("new", "")], b: [("new", "")]}, replace=True)
+            later = time.time() + 3600
+            recent = [(Path(p).name, tag) for p, tag, _ in storage.iter_recent(since=later)]
+            self.assertCountEqual(recent, [("a.txt", "new"), ("b.md", "new")], storage_cls.__name__)
+            # Re-applying 'old' kept its original add time
+            self.assertEqual([tag for _, tag, _ in storage.iter_recent(until=later)], ["old"])
+            self.assertEqual([Path(p).name for p, _, _ in storage.iter_recent(since=later, type_filter="md")], ["b.md"])
+            storage.remove_tags(a, [("new", "")])
+            self.assertEqual(len(list(storage.iter_recent())), 2)
+            if hasattr(storage, 'close'):
+                storage.close()
+
+    def test_markdown_reads_files_without_timestamps(self):
+        storage = MarkdownStorage(self.config_mock)
+        storage.tags_file.write_text("# Tagging System Data\n\n## Files and Tags\n\n"
+                                     "### /a.txt\n- Type: txt\n- legacy\n\n## Tag Exclusions\n\n## Metadata\n")
+        self.assertEqual(storage.get_tags("/a.txt"), ["legacy"])
+        self.assertEqual(list(storage.iter_recent()), [])
+        storage.bulk_add_tags({"/a.txt": [("fresh", "")]})
+        self.assertIn("- legacy\n", storage.tags_file.read_text())
+        self.assertIn("- fresh <!-- added: ", storage.tags_file.read_text())
+        self.assertEqual(storage.get_tags("/a.txt"), ["legacy", "fresh"])
+
+    def test_move_files_merges_and_drops(self):
+        for storage_cls in (MarkdownStorage, DatabaseStorage):
+            root = Path(tempfile.mkdtemp())
+            self.config_mock.get_storage_path.return_value = str(root / "store")
+            storage = storage_cls(self.config_mock)
+            a, b, c = str(root / "a.txt"), str(root / "b.txt"), str(root / "c.txt")
+            storage.bulk_add_tags({a: [("x", "")], b: [("y", "")], c: [("z", "")]})
+            storage.move_files({a: b, c: None})
+            self.assertCountEqual(storage.get_tags(b), ["x", "y"], storage_cls.__name__)
+            self.assertEqual([*dict(storage.iter_all_data())], [b])
+            self.assertEqual(len(list(storage.iter_recent())), 2)
+            if hasattr(storage, 'close'):
+                storage.close()
+
+    def test_database_streams_all_data_in_one_query(self):
+        storage = DatabaseStorage(self.config_mock)
+        a, b = str(Path(self.temp_dir) / "a.txt"), str(Path(self.temp_dir) / "b.txt")
+        storage.bulk_add_tags({a: [("x", ""), ("y", "")], b: [("z", "")]})
+        storage.remove_tags(b, [("z", "")])
+        statements = []
+        event.listen(storage.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        streamed = {path: sorted(tags) for path, tags in storage.iter_all_data()}
+        self.assertEqual(streamed, {a: ["x", "y"], b: []})
+        self.assertEqual(len(statements), 1)
+        self.assertCountEqual(storage.get_tags(a), ["x", "y"])
+        storage.close()
+
+    def test_markdown_recent_persisted_for_cold_processes(self):
+        storage = MarkdownStorage(self.config_mock)
+        a, b = str(Path(self.temp_dir) / "a.txt"), str(Path(self.temp_dir) / "b.md")
+        storage.add_tags(a, [("old", "")])
+        with patch('time.time', return_value=time.time() + 7200):
+            storage.add_tags(b, [("new", "")])
+        later = time.time() + 3600
+        cold = MarkdownStorage(self.config_mock)
+        self.assertEqual([tag for _, tag, _ in cold.iter_recent()], ["new", "old"])
+        self.assertTrue(cold.recent_file.exists())
+        # Served from the file, stopping at since, without parsing tags.md again
+        with patch.object(MarkdownStorage, '_iter_entries', side_effect=AssertionError):
+            self.assertEqual([Path(p).name for p, _, _ in MarkdownStorage(self.config_mock).iter_recent(since=later)],
+                             ["b.md"])
+            self.assertEqual([tag for _, tag, _ in MarkdownStorage(self.config_mock).iter_recent(until=later)],
+                             ["old"])
+        storage.remove_tags(b, [("new", "")])
+        self.assertEqual([tag for _, tag, _ in MarkdownStorage(self.config_mock).iter_recent()], ["old"])
+
+    def test_markdown_fuzzy_streams_small_vocabulary_even_with_workers(self):
+        self.config_mock.get.side_effect = \
+            lambda key, default=None: {'separator': '/', 'parallel_scan_workers': 4}.get(key, default)
+        storage = MarkdownStorage(self.config_mock)
+        a = str(Path(self.temp_dir) / "a.txt")
+        storage.add_tags(a, [("project", "alpha")])
+        cold = MarkdownStorage(self.config_mock)
+        with patch.object(MarkdownStorage, '_get_index', side_effect=AssertionError):
+            self.assertEqual(cold.search("projct", fuzzy=True), {a: ["project/alpha"]})
+
+    def test_markdown_index_over_budget_is_streamed_not_cached(self):
+        self.config_mock.get.side_effect = \
+            lambda key, default=None: {'separator': '/', 'index_memory_mb': 1 / 1024}.get(key, default)
+        storage = MarkdownStorage(self.config_mock)
+        paths = [str(Path(self.temp_dir) / f"f{i}.txt") for i in range(50)]
+        storage.bulk_add_tags({path: [("bulk", str(i))] for i, path in enumerate(paths)})
+        self.assertIsNone(storage._warm_index())
+        self.assertEqual(len(storage.search("bulk/*")), 50)
+        self.assertEqual(storage.get_tags(paths[3]), ["bulk/3"])
+        self.assertIsNone(storage._warm_index())
+        self.assertNotIn(storage._index_name, storage.indexes.stats()['resident'])
+
+    def test_markdown_writes_do_not_mutate_the_cached_index(self):
+        storage = MarkdownStorage(self.config_mock)
+        a, b = str(Path(self.temp_dir) / "a.txt"), str(Path(self.temp_dir) / "b.txt")
+        storage.bulk_add_tags({a: [("x", "")], b: [("y", "")]})
+        before = storage._get_index()
+        storage.add_tags(a, [("z", "")])
+        storage.rename_tag("y", "w")
+        storage.remove_tags(a, [("x", "")])
+        self.assertEqual(before.files[a]['tags'], ["x"])
+        self.assertEqual(before.files[b]['tags'], ["y"])
+        self.assertEqual(storage.get_all_data(), {a: ["z"], b: ["w"]})
+
+    def test_database_tag_id_cache_survives_rename_by_another_instance(self):
+        first, second = DatabaseStorage(self.config_mock), DatabaseStorage(self.config_mock)
+        a, b = str(Path(self.temp_dir) / "a.txt"), str(Path(self.temp_dir) / "b.txt")
+        first.add_tags(a, [("old", "")])
+        second.rename_tag("old", "new")
+        # first still has old -> id cached; reusing it would tag b with "new"
+        first.add_tags(b, [("old", "")])
+        self.assertEqual(first.get_tags(b), ["old"])
+        self.assertEqual(first.get_tags(a), ["new"])
+        first.close()
+        second.close()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
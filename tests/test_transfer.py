@@ -0,0 +1,38 @@
+import unittest
+import io
+from src.transfer import read_records, write_records, chunked, _iter_nul_fields
+
+RECORDS = [("/data/a b.txt", ["work", "project/alpha"]), ("/data/c.py", []), ("/data/d,e.md", ["x"])]
+
+class TestTransfer(unittest.TestCase):
+
+    def test_round_trip_all_formats(self):
+        for fmt in ("jsonl", "csv", "nul"):
+            stream = io.StringIO()
+            count = write_records(iter(RECORDS), stream, fmt)
+            self.assertEqual(count, 3)
+            stream.seek(0)
+            self.assertEqual(list(read_records(stream, fmt)), RECORDS, fmt)
+
+    def test_nul_reader_handles_fields_split_across_chunks(self):
+        stream = io.StringIO()
+        write_records(RECORDS, stream, "nul")
+        stream.seek(0)
+        fields = list(_iter_nul_fields(stream, chunk_size=3))
+        self.assertEqual(fields[:3], ["/data/a b.txt", "work", "project/alpha"])
+
+    def test_invalid_jsonl_reports_line(self):
+        stream = io.StringIO('{"path": "/a", "tags": []}\nnot json\n')
+        with self.assertRaises(ValueError) as context:
+            list(read_records(stream, "jsonl"))
+        self.assertIn("line 2", str(context.exception))
+
+    def test_csv_skips_blank_lines(self):
+        stream = io.StringIO("path,tag\n/a,x\n\n/a,y\n\n/b,z\n")
+        self.assertEqual(list(read_records(stream, "csv")), [("/a", ["x", "y"]), ("/b", ["z"])])
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+from src.value_index import ValueIndex, parse_predicates, validate_tag_types
+
+class TestValueIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tag_types = {'priority': 'int', 'due': 'date'}
+        self.index = ValueIndex(self.temp_dir)
+        self.index.build([
+            ('/a', ['priority/1', 'due/2026-10-01']),
+            ('/b', ['priority/3', 'due/2026-12-15']),
+            ('/c', ['priority/5', 'priority/high']),
+        ], self.tag_types, '/', 'gen-1')
+
+    def select(self, key, op, value):
+        return self.index.select(self.index.load(key), op, value)
+
+    def test_numeric_ranges(self):
+        (_, op, value), = parse_predicates('priority>=3', self.tag_types)
+        self.assertEqual(self.select('priority', op, value), {'/b': ['priority/3'], '/c': ['priority/5']})
+        self.assertEqual([*self.select('priority', '<', 3)], ['/a'])
+        self.assertEqual([*self.select('priority', '=', 5)], ['/c'])
+
+    def test_date_ranges_compare_chronologically(self):
+        (_, op, value), = parse_predicates('due<2026-12-01', self.tag_types)
+        self.assertEqual([*self.select('due', op, value)], ['/a'])
+
+    def test_plain_queries_and_bad_values(self):
+        self.assertIsNone(parse_predicates('project*', self.tag_types))
+        self.assertIsNone(parse_predicates('size>3', self.tag_types))
+        with self.assertRaises(ValueError):
+            parse_predicates('due<tomorrow', self.tag_types)
+        with self.assertRaises(ValueError):
+            validate_tag_types({'size': 'bytes'})
+
+    def test_stamp_written_after_build(self):
+        self.assertEqual(self.index.stamp, 'gen-1')
+        self.assertEqual(ValueIndex(tempfile.mkdtemp()).stamp, None)
+
+    def test_apply_change_only_on_matching_stamp(self):
+        self.assertIsNone(self.index.apply_change('/d', set(), {'priority/4'}, self.tag_types, '/', 'gen-0', 'gen-2'))
+        updated = self.index.apply_change('/a', {'priority/1'}, {'priority/4', 'todo'}, self.tag_types, '/',
+                                          'gen-1', 'gen-2')
+        self.assertEqual([*updated], ['priority'])
+        self.assertEqual(self.index.stamp, 'gen-2')
+        self.assertEqual(self.index.load('priority')['paths'], ['/b', '/a', '/c'])
+        self.assertEqual([*self.select('priority', '<', 3)], [])
+
+if __name__ == '__main__':
+    unittest.main()